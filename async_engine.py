@@ -0,0 +1,318 @@
+import asyncio
+import logging
+from urllib.parse import quote_plus
+
+from profiles import acquire_profile_slot
+from retry import PANEL_EMPTY, RetryPolicy, classify_failure, new_failure_stats
+from run_metrics import StageTimer
+from throttle import AdaptiveRateLimiter, is_block_page
+from parsing import FEED_CARDS_JS, FEED_LINKS_JS, PANEL_EXTRACT_JS, empty_details, panel_to_details
+
+logger = logging.getLogger(__name__)
+
+SEARCH_URL = "https://www.google.com/maps/search/{query}"
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-gpu',
+]
+
+
+class AsyncMapsEngine:
+    """Drive several Chromium tabs concurrently from a single asyncio event loop"""
+
+    def __init__(self, headless=True, tabs=4, timeout=15, cdp_url=None, user_data_dir=None,
+                 rate_limiter=None, retry_attempts=3):
+        self.headless = headless
+        self.tabs = max(1, int(tabs))
+        self.timeout_ms = int(timeout * 1000)
+        # Attach to an already running Chromium (e.g. --remote-debugging-port) when given
+        self.cdp_url = cdp_url
+        # Persistent profile directory so consent cookies and the HTTP cache survive runs
+        self.user_data_dir = user_data_dir
+        self.rate_limiter = rate_limiter
+        # retry_attempts counts retries, so the first attempt comes on top
+        self.retry_policy = RetryPolicy(attempts=retry_attempts + 1)
+        self.stats = {'retries': 0, 'failed': 0, 'failures': new_failure_stats()}
+
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.feed_page = None
+
+    async def start(self):
+        """Launch or attach to Chromium and open the tab used for the results feed"""
+        from playwright.async_api import async_playwright
+
+        self.playwright = await async_playwright().start()
+        viewport = {'width': 1920, 'height': 1080}
+        if self.cdp_url:
+            self.browser = await self.playwright.chromium.connect_over_cdp(self.cdp_url)
+            self.context = await self.browser.new_context(viewport=viewport)
+        elif self.user_data_dir:
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                self.user_data_dir, headless=self.headless, args=BROWSER_ARGS, viewport=viewport)
+            self.browser = self.context.browser or self.context
+        else:
+            self.browser = await self.playwright.chromium.launch(headless=self.headless, args=BROWSER_ARGS)
+            self.context = await self.browser.new_context(viewport=viewport)
+        self.feed_page = await self.context.new_page()
+
+    async def open_search(self, query):
+        """Navigate the feed tab straight to the search results for a query"""
+        await self.feed_page.goto(SEARCH_URL.format(query=quote_plus(query)), wait_until='domcontentloaded')
+
+        # Consent pages block the feed on fresh profiles
+        for label in ('Accept all', 'Reject all', 'Got it'):
+            button = self.feed_page.get_by_role('button', name=label)
+            if await button.count():
+                await button.first.click()
+                break
+
+        await self.feed_page.wait_for_selector('div[role="feed"]', timeout=self.timeout_ms)
+
+    async def scroll_feed(self, script, key, max_results, should_stop=None):
+        """Scroll the results feed, re-reading it with script, until enough entries load or the list ends"""
+        entries = []
+        stalled_rounds = 0
+
+        while len(entries) < max_results and stalled_rounds < 3:
+            if should_stop and should_stop():
+                break
+
+            loaded = await self.feed_page.evaluate(script)
+            # Feed links are stable, so order-preserving dedupe keeps indexes meaningful
+            loaded = list({key(entry): entry for entry in loaded}.values())
+            stalled_rounds = stalled_rounds + 1 if len(loaded) <= len(entries) else 0
+            entries = loaded
+
+            await self.feed_page.evaluate(
+                "() => { const f = document.querySelector('div[role=\"feed\"]');"
+                " if (f) f.scrollTop = f.scrollHeight; }")
+            await self.feed_page.wait_for_timeout(1500)
+
+        return entries[:max_results]
+
+    async def collect_feed_urls(self, max_results, should_stop=None):
+        return await self.scroll_feed(FEED_LINKS_JS, lambda url: url, max_results, should_stop)
+
+    async def collect_feed_cards(self, max_results, should_stop=None):
+        return await self.scroll_feed(FEED_CARDS_JS, lambda card: card['url'], max_results, should_stop)
+
+    async def extract_place(self, page, url):
+        """Open a place URL in a tab and read its detail panel"""
+        await page.goto(url, wait_until='domcontentloaded')
+        await page.wait_for_selector('h1', timeout=self.timeout_ms)
+        return panel_to_details(await page.evaluate(PANEL_EXTRACT_JS), url)
+
+    async def extract_place_with_retry(self, page, url):
+        """Extract a place under the retry policy, backing off between attempts"""
+        for attempt in range(1, self.retry_policy.attempts + 1):
+            try:
+                details = await self.extract_place(page, url)
+                if details.get('name'):
+                    return details
+                failure = PANEL_EMPTY
+            except Exception as e:
+                logger.debug("Failed to extract %s: %s", url, e)
+                failure = classify_failure(e)
+
+            self.stats['failures'][failure] += 1
+            if not self.retry_policy.should_retry(failure, attempt):
+                break
+            self.stats['retries'] += 1
+            await asyncio.sleep(self.retry_policy.backoff(attempt, failure))
+        self.stats['failed'] += 1
+        return empty_details()
+
+    async def extract_places(self, urls, on_result=None, should_stop=None):
+        """Extract every URL, cycling them across a fixed pool of tabs"""
+        pending = asyncio.Queue()
+        for index, url in enumerate(urls):
+            pending.put_nowait((index, url))
+
+        results = [None] * len(urls)
+
+        async def tab_worker():
+            page = await self.context.new_page()
+            try:
+                while not pending.empty():
+                    if should_stop and should_stop():
+                        break
+                    index, url = pending.get_nowait()
+                    if self.rate_limiter:
+                        # The limiter blocks with time.sleep, so wait for it off the event loop
+                        await asyncio.get_running_loop().run_in_executor(None, self.rate_limiter.acquire)
+                    details = await self.extract_place_with_retry(page, url)
+                    if self.rate_limiter:
+                        if details.get('name'):
+                            self.rate_limiter.report_success()
+                        else:
+                            page_text = await page.evaluate(
+                                "() => document.body ? document.body.innerText.slice(0, 3000) : ''")
+                            if is_block_page(page.url, page_text):
+                                self.rate_limiter.report_block()
+                            else:
+                                self.rate_limiter.report_empty()
+                    results[index] = details
+                    if on_result:
+                        on_result(index, details)
+            finally:
+                await page.close()
+
+        await asyncio.gather(*(tab_worker() for _ in range(min(self.tabs, len(urls)) or 1)))
+        return [details for details in results if details and details.get('name')]
+
+    async def close(self):
+        """Shut down the browser and the Playwright driver"""
+        try:
+            if self.context:
+                await self.context.close()
+            if self.browser and self.browser is not self.context:
+                await self.browser.close()
+        finally:
+            if self.playwright:
+                await self.playwright.stop()
+            self.context = self.browser = self.playwright = self.feed_page = None
+
+
+class AsyncGoogleMapsExtractor:
+    """Blocking facade over AsyncMapsEngine compatible with GoogleMapsExtractorStreamlit"""
+
+    def __init__(self, headless=True, tabs=4, cdp_url=None, keep_spare_driver=False, profile_root=None,
+                 rate_limiter=None, retry_attempts=3):
+        # keep_spare_driver is accepted for signature compatibility; Playwright starts fast
+        self.engine = AsyncMapsEngine(headless=headless, tabs=tabs, cdp_url=cdp_url,
+                                      rate_limiter=rate_limiter or AdaptiveRateLimiter(),
+                                      retry_attempts=retry_attempts)
+        self.profile_root = profile_root
+        self.profile_slot = None
+        self.loop = asyncio.new_event_loop()
+        self.driver = None
+        self.results = []
+        self.stop_extraction = False
+        self.timer = StageTimer()
+        # The engine's retry and failure counters, with stage times as the Selenium extractor reports them
+        self.stats = self.engine.stats
+        self.stats['stage_seconds'] = self.timer.seconds
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def initialize_driver(self):
+        """Start the browser, mirroring the Selenium extractor's return contract"""
+        with self.timer.stage('browser_start'):
+            return self._initialize_driver()
+
+    def _initialize_driver(self):
+        try:
+            if self.profile_root and not self.profile_slot:
+                self.profile_slot = acquire_profile_slot(self.profile_root)
+                if self.profile_slot:
+                    self.engine.user_data_dir = self.profile_slot.path
+            self._run(self.engine.start())
+            self.driver = self.engine.browser
+            return True, "Browser initialized successfully"
+        except ImportError:
+            return False, "Playwright not found. Please install playwright and run 'playwright install chromium'"
+        except Exception as e:
+            return False, f"Failed to start Chromium: {str(e)}"
+
+    def search_google_maps(self, query):
+        """Perform search on Google Maps"""
+        with self.timer.stage('search'):
+            return self._search_google_maps(query)
+
+    def _search_google_maps(self, query):
+        try:
+            if not self.driver:
+                success, error = self.initialize_driver()
+                if not success:
+                    return False, error
+
+            self._run(self.engine.open_search(query))
+            return True, "Search successful"
+
+        except Exception as e:
+            return False, str(e)
+
+    def collect_feed_cards(self, max_results):
+        """Scroll the results feed and return up to max_results feed cards"""
+        with self.timer.stage('scroll_feed'):
+            try:
+                return self._run(self.engine.collect_feed_cards(max_results, lambda: self.stop_extraction))
+            except Exception:
+                return []
+
+    def extract_single_batch(self, max_results=50, progress_callback=None, urls=None):
+        """Extract a batch of results across concurrent tabs with progress updates
+
+        When urls is given only those place URLs are extracted instead of the whole feed.
+        """
+        batch_results = []
+
+        try:
+            if urls is None:
+                with self.timer.stage('scroll_feed'):
+                    urls = self._run(self.engine.collect_feed_urls(max_results, lambda: self.stop_extraction))
+            urls = list(urls)
+            if not urls:
+                return batch_results, "No listings found"
+
+            completed = [0]
+
+            def on_result(index, details):
+                completed[0] += 1
+                if not details.get('name'):
+                    if progress_callback:
+                        progress_callback({
+                            'stage': 'failed',
+                            'current': completed[0],
+                            'total': len(urls),
+                            'extracted': len(batch_results),
+                            'status': "⚠️ No data found for this listing"
+                        })
+                    return
+
+                batch_results.append(details)
+                self.results.append(details)
+                if progress_callback:
+                    progress_callback({
+                        'stage': 'success',
+                        'current': completed[0],
+                        'total': len(urls),
+                        'extracted': len(batch_results),
+                        'company_name': details['name'],
+                        'status': f"✅ Extracted: {details['name']}"
+                    })
+
+            self._run(self.engine.extract_places(urls, on_result, lambda: self.stop_extraction))
+
+        except Exception as e:
+            return batch_results, f"Error during extraction: {str(e)}"
+
+        if progress_callback:
+            progress_callback({
+                'stage': 'completed',
+                'current': len(batch_results),
+                'total': len(batch_results),
+                'extracted': len(batch_results),
+                'status': f"🎉 Extraction completed! Found {len(batch_results)} results"
+            })
+
+        return batch_results, "Success"
+
+    def close(self):
+        """Close the browser"""
+        try:
+            self._run(self.engine.close())
+        except Exception:
+            pass
+        finally:
+            self.driver = None
+            self.loop.close()
+            if self.profile_slot:
+                self.profile_slot.release()
+                self.profile_slot = None
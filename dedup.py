@@ -0,0 +1,282 @@
+import argparse
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from urllib.parse import urlparse
+
+from parsing import FEATURE_ID_PATTERN
+
+# Words that say nothing about which business a name refers to
+NAME_STOPWORDS = {'the', 'and', 'of', 'inc', 'llc', 'ltd', 'co', 'company', 'corp', 'limited', 'pvt', 'gmbh', 'srl'}
+
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr', 'lane': 'ln',
+    'place': 'pl', 'court': 'ct', 'square': 'sq', 'highway': 'hwy', 'suite': 'ste', 'floor': 'fl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w', 'building': 'bldg', 'apartment': 'apt',
+}
+
+# Hosts shared by unrelated businesses, useless as a blocking key
+SHARED_HOSTS = ('facebook.com', 'instagram.com', 'google.com', 'business.site', 'linktr.ee', 'wa.me',
+                'twitter.com', 'x.com', 'yelp.com', 'tripadvisor.com', 'wixsite.com', 'sites.google.com')
+
+# Blocks larger than this are compared only between neighbours in name order
+MAX_BLOCK = 50
+WINDOW = 8
+
+
+def normalize_phone(phone):
+    """Digits only, dropping a country prefix so local and international forms match"""
+    digits = re.sub(r'\D', '', str(phone or ''))
+    if len(digits) < 7:
+        return None
+    return digits[-10:]
+
+
+def normalize_domain(website):
+    """Registrable-looking host of a website without scheme, www or path"""
+    if not website:
+        return None
+    website = str(website).strip().lower()
+    if '://' not in website:
+        website = 'http://' + website
+    host = (urlparse(website).hostname or '').removeprefix('www.')
+    if not host or '.' not in host:
+        return None
+    if any(host == shared or host.endswith('.' + shared) for shared in SHARED_HOSTS):
+        return None
+    return host
+
+
+def normalize_address(address):
+    if not address:
+        return None
+    words = re.sub(r'[^\w\s]', ' ', str(address).lower()).split()
+    words = [ADDRESS_ABBREVIATIONS.get(word, word) for word in words]
+    return ' '.join(words) or None
+
+
+def normalize_name(name):
+    words = re.sub(r'[^\w\s]', ' ', str(name or '').lower()).split()
+    return ' '.join(word for word in words if word not in NAME_STOPWORDS)
+
+
+def place_id_kind(place_id):
+    """Which kind of ID a place ID is; only IDs of the same kind can be compared
+
+    Rows stored before places were keyed by feature ID may carry the ChIJ place ID
+    of a business another row has under its 0x...:0x... feature ID.
+    """
+    if not place_id:
+        return None
+    return 'feature' if FEATURE_ID_PATTERN.fullmatch(place_id) else 'place'
+
+
+def similarity(a, b):
+    """difflib ratio of two normalized strings, with the cheap upper bounds checked first"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.real_quick_ratio() < 0.5 or matcher.quick_ratio() < 0.5:
+        return matcher.quick_ratio()
+    return matcher.ratio()
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression keeps later finds close to constant time
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+class Candidate:
+    """The normalized keys of one record, computed once"""
+
+    __slots__ = ('place_id', 'id_kind', 'name', 'phone', 'domain', 'address', 'numbers')
+
+    def __init__(self, record):
+        self.place_id = record.get('place_id')
+        self.id_kind = place_id_kind(self.place_id)
+        self.name = normalize_name(record.get('name'))
+        self.phone = normalize_phone(record.get('phone'))
+        self.domain = normalize_domain(record.get('website'))
+        self.address = normalize_address(record.get('address'))
+        self.numbers = re.findall(r'\d+', self.address) if self.address else None
+
+    def blocking_keys(self):
+        keys = []
+        if self.place_id:
+            keys.append(('place_id', self.place_id))
+        if self.phone:
+            keys.append(('phone', self.phone))
+        if self.domain:
+            keys.append(('domain', self.domain))
+        if self.address:
+            keys.append(('address', self.address))
+        if self.name:
+            # Catches renamed or re-listed entries that share nothing else but a name
+            keys.append(('name', self.name))
+        return keys
+
+
+def addresses_compatible(a, b, threshold=0.8):
+    """Missing addresses are compatible; present ones need the same numbers and similar text"""
+    if not a.address or not b.address:
+        return True
+    # "10 Main St" and "100 Main St" are textually close but different buildings
+    if a.numbers != b.numbers:
+        return False
+    return similarity(a.address, b.address) >= threshold
+
+
+def is_duplicate(a, b, name_threshold=0.85):
+    """Decide whether two candidates that share a block describe the same business"""
+    # IDs of different kinds say nothing either way, so the other rules decide
+    if a.place_id and b.place_id and a.id_kind == b.id_kind:
+        return a.place_id == b.place_id
+    if a.phone and a.phone == b.phone:
+        return similarity(a.name, b.name) >= 0.5
+    if a.address and a.address == b.address:
+        return similarity(a.name, b.name) >= 0.75
+    # Chains share a domain and a name, so the address has to agree as well;
+    # it is checked first because it usually rules a pair out without a name comparison
+    if a.domain and a.domain == b.domain:
+        return addresses_compatible(a, b) and similarity(a.name, b.name) >= name_threshold
+    return (a.address is not None and addresses_compatible(a, b, 0.9)
+            and similarity(a.name, b.name) >= name_threshold)
+
+
+def find_duplicate_groups(records, name_threshold=0.85):
+    """Group indexes of records that refer to the same business
+
+    Records are only compared within shared blocking keys (place ID, phone, domain,
+    address, name), and oversized blocks only between neighbours in name order, so
+    the work grows roughly linearly with the number of records.
+    """
+    candidates = [Candidate(record) for record in records]
+    blocks = defaultdict(list)
+    for index, candidate in enumerate(candidates):
+        for key in candidate.blocking_keys():
+            blocks[key].append(index)
+
+    groups = UnionFind(len(candidates))
+    # The place IDs each group has taken on, by kind, kept at its root; a record
+    # without an ID must not chain two different places together
+    group_place_ids = [{candidate.id_kind: candidate.place_id} if candidate.place_id else {}
+                       for candidate in candidates]
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BLOCK:
+            members = sorted(members, key=lambda index: candidates[index].name)
+            pairs = ((members[i], members[j]) for i in range(len(members))
+                     for j in range(i + 1, min(i + 1 + WINDOW, len(members))))
+        else:
+            pairs = ((members[i], members[j]) for i in range(len(members)) for j in range(i + 1, len(members)))
+        for a, b in pairs:
+            root_a, root_b = groups.find(a), groups.find(b)
+            if root_a == root_b:
+                continue
+            ids_a, ids_b = group_place_ids[root_a], group_place_ids[root_b]
+            if any(kind in ids_a and ids_a[kind] != place_id for kind, place_id in ids_b.items()):
+                continue
+            if is_duplicate(candidates[a], candidates[b], name_threshold):
+                groups.union(a, b)
+                group_place_ids[groups.find(a)] = {**ids_a, **ids_b}
+
+    clusters = defaultdict(list)
+    for index in range(len(candidates)):
+        clusters[groups.find(index)].append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def best_value(values):
+    """Most common non-empty value, preferring the longest on ties"""
+    values = [value for value in values if value not in (None, '')]
+    if not values:
+        return None
+    counts = Counter(str(value) for value in values)
+    return max(values, key=lambda value: (counts[str(value)], len(str(value))))
+
+
+def merge_group(records):
+    """Merge duplicate records into one, keeping the best value for each field"""
+    def reviews(record):
+        digits = re.sub(r'\D', '', str(record.get('reviews_count') or ''))
+        return int(digits) if digits else -1
+
+    # The listing with the most reviews is the most current view of rating and reviews
+    freshest = max(records, key=reviews)
+    merged = {}
+    for field in dict.fromkeys(field for record in records for field in record):
+        merged[field] = best_value([record.get(field) for record in records])
+    merged['rating'] = freshest.get('rating') if freshest.get('rating') is not None else merged.get('rating')
+    merged['reviews_count'] = freshest.get('reviews_count') if reviews(freshest) >= 0 else merged.get('reviews_count')
+    merged['place_id'] = next((record['place_id'] for record in records if record.get('place_id')), None)
+    return merged
+
+
+def deduplicate(records, name_threshold=0.85):
+    """Return records with duplicates merged, plus counts of what was merged"""
+    groups = find_duplicate_groups(records, name_threshold)
+    grouped = set()
+    merged = []
+    first_of_group = {}
+    for members in groups:
+        grouped.update(members)
+        first_of_group[members[0]] = merge_group([records[index] for index in members])
+
+    for index, record in enumerate(records):
+        if index in first_of_group:
+            merged.append(first_of_group[index])
+        elif index not in grouped:
+            merged.append(record)
+
+    stats = {'input': len(records), 'output': len(merged), 'groups': len(groups),
+             'merged': len(records) - len(merged)}
+    return merged, stats
+
+
+def dedupe_store(store, name_threshold=0.85, dry_run=False):
+    """Merge duplicate places in a ResultStore in place"""
+    keys = store.key_rows()
+    groups = find_duplicate_groups(keys, name_threshold)
+    collapses = []
+    for members in groups:
+        ids = [keys[index]['id'] for index in members]
+        records = store.records_by_id(ids)
+        collapses.append((ids[0], ids[1:], merge_group([records[row_id] for row_id in ids])))
+    if collapses and not dry_run:
+        store.collapse(collapses)
+    merged = sum(len(drop_ids) for _, drop_ids, _ in collapses)
+    return {'input': len(keys), 'output': len(keys) - merged, 'groups': len(groups), 'merged': merged}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge duplicate businesses in the result store")
+    parser.add_argument('--db', help="result store path")
+    parser.add_argument('--threshold', type=float, default=0.85, help="name similarity needed to merge")
+    parser.add_argument('--dry-run', action='store_true', help="report duplicates without merging them")
+    args = parser.parse_args(argv)
+
+    from results_store import STORE_PATH, ResultStore
+    stats = dedupe_store(ResultStore(args.db or STORE_PATH), args.threshold, args.dry_run)
+    print(f"{stats['groups']} duplicate groups, {stats['merged']} records "
+          f"{'would be ' if args.dry_run else ''}merged ({stats['input']} -> {stats['output']})")
+
+
+if __name__ == '__main__':
+    main()
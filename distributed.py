@@ -0,0 +1,512 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from grid_planner import MAX_RESULTS_PER_SEARCH, Tile, parse_bbox, plan_grid
+from parsing import place_id_from_url
+from results_store import STORE_PATH, ResultStore, result_key
+
+logger = logging.getLogger(__name__)
+
+# By default jobs share the app's results database, so finished places show up in the app
+DEFAULT_QUEUE_URL = os.environ.get('GNP_QUEUE_URL', 'sqlite:///' + STORE_PATH)
+
+# Job kinds: a search (optionally confined to a tile) fans out into one place job per listing
+SEARCH_JOB = 'search'
+PLACE_JOB = 'place'
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    job_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    leased_until REAL,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, leased_until);
+"""
+
+
+# KEYS: pending list, leases zset, counts hash; ARGV: now, lease seconds, worker, max attempts,
+# job hash key prefix. Job hashes are addressed from the prefix, so this needs a single Redis
+# node (or every key in one cluster slot via a {hash tag} namespace).
+CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], 0, now)) do
+    redis.call('ZREM', KEYS[2], id)
+    local job = ARGV[5] .. id
+    local kind = redis.call('HGET', job, 'kind')
+    local status = 'pending'
+    if tonumber(redis.call('HGET', job, 'attempts')) >= tonumber(ARGV[4]) then
+        status = 'failed'
+        redis.call('HSET', job, 'error', 'lease expired')
+    else
+        redis.call('RPUSH', KEYS[1], id)
+    end
+    redis.call('HSET', job, 'status', status)
+    redis.call('HINCRBY', KEYS[3], kind .. ':leased', -1)
+    redis.call('HINCRBY', KEYS[3], kind .. ':' .. status, 1)
+end
+
+local id = redis.call('LPOP', KEYS[1])
+if not id then
+    return false
+end
+local job = ARGV[5] .. id
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), id)
+local attempts = redis.call('HINCRBY', job, 'attempts', 1)
+redis.call('HSET', job, 'status', 'leased', 'worker', ARGV[3])
+local kind = redis.call('HGET', job, 'kind')
+redis.call('HINCRBY', KEYS[3], kind .. ':pending', -1)
+redis.call('HINCRBY', KEYS[3], kind .. ':leased', 1)
+return {id, kind, redis.call('HGET', job, 'payload'), attempts}
+"""
+
+# KEYS: job hash, leases zset, pending list, counts hash; ARGV: job id, worker, attempts,
+# new status, error. A lease that expired and went to another worker is left alone.
+FINISH_SCRIPT = """
+local job = redis.call('HMGET', KEYS[1], 'status', 'worker', 'attempts', 'kind')
+if job[1] ~= 'leased' or job[2] ~= ARGV[2] or job[3] ~= ARGV[3] then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[1], 'status', ARGV[4], 'error', ARGV[5])
+if ARGV[4] == 'pending' then
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+end
+redis.call('HINCRBY', KEYS[4], job[4] .. ':leased', -1)
+redis.call('HINCRBY', KEYS[4], job[4] .. ':' .. ARGV[4], 1)
+return 1
+"""
+
+
+class JobFailed(Exception):
+    """A job could not be completed and should go back on the queue"""
+
+
+def merge_records(existing, record):
+    """Overlay a new record on a stored one without blanking fields it failed to read"""
+    merged = dict(existing or {})
+    merged.update({field: value for field, value in record.items() if value not in (None, '')})
+    return merged
+
+
+class SQLiteQueue:
+    """Job queue plus a ResultStore in one SQLite file; every node must see the same file"""
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection().executescript(SQLITE_SCHEMA)
+        # Results go to the places table, upserted by place; the app reads them when path is its store
+        self.store = ResultStore(path)
+
+    def connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+        return conn
+
+    def push(self, kind, payload, key=None):
+        """Queue a job, returning False if a job with the same key was already queued"""
+        cursor = self.connection().execute(
+            "INSERT OR IGNORE INTO jobs (kind, job_key, payload, updated_at) VALUES (?, ?, ?, ?)",
+            (kind, key, json.dumps(payload), time.time())
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, worker_id):
+        """Lease the oldest runnable job; leases that ran out are handed out again
+
+        A job whose lease has expired max_attempts times is failed instead, so a
+        place that keeps killing its worker's browser cannot loop forever.
+        """
+        conn = self.connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, leased_until = NULL, error = 'lease expired', updated_at = ? "
+                "WHERE status = ? AND leased_until < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs "
+                "WHERE status = ? OR (status = ? AND leased_until < ?) ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, leased_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (LEASED, worker_id, now + self.lease_seconds, now, row[0])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return {'id': row[0], 'kind': row[1], 'payload': json.loads(row[2]), 'attempts': row[3] + 1,
+                'worker': worker_id}
+
+    def _finish(self, job, status, error=None):
+        """Settle a job, unless its lease has since passed to another worker; True if it was settled"""
+        # The attempt number identifies the lease, even when one worker claims a job twice
+        cursor = self.connection().execute(
+            "UPDATE jobs SET status = ?, leased_until = NULL, error = ?, updated_at = ? "
+            "WHERE id = ? AND status = ? AND worker = ? AND attempts = ?",
+            (status, error, time.time(), job['id'], LEASED, job['worker'], job['attempts'])
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job):
+        return self._finish(job, DONE)
+
+    def fail(self, job, error):
+        """Put a failed job back on the queue until it runs out of attempts"""
+        return self._finish(job, FAILED if job['attempts'] >= self.max_attempts else PENDING, str(error))
+
+    def upsert_result(self, record, query=None):
+        self.store.upsert(record, query)
+
+    def results(self, query=None):
+        # Streamed in id order so exports never hold the whole table in memory
+        return self.store.iter_records(query=query)
+
+    def counts(self):
+        """Job counts per kind and status, plus the number of stored results"""
+        counts = {kind: {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0} for kind in (SEARCH_JOB, PLACE_JOB)}
+        for kind, status, count in self.connection().execute(
+                "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"):
+            counts.setdefault(kind, {})[status] = count
+        counts['results'] = self.store.count()
+        return counts
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+        self.store.close()
+
+
+class RedisQueue:
+    """The same queue on Redis (or anything speaking its protocol) for multi-node deployments"""
+
+    def __init__(self, url, namespace='gnp', lease_seconds=300, max_attempts=3):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis package is required for redis:// queues (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.ns = namespace
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.claim_script = self.client.register_script(CLAIM_SCRIPT)
+        self.finish_script = self.client.register_script(FINISH_SCRIPT)
+
+    def _key(self, *parts):
+        return ':'.join((self.ns,) + parts)
+
+    def _move(self, pipe, kind, old, new):
+        if old:
+            pipe.hincrby(self._key('counts'), f"{kind}:{old}", -1)
+        pipe.hincrby(self._key('counts'), f"{kind}:{new}", 1)
+
+    def push(self, kind, payload, key=None):
+        if key and not self.client.sadd(self._key('keys'), key):
+            return False
+        job_id = str(self.client.incr(self._key('seq')))
+        pipe = self.client.pipeline()
+        pipe.hset(self._key('job', job_id), mapping={
+            'kind': kind, 'payload': json.dumps(payload), 'status': PENDING, 'attempts': 0})
+        pipe.rpush(self._key('pending'), job_id)
+        self._move(pipe, kind, None, PENDING)
+        pipe.execute()
+        return True
+
+    def claim(self, worker_id):
+        """Lease the oldest pending job after requeueing (or failing) expired leases
+
+        Runs as one Lua script, so a worker that dies mid-claim cannot leave a job
+        popped from the pending list without a lease that would bring it back.
+        """
+        claimed = self.claim_script(
+            keys=[self._key('pending'), self._key('leases'), self._key('counts')],
+            args=[time.time(), self.lease_seconds, worker_id, self.max_attempts, self._key('job', '')]
+        )
+        if not claimed:
+            return None
+        job_id, kind, payload, attempts = claimed
+        return {'id': job_id, 'kind': kind, 'payload': json.loads(payload), 'attempts': int(attempts),
+                'worker': worker_id}
+
+    def _finish(self, job, status, error=None):
+        """Settle a job, unless its lease has since passed to another worker; True if it was settled"""
+        # Checked and applied in one script, so counts move once however many workers finish a job
+        return bool(self.finish_script(
+            keys=[self._key('job', job['id']), self._key('leases'), self._key('pending'), self._key('counts')],
+            args=[job['id'], job['worker'], job['attempts'], status, error or '']
+        ))
+
+    def complete(self, job):
+        return self._finish(job, DONE)
+
+    def fail(self, job, error):
+        return self._finish(job, FAILED if job['attempts'] >= self.max_attempts else PENDING, str(error))
+
+    def upsert_result(self, record, query=None):
+        key = result_key(record)
+        results_key = self._key('results')
+
+        def merge(pipe):
+            stored = pipe.hget(results_key, key)
+            merged = merge_records(json.loads(stored)['record'] if stored else None, record)
+            if stored and not query:
+                query_value = json.loads(stored)['query']
+            else:
+                query_value = query
+            pipe.multi()
+            pipe.hset(results_key, key, json.dumps({'query': query_value, 'record': merged}))
+
+        # Optimistic transaction: retried if another node writes the same place concurrently
+        self.client.transaction(merge, results_key)
+
+    def results(self, query=None):
+        # Scanned in batches, like the SQLite queue's id-ordered reads, so exports stay streaming
+        for _, value in self.client.hscan_iter(self._key('results'), count=1000):
+            entry = json.loads(value)
+            if not query or entry['query'] == query:
+                yield entry['record']
+
+    def counts(self):
+        counts = {kind: {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0} for kind in (SEARCH_JOB, PLACE_JOB)}
+        for field, count in self.client.hgetall(self._key('counts')).items():
+            kind, status = field.split(':', 1)
+            counts.setdefault(kind, {})[status] = int(count)
+        counts['results'] = self.client.hlen(self._key('results'))
+        return counts
+
+    def close(self):
+        self.client.close()
+
+
+def open_queue(url=DEFAULT_QUEUE_URL, **kwargs):
+    """Open a queue from a URL: redis://host:port/db or sqlite:///path/to/queue.db"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisQueue(url, **kwargs)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return SQLiteQueue(url, **kwargs)
+
+
+def search_job_key(query, tile):
+    if tile is None:
+        return f"search:{query}"
+    return f"search:{query}:" + ','.join(f"{value:.5f}" for value in tile[:4])
+
+
+def submit_search(job_queue, query, max_results=MAX_RESULTS_PER_SEARCH, bbox=None, rows=1, cols=1, max_depth=2):
+    """Queue the search jobs for a query, one per grid tile when a bounding box is given"""
+    tiles = plan_grid(*bbox, rows=rows, cols=cols) if bbox else [None]
+    queued = 0
+    for tile in tiles:
+        tile_spec = [tile.south, tile.west, tile.north, tile.east, tile.depth] if tile else None
+        payload = {'query': query, 'max_results': max_results, 'tile': tile_spec, 'max_depth': max_depth}
+        queued += job_queue.push(SEARCH_JOB, payload, search_job_key(query, tile_spec))
+    return queued
+
+
+def handle_search_job(job_queue, extractor, payload):
+    """Load a search (or tile) and fan its listings out as place jobs"""
+    query = payload['query']
+    tile = Tile(*payload['tile']) if payload.get('tile') else None
+    if tile:
+        lat, lng = tile.center
+        success, message = extractor.search_google_maps_at(query, lat, lng, tile.zoom)
+    else:
+        success, message = extractor.search_google_maps(query)
+    if not success:
+        raise JobFailed(f"Search failed: {message}")
+
+    urls = extractor.collect_place_urls(payload.get('max_results') or MAX_RESULTS_PER_SEARCH)
+    for url in urls:
+        # Keyed by place ID, so a place seen from overlapping tiles is only queued once
+        job_queue.push(PLACE_JOB, {'url': url, 'query': query}, f"place:{place_id_from_url(url) or url}")
+
+    # A tile that filled the feed probably hides more places
+    if tile and len(urls) >= MAX_RESULTS_PER_SEARCH and tile.depth < payload.get('max_depth', 0):
+        for child in tile.split():
+            child_spec = [child.south, child.west, child.north, child.east, child.depth]
+            job_queue.push(SEARCH_JOB, dict(payload, tile=child_spec), search_job_key(query, child_spec))
+    return len(urls)
+
+
+def handle_place_job(job_queue, extractor, payload):
+    """Open one place URL and upsert its details"""
+    # The worker's browser has no feed; the listing is opened straight from its URL
+    extractor.listing_keys = [payload['url']]
+    extractor.direct_navigation = True
+    extractor.rate_limiter.acquire()
+    details, failure = extractor.extract_listing_with_retry(0)
+    extractor.maybe_recycle_driver()
+    if not details:
+        raise JobFailed(failure)
+    details['place_id'] = details.get('place_id') or place_id_from_url(payload['url'])
+    job_queue.upsert_result(details, payload.get('query'))
+    return details
+
+
+def run_worker(job_queue, worker_id=None, extractor_options=None, rate=1.0, idle_timeout=60, should_stop=None):
+    """Consume jobs until the queue has been empty for idle_timeout seconds"""
+    from extractor import GoogleMapsExtractorStreamlit
+    from throttle import AdaptiveRateLimiter
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    extractor = GoogleMapsExtractorStreamlit(rate_limiter=AdaptiveRateLimiter(rate=rate),
+                                             **(extractor_options or {}))
+    stats = {'worker': worker_id, 'searches': 0, 'places': 0, 'failed': 0}
+    idle_since = time.time()
+
+    try:
+        while not (should_stop and should_stop()):
+            job = job_queue.claim(worker_id)
+            if job is None:
+                if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(2)
+                continue
+            idle_since = time.time()
+
+            try:
+                if not extractor.driver:
+                    success, message = extractor.initialize_driver()
+                    if not success:
+                        raise JobFailed(message)
+                if job['kind'] == SEARCH_JOB:
+                    found = handle_search_job(job_queue, extractor, job['payload'])
+                    stats['searches'] += 1
+                    logger.info("%s: search %r queued %d places", worker_id, job['payload']['query'], found)
+                else:
+                    handle_place_job(job_queue, extractor, job['payload'])
+                    stats['places'] += 1
+                if not job_queue.complete(job):
+                    logger.info("%s: %s job %s finished after its lease passed to another worker",
+                                worker_id, job['kind'], job['id'])
+            except Exception as e:
+                stats['failed'] += 1
+                logger.warning("%s: %s job %s failed: %s", worker_id, job['kind'], job['id'], e)
+                job_queue.fail(job, e)
+    finally:
+        extractor.close()
+    return stats
+
+
+def wait_for_jobs(job_queue, poll_interval=2.0, progress_callback=None, should_stop=None):
+    """Block until no job is pending or leased, reporting progress from the calling thread"""
+    while not (should_stop and should_stop()):
+        counts = job_queue.counts()
+        places = counts[PLACE_JOB]
+        outstanding = sum(counts[kind][PENDING] + counts[kind][LEASED] for kind in (SEARCH_JOB, PLACE_JOB))
+        if progress_callback:
+            progress_callback({
+                'stage': 'processing',
+                'current': places[DONE] + places[FAILED],
+                'total': sum(places.values()),
+                'extracted': counts['results'],
+                'status': f"🌐 {outstanding} jobs outstanding, {counts['results']} places stored"
+            })
+        if not outstanding:
+            return counts
+        time.sleep(poll_interval)
+    return job_queue.counts()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed Google Maps extraction over a shared job queue")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_URL,
+                        help="redis://host:port/db or sqlite:///path (default: $GNP_QUEUE_URL or a local SQLite file)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help="queue search jobs for a query")
+    submit.add_argument('query')
+    submit.add_argument('--max-results', type=int, default=MAX_RESULTS_PER_SEARCH)
+    submit.add_argument('--bbox', help="south,west,north,east to split into grid tiles")
+    submit.add_argument('--rows', type=int, default=3)
+    submit.add_argument('--cols', type=int, default=3)
+    submit.add_argument('--max-depth', type=int, default=2)
+    submit.add_argument('--wait', action='store_true', help="block until every job has finished")
+
+    worker = commands.add_parser('worker', help="consume jobs on this node")
+    worker.add_argument('--rate', type=float, default=0.5, help="listing opens per second for this worker")
+    worker.add_argument('--show-browser', action='store_true')
+    worker.add_argument('--idle-timeout', type=float, default=None,
+                        help="exit after this many idle seconds (default: run forever)")
+
+    commands.add_parser('status', help="show job and result counts")
+
+    export = commands.add_parser('export', help="write stored results to CSV or NDJSON")
+    export.add_argument('path', help="output file; .ndjson selects NDJSON and a .gz suffix compresses it")
+    export.add_argument('--query')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    job_queue = open_queue(args.queue)
+
+    try:
+        if args.command == 'submit':
+            bbox = None
+            if args.bbox:
+                bbox = parse_bbox(args.bbox)
+                if bbox is None:
+                    parser.error("--bbox must be 'south,west,north,east'")
+            queued = submit_search(job_queue, args.query, args.max_results, bbox,
+                                   rows=args.rows, cols=args.cols, max_depth=args.max_depth)
+            print(f"Queued {queued} search jobs for {args.query!r}")
+            if args.wait:
+                print(json.dumps(wait_for_jobs(job_queue), indent=2))
+        elif args.command == 'worker':
+            options = {'headless': not args.show_browser}
+            stats = run_worker(job_queue, extractor_options=options, rate=args.rate,
+                               idle_timeout=args.idle_timeout)
+            print(json.dumps(stats, indent=2))
+        elif args.command == 'status':
+            print(json.dumps(job_queue.counts(), indent=2))
+        elif args.command == 'export':
+            from exports import write_export
+            path = args.path.lower()
+            fmt = 'ndjson' if path.removesuffix('.gz').endswith(('.ndjson', '.jsonl')) else 'csv'
+            # Only the SQLite store can list extra fields up front; Redis results keep them as JSON
+            extra_columns = job_queue.store.extra_keys(query=args.query) if isinstance(job_queue, SQLiteQueue) else None
+            written = write_export(job_queue.results(args.query), args.path, fmt, path.endswith('.gz'), extra_columns)
+            print(f"Wrote {written} bytes of {fmt} results to {args.path}")
+    finally:
+        job_queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'gnp_scraper', 'driver_resolution.json')
+
+# Tried in order until one works, cheapest first
+STRATEGIES = ('default', 'service', 'webdriver_manager')
+
+
+def load_resolution():
+    """Read the cached driver resolution, or None if nothing usable is cached"""
+    try:
+        with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+            resolution = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if resolution.get('strategy') not in STRATEGIES:
+        return None
+    # A cached binary that has since been removed would only waste an attempt
+    if resolution.get('driver_path') and not os.path.exists(resolution['driver_path']):
+        return None
+    return resolution
+
+
+def save_resolution(resolution):
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(resolution, f, indent=2)
+    except OSError:
+        pass
+
+
+def clear_resolution():
+    try:
+        os.remove(CACHE_PATH)
+    except OSError:
+        pass
+
+
+def major_version(version):
+    try:
+        return int(str(version).split('.')[0])
+    except (TypeError, ValueError):
+        return None
+
+
+def describe_driver(driver, strategy):
+    """Build the cache entry for a driver that started successfully"""
+    capabilities = driver.capabilities or {}
+    browser_version = capabilities.get('browserVersion')
+    driver_version = (capabilities.get('chrome', {}).get('chromedriverVersion') or '').split(' ')[0] or None
+    return {
+        'strategy': strategy,
+        'driver_path': getattr(driver.service, 'path', None) if strategy != 'default' else None,
+        'browser_version': browser_version,
+        'driver_version': driver_version,
+        'compatible': major_version(browser_version) == major_version(driver_version),
+        'resolved_at': time.time(),
+    }
+
+
+def create_driver(options, strategy, driver_path=None):
+    """Start Chrome with one resolution strategy, raising on failure"""
+    if strategy == 'default':
+        return webdriver.Chrome(options=options)
+    if driver_path:
+        return webdriver.Chrome(service=Service(driver_path), options=options)
+    if strategy == 'service':
+        return webdriver.Chrome(service=Service(), options=options)
+    from webdriver_manager.chrome import ChromeDriverManager
+    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+
+def resolve_driver(options):
+    """Start Chrome, trying the cached strategy first and caching whichever works"""
+    cached = load_resolution()
+    if cached:
+        try:
+            driver = create_driver(options, cached['strategy'], cached.get('driver_path'))
+            return driver, cached
+        except Exception as e:
+            logger.info("Cached driver strategy %s failed, re-resolving: %s", cached['strategy'], e)
+            clear_resolution()
+
+    last_error = None
+    for strategy in STRATEGIES:
+        try:
+            driver = create_driver(options, strategy)
+        except ImportError:
+            raise
+        except Exception as e:
+            last_error = e
+            continue
+
+        resolution = describe_driver(driver, strategy)
+        if not resolution['compatible']:
+            logger.warning("ChromeDriver %s may not match Chrome %s",
+                           resolution['driver_version'], resolution['browser_version'])
+        save_resolution(resolution)
+        return driver, resolution
+
+    raise last_error
+
+
+def options_key(options):
+    """Hashable summary of ChromeOptions used to match a spare driver to a request"""
+    return json.dumps({
+        'arguments': sorted(options.arguments),
+        'capabilities': options.to_capabilities(),
+    }, sort_keys=True, default=str)
+
+
+class SpareDriverPool:
+    """Keeps one pre-started driver around so the next job skips browser startup"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.key = None
+        self.driver = None
+        self.warming = False
+
+    def prewarm(self, options):
+        """Start a spare driver for these options in the background"""
+        key = options_key(options)
+        with self.lock:
+            if self.warming or (self.driver and self.key == key):
+                return
+            self.warming = True
+
+        def warm():
+            try:
+                driver, _ = resolve_driver(options)
+            except Exception as e:
+                logger.info("Pre-warming driver failed: %s", e)
+                driver = None
+            with self.lock:
+                previous = self.driver if self.key != key else None
+                if driver:
+                    self.driver, self.key = driver, key
+                self.warming = False
+            if previous:
+                try:
+                    previous.quit()
+                except Exception:
+                    pass
+
+        threading.Thread(target=warm, daemon=True).start()
+
+    def take(self, options):
+        """Hand over the spare driver if it was started with matching options"""
+        key = options_key(options)
+        with self.lock:
+            if self.driver and self.key == key:
+                driver, self.driver, self.key = self.driver, None, None
+                return driver
+        return None
+
+    def shutdown(self):
+        with self.lock:
+            driver, self.driver, self.key = self.driver, None, None
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+spare_drivers = SpareDriverPool()
+atexit.register(spare_drivers.shutdown)
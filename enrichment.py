@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from html import unescape
+from urllib.parse import urljoin, urlparse
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+HREF_PATTERN = re.compile(r'href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+SOCIAL_DOMAINS = {
+    'facebook': ('facebook.com', 'fb.com'),
+    'instagram': ('instagram.com',),
+    'linkedin': ('linkedin.com',),
+    'twitter': ('twitter.com', 'x.com'),
+    'youtube': ('youtube.com',),
+    'tiktok': ('tiktok.com',),
+}
+
+# Link text or path fragments that usually point at a page listing contact details
+CONTACT_HINTS = ('contact', 'about', 'impressum', 'kontakt', 'contacto')
+
+# Matches that look like emails but are asset names or placeholders
+IGNORED_EMAIL_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+IGNORED_EMAIL_DOMAINS = ('example.com', 'sentry.io', 'wixpress.com', 'domain.com')
+
+# Next to the driver and profile caches, wherever the app is launched from
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'gnp_scraper', 'enrichment')
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+
+def normalize_website(website):
+    """Turn the website text shown on Maps into a fetchable URL"""
+    if not website:
+        return None
+    website = website.strip()
+    if not website.lower().startswith(('http://', 'https://')):
+        website = 'https://' + website
+    return website
+
+
+def extract_emails(html):
+    """Find email addresses in a page, including mailto links"""
+    text = unescape(html).replace('%40', '@')
+    emails = []
+    for email in EMAIL_PATTERN.findall(text):
+        email = email.lower()
+        if email.endswith(IGNORED_EMAIL_SUFFIXES) or email.split('@')[1] in IGNORED_EMAIL_DOMAINS:
+            continue
+        if email not in emails:
+            emails.append(email)
+    return emails
+
+
+def extract_social_links(html, base_url):
+    """Map each known social network to the first profile link found in a page"""
+    socials = {}
+    for href in HREF_PATTERN.findall(html):
+        url = urljoin(base_url, unescape(href))
+        host = urlparse(url).netloc.lower()
+        for network, domains in SOCIAL_DOMAINS.items():
+            if network not in socials and any(host == d or host.endswith('.' + d) for d in domains):
+                # Skip share widgets, which link to the sharer rather than a profile
+                if 'share' not in url.lower() and 'intent' not in url.lower():
+                    socials[network] = url
+    return socials
+
+
+def find_contact_links(html, base_url, limit=2):
+    """Return same-site links that look like contact or about pages"""
+    base_host = urlparse(base_url).netloc.lower()
+    links = []
+    for href in HREF_PATTERN.findall(html):
+        url = urljoin(base_url, unescape(href)).split('#')[0]
+        if urlparse(url).netloc.lower() != base_host or url in links:
+            continue
+        if any(hint in url.lower() for hint in CONTACT_HINTS):
+            links.append(url)
+            if len(links) >= limit:
+                break
+    return links
+
+
+class ResponseCache:
+    """On-disk cache of fetched pages keyed by URL"""
+
+    def __init__(self, cache_dir, ttl=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if time.time() - entry['fetched_at'] <= self.ttl:
+                self.hits += 1
+                return entry
+        except (OSError, ValueError, KeyError):
+            pass
+        self.misses += 1
+        return None
+
+    def set(self, url, status, body):
+        entry = {'url': url, 'status': status, 'body': body, 'fetched_at': time.time()}
+        # Write then rename so concurrent readers never see a half-written file
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+        return entry
+
+
+class WebsiteEnricher:
+    """Crawl business websites for emails and social links with a pooled async client"""
+
+    def __init__(self, cache_dir=CACHE_DIR, total_limit=20, per_host_limit=2,
+                 timeout=10, cache_ttl=7 * 24 * 3600, max_bytes=2_000_000):
+        self.cache = ResponseCache(cache_dir, ttl=cache_ttl)
+        self.total_limit = total_limit
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.stats = {'pages_fetched': 0, 'fetch_errors': 0, 'emails_found': 0}
+
+    async def fetch(self, session, url):
+        """Fetch a page body, serving it from the on-disk cache when fresh"""
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached['body'] if cached['status'] == 200 else None
+
+        try:
+            async with session.get(url, allow_redirects=True) as response:
+                content_type = response.headers.get('Content-Type', '')
+                if response.status != 200 or 'html' not in content_type:
+                    self.cache.set(url, response.status, None)
+                    return None
+                raw = await response.content.read(self.max_bytes)
+                body = raw.decode(response.charset or 'utf-8', errors='ignore')
+                self.stats['pages_fetched'] += 1
+                self.cache.set(url, 200, body)
+                return body
+        except Exception:
+            # Timeouts and connection errors are not cached so later runs can retry
+            self.stats['fetch_errors'] += 1
+            return None
+
+    async def enrich_record(self, session, record):
+        """Fetch a record's home page plus contact pages and fill email and social links"""
+        website = normalize_website(record.get('website'))
+        if not website:
+            return record
+
+        emails = []
+        socials = {}
+        home = await self.fetch(session, website)
+        if home:
+            emails.extend(extract_emails(home))
+            socials.update(extract_social_links(home, website))
+
+            contact_pages = find_contact_links(home, website)
+            bodies = await asyncio.gather(*(self.fetch(session, url) for url in contact_pages))
+            for url, body in zip(contact_pages, bodies):
+                if not body:
+                    continue
+                emails.extend(e for e in extract_emails(body) if e not in emails)
+                for network, link in extract_social_links(body, url).items():
+                    socials.setdefault(network, link)
+
+        if emails:
+            self.stats['emails_found'] += 1
+            if not record.get('email'):
+                record['email'] = emails[0]
+        record['social_links'] = '; '.join(socials.values()) or None
+        return record
+
+    async def enrich_all(self, records, progress_callback=None):
+        """Enrich every record concurrently, sharing one connection pool"""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.total_limit, limit_per_host=self.per_host_limit,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout, sock_connect=min(5, self.timeout))
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            done = 0
+
+            async def enrich_one(record):
+                nonlocal done
+                await self.enrich_record(session, record)
+                done += 1
+                if progress_callback:
+                    progress_callback({
+                        'stage': 'processing',
+                        'current': done,
+                        'total': len(records),
+                        'extracted': self.stats['emails_found'],
+                        'status': f"📧 Checked website {done} of {len(records)}"
+                    })
+
+            await asyncio.gather(*(enrich_one(record) for record in records))
+        return records
+
+    def enrich(self, records, progress_callback=None):
+        """Blocking entry point for enrich_all"""
+        return asyncio.run(self.enrich_all(records, progress_callback))
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+from datetime import datetime, timezone
+
+from results_store import BOOKKEEPING, FIELDS
+
+# Fixed leading columns; extra fields follow, each in its own column or together as JSON
+EXPORT_COLUMNS = FIELDS + ('query', 'fetched_at')
+
+FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'ndjson': ('.ndjson', 'application/x-ndjson'),
+}
+
+
+def export_value(value):
+    """Flatten a stored value into something every format can hold"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def export_record(record):
+    record = dict(record)
+    if record.get('fetched_at'):
+        record['fetched_at'] = datetime.fromtimestamp(record['fetched_at'], timezone.utc).isoformat()
+    return record
+
+
+def csv_chunks(records, extra_columns=None, batch_size=5000):
+    """Yield CSV text a batch of rows at a time
+
+    The header is written before any row is seen, so extra fields get columns only
+    when extra_columns names them all up front; otherwise every record's extra
+    fields are written together as JSON in a single extra column.
+    """
+    if extra_columns is not None:
+        extra_columns = [key for key in extra_columns if key not in EXPORT_COLUMNS]
+    fieldnames = list(EXPORT_COLUMNS) + (extra_columns if extra_columns is not None else ['extra'])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    rows = 0
+    for record in records:
+        row = {key: export_value(value) for key, value in export_record(record).items()}
+        if extra_columns is None:
+            extra = {key: value for key, value in record.items() if key not in EXPORT_COLUMNS and key not in BOOKKEEPING}
+            row['extra'] = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+        writer.writerow(row)
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(records, batch_size=5000):
+    """Yield newline-delimited JSON, one object per line, a batch at a time"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(export_record(record), ensure_ascii=False, default=str))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(text_chunks, level=6):
+    """Gzip a stream of text chunks without holding the whole output"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in text_chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(records, fmt='csv', compress=False, extra_columns=None):
+    """Byte chunks of records in the given format, optionally gzipped"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    chunks = csv_chunks(records, extra_columns) if fmt == 'csv' else ndjson_chunks(records)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
+
+
+def write_export(records, path, fmt='csv', compress=False, extra_columns=None):
+    """Stream records into a file, returning the number of bytes written"""
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in export_chunks(records, fmt, compress, extra_columns):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def export_store(store, fmt='csv', compress=False, directory=None, **filters):
+    """Stream the store's records into a temporary file and return its path and MIME type"""
+    suffix, mime = FORMATS[fmt]
+    if compress:
+        suffix, mime = suffix + '.gz', 'application/gzip'
+    handle, path = tempfile.mkstemp(prefix='gnp_export_', suffix=suffix, dir=directory)
+    os.close(handle)
+    write_export(store.iter_records(**filters), path, fmt, compress, store.extra_keys(**filters))
+    return path, mime
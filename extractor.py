@@ -0,0 +1,1135 @@
+import time
+import json
+import logging
+import base64
+from urllib.parse import quote_plus
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from parsing import (CLICK_LISTING_JS, FEED_CARDS_JS, FEED_LINKS_JS, PANEL_EXTRACT_JS, TAB_READY_JS,
+                     card_to_details, empty_details, is_place_payload_url, panel_to_details,
+                     parse_places_from_payload)
+from async_engine import AsyncGoogleMapsExtractor
+from driver_cache import resolve_driver, spare_drivers
+from profiles import acquire_profile_slot
+from throttle import AdaptiveRateLimiter, is_block_page
+from retry import (CLICK_FAILED, PANEL_EMPTY, SESSION_LOST, STALE_ELEMENT, UNKNOWN_ERROR,
+                   RetryPolicy, classify_failure, new_failure_stats)
+from grid_planner import parse_bbox, plan_grid, resolve_city_bbox, run_grid_extraction
+from incremental import card_place_id, diff_cards
+from run_metrics import StageTimer
+
+MAPS_SEARCH_URL = "https://www.google.com/maps/search/"
+
+FAILURE_MESSAGES = {
+    CLICK_FAILED: "❌ Failed to click listing",
+    PANEL_EMPTY: "⚠️ No data found for this listing",
+    STALE_ELEMENT: "⚠️ Listing changed while clicking it",
+    SESSION_LOST: "❌ Browser session lost and could not be restarted",
+    UNKNOWN_ERROR: "⚠️ Error while extracting listing",
+}
+
+# Configure logging to suppress unnecessary messages
+logging.getLogger('selenium').setLevel(logging.WARNING)
+logging.getLogger('urllib3').setLevel(logging.WARNING)
+
+class GoogleMapsExtractorStreamlit:
+    def __init__(self, headless=True, tabs=1, keep_spare_driver=False, profile_root=None,
+                 rate_limiter=None, retry_attempts=3, recycle_after=250, memory_limit_mb=1500):
+        """Initialize the Google Maps extractor with Chrome driver"""
+        self.options = webdriver.ChromeOptions()
+        if headless:
+            self.options.add_argument('--headless')
+        self.options.add_argument('--no-sandbox')
+        self.options.add_argument('--disable-dev-shm-usage')
+        self.options.add_argument('--disable-blink-features=AutomationControlled')
+        self.options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        self.options.add_experimental_option('useAutomationExtension', False)
+        self.options.add_argument('--log-level=3')
+        self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        self.options.add_argument('--disable-gpu')
+        self.options.add_argument('--window-size=1920,1080')
+        
+        self.driver = None
+        self.wait = None
+        self.results = []
+        # Each panel read, by the place URL it was opened from
+        self.panels_by_url = {}
+        self.stop_extraction = False
+        # Number of browser tabs used to overlap page loads within one Chrome process
+        self.tabs = max(1, int(tabs))
+        # Start a spare browser in the background so the next job begins immediately
+        self.keep_spare_driver = keep_spare_driver
+        self.driver_resolution = None
+        # Persistent per-worker profiles keep consent cookies and the HTTP cache between runs
+        self.profile_root = profile_root
+        self.profile_slot = None
+        # Paces listing opens; pass get_shared_limiter() to share one budget across workers
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        # retry_attempts counts retries, so the first attempt comes on top
+        self.retry_policy = RetryPolicy(attempts=retry_attempts + 1)
+        self.current_search_url = None
+        # Place URLs of the feed entries, in feed order; indexes refer to this list
+        self.listing_keys = []
+        # Once a driver has been recycled, listings are opened by URL rather than from the feed
+        self.direct_navigation = False
+        # Long runs recycle the browser to bound Chrome's memory growth
+        self.recycle_after = recycle_after
+        self.memory_limit_mb = memory_limit_mb
+        self.memory_check_interval = 10
+        self.listings_processed = 0
+        self.listings_since_restart = 0
+        self.started_at = time.time()
+        self.timer = StageTimer()
+        self.stats = {
+            'retries': 0,
+            'stale_retries': 0,
+            'driver_restarts': 0,
+            # Listings given up on, however many attempts each took
+            'failed': 0,
+            'failures': new_failure_stats(),
+            'driver_recycles': 0,
+            'peak_rss_mb': 0.0,
+            'rss_samples': [],
+            'stage_seconds': self.timer.seconds,
+            'cache_hits': {'spare_driver': 0},
+        }
+        
+    def initialize_driver(self):
+        """Initialize the webdriver"""
+        with self.timer.stage('browser_start'):
+            return self._initialize_driver()
+    
+    def _initialize_driver(self):
+        try:
+            if self.profile_root and not self.profile_slot:
+                self.profile_slot = acquire_profile_slot(self.profile_root)
+                if self.profile_slot:
+                    self.options.add_argument(f'--user-data-dir={self.profile_slot.path}')
+            
+            # A pre-warmed spare skips browser startup entirely
+            driver = spare_drivers.take(self.options)
+            if driver:
+                try:
+                    driver.current_url
+                    self.driver = driver
+                    self.stats['cache_hits']['spare_driver'] += 1
+                except Exception:
+                    driver = None
+            
+            if not driver:
+                # Tries the cached strategy first, then default, Service() and webdriver-manager
+                try:
+                    self.driver, self.driver_resolution = resolve_driver(self.options)
+                except ImportError:
+                    return False, "ChromeDriver not found. Please install ChromeDriver or webdriver-manager"
+                except Exception as e:
+                    return False, f"All driver initialization methods failed. Last error: {str(e)}"
+            
+            # A spare would need the profile this driver already holds locked
+            if self.keep_spare_driver and not self.profile_slot:
+                spare_drivers.prewarm(self.options)
+            
+            self.wait = WebDriverWait(self.driver, 10)
+            return True, "Driver initialized successfully"
+            
+        except Exception as e:
+            return False, f"Failed to initialize Chrome driver: {str(e)}. Please ensure Chrome browser and ChromeDriver are installed."
+    
+    def search_google_maps(self, query):
+        """Perform search on Google Maps"""
+        with self.timer.stage('search'):
+            return self._search_google_maps(query)
+    
+    def _search_google_maps(self, query):
+        try:
+            if not self.driver:
+                result = self.initialize_driver()
+                if isinstance(result, tuple):
+                    success, error = result
+                    if not success:
+                        return False, error
+                else:
+                    # Handle case where only boolean is returned
+                    if not result:
+                        return False, "Failed to initialize driver"
+            
+            # Fast path: load the results URL directly and wait only for the feed
+            if self.open_search_url(f"{MAPS_SEARCH_URL}{quote_plus(query)}"):
+                return True, "Search successful"
+            
+            # Fallback: type the query into the search box
+            self.driver.get("https://www.google.com/maps")
+            time.sleep(3)
+            
+            # Handle cookies/consent if present, unless the reused profile already has them
+            if not (self.profile_slot and self.profile_slot.consent_handled):
+                try:
+                    accept_buttons = self.driver.find_elements(By.XPATH, 
+                        "//button[contains(text(), 'Accept') or contains(text(), 'Reject') or contains(text(), 'Got it')]")
+                    if accept_buttons:
+                        accept_buttons[0].click()
+                        time.sleep(1)
+                except:
+                    pass
+            
+            # Find search box and perform search
+            search_box = self.wait.until(
+                EC.presence_of_element_located((By.ID, "searchboxinput"))
+            )
+            search_box.clear()
+            search_box.send_keys(query)
+            
+            # Click search button
+            search_button = self.driver.find_element(By.ID, "searchbox-searchbutton")
+            search_button.click()
+            
+            # Wait for results to load
+            self.wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
+            )
+            time.sleep(3)
+            
+            if self.profile_slot:
+                self.profile_slot.mark_consent_handled()
+            
+            return True, "Search successful"
+            
+        except Exception as e:
+            return False, str(e)
+
+    def search_google_maps_at(self, query, lat, lng, zoom):
+        """Search Google Maps within a fixed viewport centred on lat/lng"""
+        try:
+            if not self.driver:
+                success, error = self.initialize_driver()
+                if not success:
+                    return False, error
+
+            if self.open_search_url(f"{MAPS_SEARCH_URL}{quote_plus(query)}/@{lat:.6f},{lng:.6f},{zoom:.2f}z"):
+                return True, "Search successful"
+            return False, "Results feed did not load"
+
+        except Exception as e:
+            return False, str(e)
+
+    def open_search_url(self, url):
+        """Navigate straight to a search results URL, returning whether the feed loaded"""
+        try:
+            # Remembered so a recreated driver can return to the same results
+            self.current_search_url = url
+            self.driver.get(url)
+            
+            # Fresh profiles get redirected to consent.google.com before Maps
+            if 'consent.' in self.driver.current_url:
+                buttons = self.driver.find_elements(By.XPATH,
+                    "//button[contains(., 'Accept all') or contains(., 'Reject all')]")
+                if not buttons:
+                    return False
+                buttons[0].click()
+            
+            self.wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
+            )
+            
+            if self.profile_slot:
+                self.profile_slot.mark_consent_handled()
+            return True
+            
+        except TimeoutException:
+            return False
+
+    def extract_listing_details_from_panel(self):
+        """Extract details from the currently open detail panel
+        
+        Every field, extended ones included, is read by one script call rather than
+        a WebDriver round trip per element.
+        """
+        try:
+            time.sleep(2)
+            return panel_to_details(self.driver.execute_script(f"return ({PANEL_EXTRACT_JS})();"))
+        except Exception:
+            return empty_details()
+    
+    def _click_listing(self, index):
+        """Click a listing, letting WebDriver errors propagate for classification"""
+        if self.direct_navigation and index < len(self.listing_keys):
+            return self.open_listing_url(self.listing_keys[index])
+        if index >= len(self.listing_keys):
+            self.listing_keys = self.loaded_place_urls()
+            if index >= len(self.listing_keys):
+                return False
+        return self.click_listing_by_key(self.listing_keys[index])
+    
+    def click_listing_by_key(self, key):
+        """Click the feed entry whose place URL is key, looking it up fresh each time"""
+        # The lookup and click run in one script, so no element reference can go stale
+        # in between; a miss means the feed is mid re-render, so give it a moment
+        for attempt in range(3):
+            if attempt:
+                self.stats['stale_retries'] += 1
+                time.sleep(0.3)
+            if self.driver.execute_script(CLICK_LISTING_JS, key):
+                time.sleep(2)
+                return True
+        return False
+    
+    def open_listing_url(self, url):
+        """Load a place URL directly, returning once its title has rendered"""
+        self.driver.get(url)
+        try:
+            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="main"] h1')))
+        except TimeoutException:
+            return False
+        return True
+    
+    def loaded_place_urls(self):
+        """Return the place URLs of every listing currently rendered in the feed"""
+        loaded = self.driver.execute_script(f"return ({FEED_LINKS_JS})();") or []
+        return list(dict.fromkeys(loaded))
+    
+    def loaded_feed_cards(self):
+        """Return the URL, name and rating snippet of every card rendered in the feed"""
+        cards = self.driver.execute_script(f"return ({FEED_CARDS_JS})();") or []
+        unique = {}
+        for card in cards:
+            unique.setdefault(card['url'], card)
+        return list(unique.values())
+    
+    def refresh_listing_keys(self):
+        """Scroll for more results and append any new place URLs, keeping existing order"""
+        self.scroll_results_panel()
+        known = set(self.listing_keys)
+        new_keys = [url for url in self.loaded_place_urls() if url not in known]
+        self.listing_keys.extend(new_keys)
+        return bool(new_keys)
+    
+    def extract_listing_with_retry(self, index, progress_callback=None, total=0, extracted=0):
+        """Open and read one listing under the retry policy, returning (details, failure)"""
+        failure = None
+        for attempt in range(1, self.retry_policy.attempts + 1):
+            try:
+                if not self._click_listing(index):
+                    failure = CLICK_FAILED
+                else:
+                    if progress_callback:
+                        progress_callback({
+                            'stage': 'extracting',
+                            'current': index + 1,
+                            'total': total,
+                            'extracted': extracted,
+                            'status': "🔍 Extracting business details..."
+                        })
+                    
+                    details = self.extract_listing_details_from_panel()
+                    if details['name']:
+                        self.rate_limiter.report_success()
+                        return details, None
+                    failure = PANEL_EMPTY
+            except Exception as e:
+                failure = classify_failure(e)
+            
+            self.stats['failures'][failure] += 1
+            if failure == STALE_ELEMENT:
+                self.stats['stale_retries'] += 1
+            
+            if failure == SESSION_LOST:
+                # Recreate the browser and resume from this same listing
+                if not self.recover_session():
+                    self.stats['failed'] += 1
+                    return None, SESSION_LOST
+            elif failure in (CLICK_FAILED, PANEL_EMPTY):
+                self.report_unhealthy_page()
+            
+            if not self.retry_policy.should_retry(failure, attempt):
+                break
+            
+            self.stats['retries'] += 1
+            if progress_callback:
+                progress_callback({
+                    'stage': 'retrying',
+                    'current': index + 1,
+                    'total': total,
+                    'extracted': extracted,
+                    'status': f"🔁 Retrying listing {index + 1} ({failure.replace('_', ' ')}), attempt {attempt + 1}"
+                })
+            time.sleep(self.retry_policy.backoff(attempt, failure))
+        
+        self.stats['failed'] += 1
+        return None, failure
+    
+    def recover_session(self):
+        """Replace a dead browser; callers resume from the listing they were on"""
+        self.stats['driver_restarts'] += 1
+        return self.restart_driver()
+    
+    def restart_driver(self):
+        """Quit the browser and start a fresh one that continues from the URL list"""
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+        self.listings_since_restart = 0
+        
+        success, _ = self.initialize_driver()
+        if not success:
+            return False
+        
+        # Reloading and re-scrolling the feed would rebuild the memory we just freed,
+        # so remaining listings are opened straight from their place URLs instead
+        if self.listing_keys:
+            self.direct_navigation = True
+            return True
+        # A browser that never searched, like a review worker's, has no page to restore
+        if not self.current_search_url:
+            return True
+        return self.open_search_url(self.current_search_url)
+    
+    def browser_rss_mb(self):
+        """Resident memory of chromedriver plus every Chrome process it spawned, in MB"""
+        try:
+            import psutil
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except ImportError:
+            pass
+        except Exception:
+            return None
+        
+        # Without psutil, fall back to the page's JS heap as reported over CDP
+        try:
+            metrics = self.driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+            heap = next(m['value'] for m in metrics if m['name'] == 'JSHeapTotalSize')
+            return heap / (1024 * 1024)
+        except Exception:
+            return None
+    
+    def sample_memory(self):
+        """Record the browser's memory use for the instrumentation timeline"""
+        rss = self.browser_rss_mb()
+        if rss is not None:
+            self.stats['rss_samples'].append({
+                'elapsed': round(time.time() - self.started_at, 2),
+                'listings': self.listings_processed,
+                'rss_mb': round(rss, 1),
+            })
+            self.stats['peak_rss_mb'] = max(self.stats['peak_rss_mb'], rss)
+        return rss
+    
+    def maybe_recycle_driver(self, listings=1):
+        """Recycle the browser after too many listings or once it grows past the memory limit"""
+        previous = self.listings_processed
+        self.listings_processed += listings
+        self.listings_since_restart += listings
+        
+        rss = None
+        if self.listings_processed // self.memory_check_interval > previous // self.memory_check_interval:
+            rss = self.sample_memory()
+        
+        too_many = self.recycle_after and self.listings_since_restart >= self.recycle_after
+        too_big = self.memory_limit_mb and rss is not None and rss > self.memory_limit_mb
+        if too_many or too_big:
+            self.stats['driver_recycles'] += 1
+            return self.restart_driver()
+        return True
+    
+    def get_total_results_count(self):
+        """Get the total number of results currently loaded"""
+        try:
+            results_panel = self.driver.find_element(By.CSS_SELECTOR, 'div[role="feed"]')
+            listings = results_panel.find_elements(By.CSS_SELECTOR, 'a[href*="/maps/place/"]')
+            return len(listings)
+        except:
+            return 0
+    
+    def scroll_results_panel(self):
+        """Scroll the results panel to load more results"""
+        try:
+            results_panel = self.driver.find_element(By.CSS_SELECTOR, 'div[role="feed"]')
+            before_scroll = self.get_total_results_count()
+            self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", results_panel)
+            time.sleep(3)
+            after_scroll = self.get_total_results_count()
+            return after_scroll > before_scroll
+        except:
+            return False
+    
+    def report_unhealthy_page(self):
+        """Tell the rate limiter whether a failed listing hit a block page or was just empty"""
+        try:
+            page_text = self.driver.execute_script(
+                "return document.body ? document.body.innerText.slice(0, 3000) : '';")
+            blocked = is_block_page(self.driver.current_url, page_text)
+        except Exception:
+            blocked = False
+        
+        if blocked:
+            self.rate_limiter.report_block()
+        else:
+            self.rate_limiter.report_empty()
+        return blocked
+    
+    def collect_place_urls(self, max_results):
+        """Scroll the results feed and return up to max_results place URLs"""
+        urls = []
+        with self.timer.stage('scroll_feed'):
+            try:
+                while True:
+                    urls = self.loaded_place_urls()
+                    if len(urls) >= max_results or not self.scroll_results_panel():
+                        break
+            except Exception:
+                pass
+        return urls[:max_results]
+    
+    def collect_feed_cards(self, max_results):
+        """Scroll the results feed and return up to max_results feed cards"""
+        cards = []
+        with self.timer.stage('scroll_feed'):
+            try:
+                while True:
+                    cards = self.loaded_feed_cards()
+                    if len(cards) >= max_results or not self.scroll_results_panel():
+                        break
+            except Exception:
+                pass
+        return cards[:max_results]
+    
+    def extract_place_urls_multi_tab(self, urls, progress_callback=None, progress_offset=0, progress_total=None,
+                                     extracted_offset=0):
+        """Extract place URLs by cycling them across several tabs of one browser
+        
+        A dead browser is recreated and the URLs that were loading in its tabs are
+        requeued, so the chunk carries on; what was already extracted is always returned.
+        """
+        batch_results = []
+        total = progress_total or len(urls)
+        pending = list(urls)
+        failed_attempts = {}
+        tab_state = {}
+        feed_handle = None
+        completed = progress_offset
+        
+        def requeue(url, failure):
+            """Put a failed URL back at the end of the queue if the retry policy allows"""
+            self.stats['failures'][failure] += 1
+            failed_attempts[url] = failed_attempts.get(url, 0) + 1
+            # Requeue at the back so the retry naturally backs off behind other URLs
+            if self.retry_policy.should_retry(failure, failed_attempts[url]):
+                self.stats['retries'] += 1
+                pending.append(url)
+                return True
+            return False
+        
+        def report(details):
+            if not details:
+                self.stats['failed'] += 1
+            if not progress_callback:
+                return
+            if details:
+                progress_callback({
+                    'stage': 'success',
+                    'current': completed,
+                    'total': total,
+                    'extracted': extracted_offset + len(batch_results),
+                    'company_name': details['name'],
+                    'status': f"✅ Extracted: {details['name']}"
+                })
+            else:
+                progress_callback({
+                    'stage': 'failed',
+                    'current': completed,
+                    'total': total,
+                    'extracted': extracted_offset + len(batch_results),
+                    'status': "⚠️ No data found for this listing"
+                })
+        
+        try:
+            while (pending or any(tab_state.values())) and not self.stop_extraction:
+                handle = None
+                try:
+                    if not tab_state:
+                        feed_handle = self.driver.current_window_handle
+                        for _ in range(min(self.tabs, len(pending))):
+                            self.driver.switch_to.new_window('tab')
+                            tab_state[self.driver.current_window_handle] = None
+                    
+                    for handle, state in tab_state.items():
+                        self.driver.switch_to.window(handle)
+                        
+                        if state is None:
+                            if not pending:
+                                continue
+                            # Assigning location returns immediately, unlike driver.get,
+                            # so the other tabs keep loading while we poll this one
+                            url = pending.pop(0)
+                            self.rate_limiter.acquire()
+                            tab_state[handle] = {'url': url, 'started': time.time(), 'h1_seen': None}
+                            self.driver.execute_script(
+                                "window.__gnpPending = true; window.location.href = arguments[0];", url)
+                            continue
+                        
+                        ready = self.driver.execute_script(TAB_READY_JS)
+                        now = time.time()
+                        if ready and state['h1_seen'] is None:
+                            state['h1_seen'] = now
+                        
+                        timed_out = now - state['started'] > 15
+                        settled = ready == 'full' or (state['h1_seen'] and now - state['h1_seen'] > 1.5)
+                        if not settled and not timed_out:
+                            continue
+                        
+                        details = self.driver.execute_script(f"return ({PANEL_EXTRACT_JS})();") if ready else None
+                        if details:
+                            details = panel_to_details(details, state['url'])
+                        tab_state[handle] = None
+                        
+                        if not (details and details.get('name')):
+                            self.report_unhealthy_page()
+                            if requeue(state['url'], PANEL_EMPTY if ready else CLICK_FAILED):
+                                continue
+                            details = None
+                        
+                        completed += 1
+                        if details:
+                            batch_results.append(details)
+                            self.results.append(details)
+                            self.panels_by_url[state['url']] = details
+                            self.rate_limiter.report_success()
+                        report(details)
+                    
+                    time.sleep(0.2)
+                
+                except Exception as e:
+                    failure = classify_failure(e)
+                    if failure != SESSION_LOST:
+                        # Only the tab being polled misbehaved; its URL is retried like a failed panel
+                        state = tab_state.get(handle)
+                        if state:
+                            tab_state[handle] = None
+                            if not requeue(state['url'], failure):
+                                completed += 1
+                                report(None)
+                            continue
+                        # Failing outside any tab, e.g. while opening them, leaves nothing to retry
+                        self.stats['failures'][failure] += 1
+                        break
+                    
+                    # Every tab died with the browser: requeue what was loading and start over
+                    for state in tab_state.values():
+                        if state and not requeue(state['url'], SESSION_LOST):
+                            completed += 1
+                            report(None)
+                    tab_state = {}
+                    if not self.recover_session():
+                        break
+        
+        finally:
+            for handle in tab_state:
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                except Exception:
+                    pass
+            try:
+                if feed_handle:
+                    self.driver.switch_to.window(feed_handle)
+            except Exception:
+                pass
+        
+        return batch_results
+    
+    def extract_single_batch(self, max_results=50, progress_callback=None, urls=None):
+        """Extract a batch of results with real-time progress updates
+        
+        When urls is given only those place URLs are extracted instead of the whole feed.
+        """
+        # Baseline for the memory timeline
+        self.sample_memory()
+        
+        if self.tabs > 1:
+            batch_results = []
+            try:
+                urls = list(urls) if urls is not None else self.collect_place_urls(max_results)
+                if not urls:
+                    return [], "No listings found"
+                self.listing_keys = urls
+                
+                # Work in chunks so the browser can be recycled between them
+                chunk_size = max(self.tabs, min(self.recycle_after or len(urls), 25))
+                for start in range(0, len(urls), chunk_size):
+                    if self.stop_extraction:
+                        break
+                    chunk = urls[start:start + chunk_size]
+                    batch_results.extend(self.extract_place_urls_multi_tab(
+                        chunk, progress_callback, progress_offset=start, progress_total=len(urls),
+                        extracted_offset=len(batch_results)))
+                    
+                    if not self.maybe_recycle_driver(len(chunk)):
+                        break
+            except Exception as e:
+                return batch_results, f"Error during extraction: {str(e)}"
+            
+            if progress_callback:
+                progress_callback({
+                    'stage': 'completed',
+                    'current': len(batch_results),
+                    'total': len(batch_results),
+                    'extracted': len(batch_results),
+                    'status': f"🎉 Extraction completed! Found {len(batch_results)} results"
+                })
+            return batch_results, "Success"
+        
+        processed_keys = set()
+        consecutive_failures = 0
+        no_new_results_count = 0
+        batch_results = []
+        
+        try:
+            # Listings are addressed by place URL, so feed re-renders cannot shift the mapping
+            self.listing_keys = list(urls) if urls is not None else self.collect_place_urls(max_results)
+            if not self.listing_keys:
+                return batch_results, "No listings found"
+            
+            # Process listings
+            i = 0
+            while i < min(len(self.listing_keys), max_results):
+                if self.stop_extraction:
+                    break
+                
+                total = min(len(self.listing_keys), max_results)
+                if self.listing_keys[i] in processed_keys:
+                    i += 1
+                    continue
+                
+                self.rate_limiter.acquire()
+                
+                # Update progress before processing
+                if progress_callback:
+                    progress_callback({
+                        'stage': 'processing',
+                        'current': i + 1,
+                        'total': total,
+                        'extracted': len(batch_results),
+                        'status': f"Processing listing {i + 1} of {total}..."
+                    })
+                
+                details, failure = self.extract_listing_with_retry(
+                    i, progress_callback, total, len(batch_results))
+                
+                if details:
+                    batch_results.append(details)
+                    self.results.append(details)  # Store in instance for progress tracking
+                    self.panels_by_url[self.listing_keys[i]] = details
+                    processed_keys.add(self.listing_keys[i])
+                    consecutive_failures = 0
+                    
+                    # Show success with company name
+                    if progress_callback:
+                        progress_callback({
+                            'stage': 'success',
+                            'current': i + 1,
+                            'total': total,
+                            'extracted': len(batch_results),
+                            'company_name': details['name'],
+                            'status': f"✅ Extracted: {details['name']}"
+                        })
+                else:
+                    consecutive_failures += 1
+                    if progress_callback:
+                        progress_callback({
+                            'stage': 'error' if failure == SESSION_LOST else 'failed',
+                            'current': i + 1,
+                            'total': total,
+                            'extracted': len(batch_results),
+                            'status': FAILURE_MESSAGES.get(failure, "⚠️ No data found for this listing")
+                        })
+                    
+                    # The browser could not be recreated, nothing more can be extracted
+                    if failure == SESSION_LOST:
+                        break
+                
+                # If too many failures, try scrolling (a given URL list has nothing more to load)
+                if consecutive_failures > 3 and urls is None:
+                    if progress_callback:
+                        progress_callback({
+                            'stage': 'scrolling',
+                            'current': i + 1,
+                            'total': total,
+                            'extracted': len(batch_results),
+                            'status': "📜 Loading more results..."
+                        })
+                    
+                    if not self.refresh_listing_keys():
+                        no_new_results_count += 1
+                    else:
+                        no_new_results_count = 0
+                    consecutive_failures = 0
+                
+                if no_new_results_count > 2:
+                    break
+                
+                if not self.maybe_recycle_driver():
+                    break
+                
+                i += 1
+                
+        except Exception as e:
+            return batch_results, f"Error during extraction: {str(e)}"
+        
+        # Final progress update
+        if progress_callback:
+            progress_callback({
+                'stage': 'completed',
+                'current': len(batch_results),
+                'total': len(batch_results),
+                'extracted': len(batch_results),
+                'status': f"🎉 Extraction completed! Found {len(batch_results)} results"
+            })
+        
+        return batch_results, "Success"
+    
+    def close(self):
+        """Close the browser"""
+        try:
+            if self.driver:
+                self.driver.quit()
+        except:
+            pass
+        finally:
+            # Chrome has flushed the profile once quit() returns, so it can be handed on
+            if self.profile_slot:
+                self.profile_slot.release()
+                self.profile_slot = None
+
+class GoogleMapsNetworkExtractor(GoogleMapsExtractorStreamlit):
+    """Extractor that reads place data from intercepted Maps XHR responses"""
+
+    def __init__(self, headless=True, **kwargs):
+        super().__init__(headless=headless, **kwargs)
+        # Performance logs expose Network.* events so we can fetch response bodies
+        self.options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        self.seen_places = set()
+
+    def collect_network_records(self):
+        """Drain the performance log and parse any place payloads in it"""
+        records = []
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            return records
+
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+                if message.get('method') != 'Network.responseReceived':
+                    continue
+                params = message.get('params', {})
+                if not is_place_payload_url(params.get('response', {}).get('url')):
+                    continue
+
+                response = self.driver.execute_cdp_cmd(
+                    'Network.getResponseBody', {'requestId': params['requestId']})
+                body = response.get('body', '')
+                if response.get('base64Encoded'):
+                    body = base64.b64decode(body).decode('utf-8', errors='ignore')
+
+                for key, details in parse_places_from_payload(body):
+                    if key in self.seen_places or not details['name']:
+                        continue
+                    self.seen_places.add(key)
+                    records.append(details)
+            except Exception:
+                # Bodies of evicted or redirected requests are no longer available
+                continue
+        return records
+
+    def extract_single_batch(self, max_results=50, progress_callback=None, urls=None):
+        """Extract results from captured XHR payloads without clicking listings"""
+        # Specific places are opened individually; payload capture only pays off for whole feeds
+        if urls is not None:
+            return super().extract_single_batch(max_results, progress_callback, urls)
+        
+        batch_results = []
+        no_new_results_count = 0
+
+        try:
+            while len(batch_results) < max_results and not self.stop_extraction:
+                new_records = self.collect_network_records()
+                for details in new_records[:max_results - len(batch_results)]:
+                    batch_results.append(details)
+                    self.results.append(details)
+
+                    if progress_callback:
+                        progress_callback({
+                            'stage': 'success',
+                            'current': len(batch_results),
+                            'total': max_results,
+                            'extracted': len(batch_results),
+                            'company_name': details['name'],
+                            'status': f"✅ Extracted: {details['name']}"
+                        })
+
+                if len(batch_results) >= max_results:
+                    break
+
+                if progress_callback:
+                    progress_callback({
+                        'stage': 'scrolling',
+                        'current': len(batch_results),
+                        'total': max_results,
+                        'extracted': len(batch_results),
+                        'status': "📜 Loading more results..."
+                    })
+
+                # Each scroll triggers a search XHR, so it is what the limiter paces here
+                self.rate_limiter.acquire()
+                if self.scroll_results_panel() or new_records:
+                    no_new_results_count = 0
+                    self.rate_limiter.report_success()
+                else:
+                    no_new_results_count += 1
+                    self.report_unhealthy_page()
+                if no_new_results_count > 2:
+                    break
+
+        except Exception as e:
+            return batch_results, f"Error during extraction: {str(e)}"
+
+        # Payload layout changed or nothing was captured, fall back to clicking listings
+        if not batch_results and not self.stop_extraction:
+            return super().extract_single_batch(max_results, progress_callback)
+
+        if progress_callback:
+            progress_callback({
+                'stage': 'completed',
+                'current': len(batch_results),
+                'total': len(batch_results),
+                'extracted': len(batch_results),
+                'status': f"🎉 Extraction completed! Found {len(batch_results)} results"
+            })
+
+        return batch_results, "Success"
+
+class GoogleMapsFastListExtractor(GoogleMapsExtractorStreamlit):
+    """Extractor that reads fields straight off the feed cards, opening panels only to fill gaps"""
+
+    def __init__(self, headless=True, fill_fields=('phone',), **kwargs):
+        super().__init__(headless=headless, **kwargs)
+        # Fields worth a detail panel open when the card did not show them
+        self.fill_fields = tuple(fill_fields or ())
+
+    def extract_single_batch(self, max_results=50, progress_callback=None, urls=None):
+        """Extract results from feed cards, opening detail panels only for missing fields
+        
+        When urls is given, only those places are returned: from the cards already loaded
+        in the feed where possible, otherwise from their detail panels.
+        """
+        try:
+            if urls is None:
+                # One script call per scroll reads every card loaded so far
+                cards = self.collect_feed_cards(max_results)
+            else:
+                wanted = set(urls)
+                cards = [card for card in self.loaded_feed_cards() if card['url'] in wanted]
+        except Exception as e:
+            if urls is not None:
+                return super().extract_single_batch(max_results, progress_callback, urls)
+            return [], f"Error during extraction: {str(e)}"
+        if not cards and not urls:
+            return [], "No listings found"
+
+        batch_results = [card_to_details(card) for card in cards]
+        self.results.extend(batch_results)
+
+        incomplete = [card['url'] for card, details in zip(cards, batch_results)
+                      if any(not details.get(field) for field in self.fill_fields)]
+        # Requested places that are not on the feed can only come from their panels
+        on_feed = {card['url'] for card in cards}
+        missing = [url for url in urls or () if url not in on_feed]
+        if progress_callback:
+            progress_callback({
+                'stage': 'found_results',
+                'current': len(cards) - len(incomplete),
+                'total': len(cards),
+                'extracted': len(batch_results),
+                'status': f"⚡ Read {len(cards)} listings from the feed, {len(incomplete)} need their details panel"
+            })
+
+        message = "Success"
+        if (incomplete or missing) and not self.stop_extraction:
+            panel_urls = incomplete + missing
+            for url in panel_urls:
+                self.panels_by_url.pop(url, None)
+            _, message = super().extract_single_batch(len(panel_urls), progress_callback, urls=panel_urls)
+            # Panels are matched to their cards by the URL they were opened from,
+            # which holds even when the panel reports a different place ID or name
+            cards_by_url = {card['url']: details for card, details in zip(cards, batch_results)}
+            merged = set()
+            for url in panel_urls:
+                panel = self.panels_by_url.get(url)
+                if not panel:
+                    continue
+                details = cards_by_url.get(url)
+                if details is None:
+                    batch_results.append(panel)
+                    continue
+                for field, value in panel.items():
+                    if value and not details.get(field):
+                        details[field] = value
+                merged.add(id(panel))
+            # The card already stands for a merged panel in the instance's running results
+            if merged:
+                self.results = [details for details in self.results if id(details) not in merged]
+
+        if progress_callback:
+            progress_callback({
+                'stage': 'completed',
+                'current': len(batch_results),
+                'total': len(batch_results),
+                'extracted': len(batch_results),
+                'status': f"🎉 Extraction completed! Found {len(batch_results)} results"
+            })
+
+        return batch_results, message
+
+EXTRACTION_BACKENDS = {
+    "DOM (click listings)": GoogleMapsExtractorStreamlit,
+    "Network (intercept XHR)": GoogleMapsNetworkExtractor,
+    "Fast list (feed cards)": GoogleMapsFastListExtractor,
+    "Async (concurrent CDP tabs)": AsyncGoogleMapsExtractor,
+}
+
+def run_extraction_batch(extractor, query, max_results, progress_callback=None):
+    """Run extraction in a separate function with progress updates"""
+    try:
+        if progress_callback:
+            progress_callback({
+                'stage': 'searching',
+                'current': 0,
+                'total': max_results,
+                'extracted': 0,
+                'status': "🔍 Searching Google Maps..."
+            })
+        
+        success, message = extractor.search_google_maps(query)
+        if not success:
+            return [], f"Search failed: {message}"
+        
+        if progress_callback:
+            progress_callback({
+                'stage': 'found_results',
+                'current': 0,
+                'total': max_results,
+                'extracted': 0,
+                'status': "📋 Found search results, starting extraction..."
+            })
+        
+        with extractor.timer.stage('extract'):
+            results, message = extractor.extract_single_batch(max_results, progress_callback)
+        return results, message
+        
+    except Exception as e:
+        return [], f"Extraction failed: {str(e)}"
+    finally:
+        extractor.close()
+
+def run_incremental_batch(extractor, query, lookup_records, max_results, progress_callback=None):
+    """Re-run a query, opening only listings that are new or changed since they were stored
+
+    lookup_records(place_ids) returns the stored records for the harvested cards, so
+    only those are read rather than the whole dataset.
+    """
+    try:
+        if progress_callback:
+            progress_callback({
+                'stage': 'searching',
+                'current': 0,
+                'total': max_results,
+                'extracted': 0,
+                'status': "🔍 Searching Google Maps..."
+            })
+        
+        success, message = extractor.search_google_maps(query)
+        if not success:
+            return [], f"Search failed: {message}", {}
+        
+        # One script call per scroll reads every card's rating and review snippet
+        cards = extractor.collect_feed_cards(max_results)
+        if not cards:
+            return [], "No listings found", {}
+        
+        place_ids = [card_place_id(card) for card in cards]
+        new, changed, unchanged = diff_cards(cards, lookup_records([place_id for place_id in place_ids if place_id]))
+        stats = {'cards': len(cards), 'new': len(new), 'changed': len(changed), 'unchanged': len(unchanged)}
+        if progress_callback:
+            progress_callback({
+                'stage': 'found_results',
+                'current': 0,
+                'total': len(new) + len(changed),
+                'extracted': 0,
+                'status': f"📋 {len(new)} new and {len(changed)} changed of {len(cards)} listings"
+            })
+        
+        stale = {card['url'] for card in new + changed}
+        urls = [card['url'] for card in cards if card['url'] in stale]
+        if not urls:
+            return [], "No new or changed listings", stats
+        
+        with extractor.timer.stage('extract'):
+            results, message = extractor.extract_single_batch(len(urls), progress_callback, urls=urls)
+        return results, message, stats
+        
+    except Exception as e:
+        return [], f"Extraction failed: {str(e)}", {}
+    finally:
+        extractor.close()
+
+def run_grid_extraction_batch(extractor_class, query, area, rows, cols, workers, max_results,
+                              progress_callback=None, **extractor_options):
+    """Cover a city or bounding box with per-tile searches to get past the result cap
+
+    Returns the results, a status message and the tile and extractor stats of the run.
+    """
+    # Tile searches navigate to @lat,lng,zoom URLs, which only the Selenium backends support
+    if not hasattr(extractor_class, 'search_google_maps_at'):
+        extractor_class = GoogleMapsExtractorStreamlit
+    
+    bbox = parse_bbox(area)
+    if bbox is None:
+        if progress_callback:
+            progress_callback({
+                'stage': 'searching',
+                'current': 0,
+                'total': max_results,
+                'extracted': 0,
+                'status': f"🗺️ Locating {area} on Google Maps..."
+            })
+        locator = extractor_class(**extractor_options)
+        try:
+            bbox = resolve_city_bbox(locator, area)
+        finally:
+            locator.close()
+    if bbox is None:
+        return [], f"Could not resolve area: {area}", {}
+    
+    tiles = plan_grid(*bbox, rows=rows, cols=cols)
+    results, stats = run_grid_extraction(
+        lambda: extractor_class(**extractor_options),
+        query,
+        tiles,
+        workers=workers,
+        max_results=max_results,
+        progress_callback=progress_callback
+    )
+    return results, f"Searched {stats['tiles_done']} tiles ({stats['subdivided']} subdivided)", stats
@@ -0,0 +1,232 @@
+import math
+import queue
+import re
+import threading
+import time
+from urllib.parse import quote_plus
+
+from parsing import place_id_from_url
+from workers import aggregate_worker_stats
+
+# A single Maps search stops loading the feed at roughly this many results
+MAX_RESULTS_PER_SEARCH = 120
+
+# Viewport used by the extractor's Chrome window (--window-size=1920,1080)
+VIEWPORT_WIDTH = 1920
+VIEWPORT_HEIGHT = 1080
+
+
+class Tile:
+    """A rectangular search area expressed as a bounding box in degrees"""
+
+    def __init__(self, south, west, north, east, depth=0):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.depth = depth
+
+    def __repr__(self):
+        return f"Tile({self.south:.4f}, {self.west:.4f}, {self.north:.4f}, {self.east:.4f}, depth={self.depth})"
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def zoom(self):
+        """Smallest Maps zoom level whose viewport still covers the whole tile"""
+        lat, _ = self.center
+        lng_span = max(self.east - self.west, 1e-6)
+        # Web Mercator: 256px tiles, latitude span shrinks by cos(lat)
+        lat_span = max(self.north - self.south, 1e-6) / max(math.cos(math.radians(lat)), 0.01)
+        zoom_lng = math.log2(360 * VIEWPORT_WIDTH / (256 * lng_span))
+        zoom_lat = math.log2(360 * VIEWPORT_HEIGHT / (256 * lat_span))
+        return max(3.0, min(21.0, min(zoom_lng, zoom_lat)))
+
+    def split(self):
+        """Subdivide the tile into four equal quadrants one level deeper"""
+        lat, lng = self.center
+        return [
+            Tile(self.south, self.west, lat, lng, self.depth + 1),
+            Tile(self.south, lng, lat, self.east, self.depth + 1),
+            Tile(lat, self.west, self.north, lng, self.depth + 1),
+            Tile(lat, lng, self.north, self.east, self.depth + 1),
+        ]
+
+
+def plan_grid(south, west, north, east, rows=3, cols=3):
+    """Split a bounding box into a rows x cols grid of tiles"""
+    lat_step = (north - south) / rows
+    lng_step = (east - west) / cols
+    return [
+        Tile(south + r * lat_step, west + c * lng_step, south + (r + 1) * lat_step, west + (c + 1) * lng_step)
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def parse_bbox(text):
+    """Parse a 'south,west,north,east' string into a bounding box tuple"""
+    try:
+        south, west, north, east = (float(part) for part in text.split(','))
+    except ValueError:
+        return None
+    if south >= north or west >= east:
+        return None
+    return south, west, north, east
+
+
+def bbox_from_viewport(lat, lng, zoom):
+    """Approximate the bounding box visible in the browser at a given centre and zoom"""
+    lng_span = 360 * VIEWPORT_WIDTH / (256 * 2 ** zoom)
+    lat_span = 360 * VIEWPORT_HEIGHT / (256 * 2 ** zoom) * math.cos(math.radians(lat))
+    return lat - lat_span / 2, lng - lng_span / 2, lat + lat_span / 2, lng + lng_span / 2
+
+
+def resolve_city_bbox(extractor, city, timeout=15):
+    """Use Maps itself to find the bounding box it frames for a city name"""
+    if not extractor.driver:
+        success, _ = extractor.initialize_driver()
+        if not success:
+            return None
+
+    extractor.driver.get(f"https://www.google.com/maps/place/{quote_plus(city)}")
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        # Maps rewrites the URL to /@lat,lng,zoomz once it has framed the place
+        match = re.search(r'@(-?[\d.]+),(-?[\d.]+),([\d.]+)z', extractor.driver.current_url)
+        if match:
+            lat, lng, zoom = (float(group) for group in match.groups())
+            return bbox_from_viewport(lat, lng, zoom)
+        time.sleep(0.5)
+    return None
+
+
+def run_grid_extraction(extractor_factory, query, tiles, per_tile_results=MAX_RESULTS_PER_SEARCH,
+                        workers=3, max_depth=2, max_results=None, progress_callback=None):
+    """Search every tile in parallel, subdividing dense tiles and deduplicating by place ID"""
+    pending = queue.Queue()
+    for tile in tiles:
+        pending.put(tile)
+
+    lock = threading.Lock()
+    seen_places = set()
+    results = []
+    stats = {'tiles_done': 0, 'tiles_total': len(tiles), 'subdivided': 0, 'duplicates': 0}
+    stop = threading.Event()
+    extractors = []
+
+    def halt():
+        """Stop the workers, including any tile extraction they are in the middle of"""
+        stop.set()
+        for extractor in list(extractors):
+            extractor.stop_extraction = True
+
+    def worker():
+        extractor = extractor_factory()
+        with lock:
+            extractors.append(extractor)
+            if stop.is_set():
+                extractor.stop_extraction = True
+        # Each worker closes its own browser, so none is closed while a thread still drives it
+        try:
+            while not stop.is_set():
+                try:
+                    tile = pending.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    lat, lng = tile.center
+                    success, _ = extractor.search_google_maps_at(query, lat, lng, tile.zoom)
+                    urls = extractor.collect_place_urls(per_tile_results) if success else []
+
+                    # Places are claimed before their panels are opened, so overlapping
+                    # tiles skip listings another tile already has instead of reopening them
+                    with lock:
+                        claimed = set()
+                        fresh = []
+                        for url in urls:
+                            key = place_id_from_url(url) or url
+                            if key in seen_places:
+                                stats['duplicates'] += 1
+                                continue
+                            seen_places.add(key)
+                            claimed.add(key)
+                            fresh.append(url)
+
+                    batch = extractor.extract_single_batch(len(fresh), urls=fresh)[0] if fresh else []
+
+                    with lock:
+                        for details in batch:
+                            key = details.get('place_id') or (details.get('name'), details.get('address'))
+                            if key in seen_places and key not in claimed:
+                                stats['duplicates'] += 1
+                                continue
+                            seen_places.add(key)
+                            results.append(details)
+
+                        # A tile whose feed reached the cap probably hides more places,
+                        # however many of its listings were new or extracted cleanly
+                        if len(urls) >= per_tile_results and tile.depth < max_depth:
+                            children = tile.split()
+                            stats['subdivided'] += 1
+                            stats['tiles_total'] += len(children)
+                            for child in children:
+                                pending.put(child)
+
+                        stats['tiles_done'] += 1
+                        if max_results and len(results) >= max_results:
+                            halt()
+                except Exception:
+                    with lock:
+                        stats['tiles_done'] += 1
+                finally:
+                    pending.task_done()
+        finally:
+            extractor.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+
+    # Progress is reported from the calling thread, Streamlit elements are not thread-safe
+    try:
+        while not stop.is_set():
+            with lock:
+                done, total, extracted = stats['tiles_done'], stats['tiles_total'], len(results)
+            if progress_callback:
+                progress_callback({
+                    'stage': 'processing',
+                    'current': done,
+                    'total': total,
+                    'extracted': extracted,
+                    'status': f"🗺️ Searched {done} of {total} tiles, {extracted} unique places"
+                })
+            if done >= total:
+                break
+            time.sleep(1)
+    finally:
+        halt()
+        for thread in threads:
+            thread.join(timeout=60)
+
+    if max_results:
+        results = results[:max_results]
+
+    # Extractor counters summed over the tile workers, in the shape process-pool runs report
+    extractor_stats = aggregate_worker_stats([extractor.stats for extractor in extractors])
+    del extractor_stats['workers']
+    stats.update(extractor_stats, records=len(results))
+
+    if progress_callback:
+        progress_callback({
+            'stage': 'completed',
+            'current': len(results),
+            'total': len(results),
+            'extracted': len(results),
+            'status': f"🎉 Grid search completed! Found {len(results)} unique results "
+                      f"({stats['duplicates']} duplicates skipped)"
+        })
+
+    return results, stats
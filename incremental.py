@@ -0,0 +1,70 @@
+import re
+
+from parsing import place_id_from_url
+
+
+def normalize_rating(value):
+    """Rating as a float rounded to one decimal, or None if it cannot be read"""
+    try:
+        return round(float(str(value).replace(',', '.')), 1)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_count(value):
+    """Review count as an int, ignoring thousands separators"""
+    digits = re.sub(r'\D', '', str(value or ''))
+    return int(digits) if digits else None
+
+
+def record_key(record):
+    """Place ID, falling back to the lowercased name for records without one"""
+    return record.get('place_id') or (record.get('name') or '').strip().lower()
+
+
+def index_records(records):
+    """Index stored records by record_key"""
+    index = {}
+    for record in records:
+        key = record_key(record)
+        if key:
+            index[key] = record
+    return index
+
+
+def card_place_id(card):
+    """The place ID a feed card would be stored under"""
+    return card.get('place_id') or place_id_from_url(card.get('url'))
+
+
+def find_stored(card, index):
+    place_id = card_place_id(card)
+    if place_id and place_id in index:
+        return index[place_id]
+    return index.get((card.get('name') or '').strip().lower())
+
+
+def card_changed(card, stored):
+    """Whether the rating or review count on a feed card differs from the stored record"""
+    # A snippet the card did not render tells us nothing, so only shown values are compared
+    rating = normalize_rating(card.get('rating'))
+    if rating is not None and rating != normalize_rating(stored.get('rating')):
+        return True
+    reviews = normalize_count(card.get('reviews_count'))
+    return reviews is not None and reviews != normalize_count(stored.get('reviews_count'))
+
+
+def diff_cards(cards, stored_records):
+    """Split feed cards into new, changed and unchanged places against a stored dataset"""
+    index = index_records(stored_records)
+    new, changed, unchanged = [], [], []
+    for card in cards:
+        stored = find_stored(card, index)
+        if stored is None:
+            new.append(card)
+        elif card_changed(card, stored):
+            changed.append(card)
+        else:
+            unchanged.append(card)
+    return new, changed, unchanged
+
@@ -1,548 +1,80 @@
-import streamlit as st
 import time
-import re
-import csv
-import pandas as pd
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import logging
-import base64
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
 
-# Configure logging to suppress unnecessary messages
-logging.getLogger('selenium').setLevel(logging.WARNING)
-logging.getLogger('urllib3').setLevel(logging.WARNING)
+# Measure our own import cost so cold-start regressions show up in System Status
+_IMPORT_STARTED = time.perf_counter()
 
-class GoogleMapsExtractorStreamlit:
-    def __init__(self, headless=True):
-        """Initialize the Google Maps extractor with Chrome driver"""
-        self.options = webdriver.ChromeOptions()
-        if headless:
-            self.options.add_argument('--headless')
-        self.options.add_argument('--no-sandbox')
-        self.options.add_argument('--disable-dev-shm-usage')
-        self.options.add_argument('--disable-blink-features=AutomationControlled')
-        self.options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        self.options.add_experimental_option('useAutomationExtension', False)
-        self.options.add_argument('--log-level=3')
-        self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920,1080')
-        
-        self.driver = None
-        self.wait = None
-        self.results = []
-        self.stop_extraction = False
-        
-    def initialize_driver(self):
-        """Initialize the webdriver"""
-        try:
-            # Try multiple approaches to initialize Chrome driver
-            try:
-                # Method 1: Direct Chrome initialization
-                self.driver = webdriver.Chrome(options=self.options)
-            except Exception as e1:
-                try:
-                    # Method 2: Try with explicit executable path
-                    from selenium.webdriver.chrome.service import Service
-                    service = Service()
-                    self.driver = webdriver.Chrome(service=service, options=self.options)
-                except Exception as e2:
-                    try:
-                        # Method 3: Try with webdriver-manager if available
-                        from webdriver_manager.chrome import ChromeDriverManager
-                        from selenium.webdriver.chrome.service import Service
-                        service = Service(ChromeDriverManager().install())
-                        self.driver = webdriver.Chrome(service=service, options=self.options)
-                    except ImportError:
-                        return False, "ChromeDriver not found. Please install ChromeDriver or webdriver-manager"
-                    except Exception as e3:
-                        return False, f"All driver initialization methods failed. Last error: {str(e3)}"
-            
-            self.wait = WebDriverWait(self.driver, 10)
-            return True, "Driver initialized successfully"
-            
-        except Exception as e:
-            return False, f"Failed to initialize Chrome driver: {str(e)}. Please ensure Chrome browser and ChromeDriver are installed."
-    
-    def search_google_maps(self, query):
-        """Perform search on Google Maps"""
-        try:
-            if not self.driver:
-                result = self.initialize_driver()
-                if isinstance(result, tuple):
-                    success, error = result
-                    if not success:
-                        return False, error
-                else:
-                    # Handle case where only boolean is returned
-                    if not result:
-                        return False, "Failed to initialize driver"
-            
-            # Navigate to Google Maps
-            self.driver.get("https://www.google.com/maps")
-            time.sleep(3)
-            
-            # Handle cookies/consent if present
-            try:
-                accept_buttons = self.driver.find_elements(By.XPATH, 
-                    "//button[contains(text(), 'Accept') or contains(text(), 'Reject') or contains(text(), 'Got it')]")
-                if accept_buttons:
-                    accept_buttons[0].click()
-                    time.sleep(1)
-            except:
-                pass
-            
-            # Find search box and perform search
-            search_box = self.wait.until(
-                EC.presence_of_element_located((By.ID, "searchboxinput"))
-            )
-            search_box.clear()
-            search_box.send_keys(query)
-            
-            # Click search button
-            search_button = self.driver.find_element(By.ID, "searchbox-searchbutton")
-            search_button.click()
-            
-            # Wait for results to load
-            self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
-            )
-            time.sleep(3)
-            
-            return True, "Search successful"
-            
-        except Exception as e:
-            return False, str(e)
-    
-    def extract_phone_from_text(self, text):
-        """Extract phone numbers from text using regex"""
-        if not text:
-            return None
-            
-        text = text.strip()
-        
-        phone_patterns = [
-            r'[\+]?[(]?[0-9]{1,3}[)]?[-\s\.]?[(]?[0-9]{1,4}[)]?[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,9}',
-            r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-            r'\b\d{10}\b'
-        ]
-        
-        for pattern in phone_patterns:
-            phones = re.findall(pattern, text)
-            if phones:
-                phone = phones[0].strip()
-                if len(phone) >= 10:
-                    return phone
-        return None
-    
-    def extract_listing_details_from_panel(self):
-        """Extract details from the currently open detail panel"""
-        details = {
-            'name': None,
-            'phone': None,
-            'email': None,
-            'website': None,
-            'address': None,
-            'rating': None,
-            'reviews_count': None,
-            'category': None
-        }
-        
-        try:
-            time.sleep(2)
-            
-            # Extract name
-            name_selectors = [
-                'h1.DUwDvf.fontHeadlineLarge',
-                'h1[class*="fontHeadlineLarge"]',
-                'h1.DUwDvf',
-                '[role="main"] h1'
-            ]
-            
-            for selector in name_selectors:
-                try:
-                    name_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if name_element and name_element.text:
-                        details['name'] = name_element.text.strip()
-                        break
-                except:
-                    continue
-            
-            # Extract category/type
-            try:
-                category_element = self.driver.find_element(By.CSS_SELECTOR, 
-                    'button[jsaction*="category"] .DkEaL')
-                details['category'] = category_element.text.strip()
-            except:
-                pass
-            
-            # Extract info from buttons
-            info_buttons = self.driver.find_elements(By.CSS_SELECTOR, 
-                'button[data-item-id], button[data-tooltip], a[data-item-id]')
-            
-            for button in info_buttons:
-                try:
-                    item_id = button.get_attribute('data-item-id') or ''
-                    aria_label = button.get_attribute('aria-label') or ''
-                    text = button.text or ''
-                    
-                    # Phone extraction
-                    if 'phone' in item_id.lower() or 'phone' in aria_label.lower():
-                        if aria_label and ':' in aria_label:
-                            phone_text = aria_label.split(':', 1)[1].strip()
-                            details['phone'] = phone_text
-                        elif text:
-                            phone = self.extract_phone_from_text(text)
-                            if phone:
-                                details['phone'] = phone
-                    
-                    # Website extraction
-                    elif 'website' in item_id.lower() or 'website' in aria_label.lower():
-                        if text and ('.' in text or 'http' in text.lower()):
-                            details['website'] = text.strip()
-                    
-                    # Address extraction
-                    elif 'address' in item_id.lower() or 'address' in aria_label.lower():
-                        if aria_label and ':' in aria_label:
-                            details['address'] = aria_label.split(':', 1)[1].strip()
-                        elif text:
-                            details['address'] = text.strip()
-                            
-                except:
-                    continue
-            
-            # Try alternative selectors for missing data
-            if not details['phone']:
-                try:
-                    phone_links = self.driver.find_elements(By.CSS_SELECTOR, 'a[href^="tel:"]')
-                    if phone_links:
-                        phone_href = phone_links[0].get_attribute('href')
-                        details['phone'] = phone_href.replace('tel:', '').strip()
-                except:
-                    pass
-            
-            # Extract rating and reviews
-            try:
-                rating_element = self.driver.find_element(By.CSS_SELECTOR, 
-                    'span[role="img"][aria-label*="stars"], span.MW4etd')
-                rating_text = rating_element.get_attribute('aria-label') or rating_element.text
-                if rating_text:
-                    rating_match = re.search(r'([\d.]+)', rating_text)
-                    if rating_match:
-                        details['rating'] = rating_match.group(1)
-            except:
-                pass
-            
-            # Extract reviews count
-            try:
-                reviews_element = self.driver.find_element(By.CSS_SELECTOR, 
-                    'span.UY7F9 button span[aria-label*="reviews"]')
-                reviews_text = reviews_element.get_attribute('aria-label')
-                if reviews_text:
-                    reviews_match = re.search(r'([\d,]+)', reviews_text)
-                    if reviews_match:
-                        details['reviews_count'] = reviews_match.group(1)
-            except:
-                pass
-            
-            # Extract email
-            try:
-                panel = self.driver.find_element(By.CSS_SELECTOR, 'div[role="main"]')
-                panel_text = panel.text
-                email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                emails = re.findall(email_pattern, panel_text)
-                if emails:
-                    details['email'] = emails[0]
-            except:
-                pass
-            
-        except Exception as e:
-            pass
-        
-        return details
-    
-    def click_listing_by_index(self, index):
-        """Click on a specific listing by index"""
-        try:
-            results_panel = self.driver.find_element(By.CSS_SELECTOR, 'div[role="feed"]')
-            listings = results_panel.find_elements(By.CSS_SELECTOR, 'a[href*="/maps/place/"]')
-            
-            if index >= len(listings):
-                return False
-            
-            listing = listings[index]
-            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", listing)
-            time.sleep(1)
-            self.driver.execute_script("arguments[0].click();", listing)
-            time.sleep(2)
-            
-            return True
-            
-        except Exception as e:
-            return False
-    
-    def get_total_results_count(self):
-        """Get the total number of results currently loaded"""
-        try:
-            results_panel = self.driver.find_element(By.CSS_SELECTOR, 'div[role="feed"]')
-            listings = results_panel.find_elements(By.CSS_SELECTOR, 'a[href*="/maps/place/"]')
-            return len(listings)
-        except:
-            return 0
-    
-    def scroll_results_panel(self):
-        """Scroll the results panel to load more results"""
-        try:
-            results_panel = self.driver.find_element(By.CSS_SELECTOR, 'div[role="feed"]')
-            before_scroll = self.get_total_results_count()
-            self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", results_panel)
-            time.sleep(3)
-            after_scroll = self.get_total_results_count()
-            return after_scroll > before_scroll
-        except:
-            return False
-    
-    def extract_single_batch(self, max_results=50, progress_callback=None):
-        """Extract a batch of results with real-time progress updates"""
-        processed_indices = set()
-        consecutive_failures = 0
-        no_new_results_count = 0
-        batch_results = []
-        
-        try:
-            # Get initial results
-            total_listings = self.get_total_results_count()
-            while total_listings < max_results:
-                 if not self.scroll_results_panel():
-                    break
-                 total_listings = self.get_total_results_count()
-                
-            if total_listings == 0:
-                return batch_results, "No listings found"
-            
-            # Process listings
-            for i in range(min(total_listings, max_results)):
-                if self.stop_extraction:
-                    break
-                    
-                if i in processed_indices:
-                    continue
-                
-                # Update progress before processing
-                if progress_callback:
-                    progress_callback({
-                        'stage': 'processing',
-                        'current': i + 1,
-                        'total': min(total_listings, max_results),
-                        'extracted': len(batch_results),
-                        'status': f"Processing listing {i + 1} of {min(total_listings, max_results)}..."
-                    })
-                
-                try:
-                    if self.click_listing_by_index(i):
-                        # Show extracting status
-                        if progress_callback:
-                            progress_callback({
-                                'stage': 'extracting',
-                                'current': i + 1,
-                                'total': min(total_listings, max_results),
-                                'extracted': len(batch_results),
-                                'status': "🔍 Extracting business details..."
-                            })
-                        
-                        details = self.extract_listing_details_from_panel()
-                        
-                        if details['name']:
-                            batch_results.append(details)
-                            self.results.append(details)  # Store in instance for progress tracking
-                            processed_indices.add(i)
-                            consecutive_failures = 0
-                            
-                            # Show success with company name
-                            if progress_callback:
-                                progress_callback({
-                                    'stage': 'success',
-                                    'current': i + 1,
-                                    'total': min(total_listings, max_results),
-                                    'extracted': len(batch_results),
-                                    'company_name': details['name'],
-                                    'status': f"✅ Extracted: {details['name']}"
-                                })
-                        else:
-                            consecutive_failures += 1
-                            if progress_callback:
-                                progress_callback({
-                                    'stage': 'failed',
-                                    'current': i + 1,
-                                    'total': min(total_listings, max_results),
-                                    'extracted': len(batch_results),
-                                    'status': "⚠️ No data found for this listing"
-                                })
-                    else:
-                        consecutive_failures += 1
-                        if progress_callback:
-                            progress_callback({
-                                'stage': 'failed',
-                                'current': i + 1,
-                                'total': min(total_listings, max_results),
-                                'extracted': len(batch_results),
-                                'status': "❌ Failed to click listing"
-                            })
-                        
-                except Exception as e:
-                    consecutive_failures += 1
-                    if progress_callback:
-                        progress_callback({
-                            'stage': 'error',
-                            'current': i + 1,
-                            'total': min(total_listings, max_results),
-                            'extracted': len(batch_results),
-                            'status': f"⚠️ Error: {str(e)[:50]}..."
-                        })
-                    
-                    if "connection" in str(e).lower() or "session" in str(e).lower():
-                        break
-                
-                # If too many failures, try scrolling
-                if consecutive_failures > 3:
-                    if progress_callback:
-                        progress_callback({
-                            'stage': 'scrolling',
-                            'current': i + 1,
-                            'total': min(total_listings, max_results),
-                            'extracted': len(batch_results),
-                            'status': "📜 Loading more results..."
-                        })
-                    
-                    if not self.scroll_results_panel():
-                        no_new_results_count += 1
-                    else:
-                        no_new_results_count = 0
-                        total_listings = self.get_total_results_count()
-                    consecutive_failures = 0
-                
-                if no_new_results_count > 2:
-                    break
-                    
-                time.sleep(0.5)  # Small delay between extractions
-                
-        except Exception as e:
-            return batch_results, f"Error during extraction: {str(e)}"
-        
-        # Final progress update
-        if progress_callback:
-            progress_callback({
-                'stage': 'completed',
-                'current': len(batch_results),
-                'total': len(batch_results),
-                'extracted': len(batch_results),
-                'status': f"🎉 Extraction completed! Found {len(batch_results)} results"
-            })
-        
-        return batch_results, "Success"
-    
-    def close(self):
-        """Close the browser"""
-        try:
-            if self.driver:
-                self.driver.quit()
-        except:
-            pass
+import io
+import logging
+import os
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from dedup import dedupe_store
+from driver_cache import load_resolution, spare_drivers
+from enrichment import WebsiteEnricher
+from exports import export_store
+from profiles import PROFILE_ROOT
+from profiling import profile_store
+from results_store import SORTABLE, get_store
+from run_metrics import run_metrics
+from throttle import get_shared_limiter
+from workers import run_process_pool_extraction
+from extractor import (EXTRACTION_BACKENDS, GoogleMapsExtractorStreamlit, GoogleMapsFastListExtractor,
+                       run_extraction_batch, run_grid_extraction_batch, run_incremental_batch)
 
-def run_extraction_batch(extractor, query, max_results, progress_callback=None):
-    """Run extraction in a separate function with progress updates"""
-    try:
-        if progress_callback:
-            progress_callback({
-                'stage': 'searching',
-                'current': 0,
-                'total': max_results,
-                'extracted': 0,
-                'status': "🔍 Searching Google Maps..."
-            })
-        
-        success, message = extractor.search_google_maps(query)
-        if not success:
-            return [], f"Search failed: {message}"
-        
-        if progress_callback:
-            progress_callback({
-                'stage': 'found_results',
-                'current': 0,
-                'total': max_results,
-                'extracted': 0,
-                'status': "📋 Found search results, starting extraction..."
-            })
-        
-        results, message = extractor.extract_single_batch(max_results, progress_callback)
-        return results, message
-        
-    except Exception as e:
-        return [], f"Extraction failed: {str(e)}"
-    finally:
-        extractor.close()
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+logging.getLogger(__name__).info("App imports took %.3fs", IMPORT_SECONDS)
 
-def create_analytics_charts(df):
-    """Create analytics charts for the extracted data"""
+def create_analytics_charts(profile):
+    """Create analytics charts from a data profile"""
     charts = {}
     
-    if not df.empty:
+    if profile['rows']:
+        # Imported here so plotly only loads once there is something to chart
+        import plotly.express as px
+        
         # Rating distribution
-        if 'rating' in df.columns:
-            rating_df = df[df['rating'].notna()].copy()
-            if not rating_df.empty:
-                rating_df['rating'] = pd.to_numeric(rating_df['rating'], errors='coerce')
-                rating_df = rating_df[rating_df['rating'].notna()]
-                
-                if not rating_df.empty:
-                    fig_rating = px.histogram(
-                        rating_df, 
-                        x='rating', 
-                        nbins=10,
-                        title="Business Rating Distribution",
-                        color_discrete_sequence=['#2E86AB']
-                    )
-                    fig_rating.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(color='black')
-                    )
-                    charts['rating'] = fig_rating
+        rating_buckets = profile['rating']['histogram']
+        if rating_buckets:
+            fig_rating = px.bar(
+                x=[bucket for bucket, _ in rating_buckets],
+                y=[count for _, count in rating_buckets],
+                labels={'x': 'rating', 'y': 'count'},
+                title="Business Rating Distribution",
+                color_discrete_sequence=['#2E86AB']
+            )
+            fig_rating.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='black')
+            )
+            charts['rating'] = fig_rating
         
         # Category distribution
-        if 'category' in df.columns:
-            category_df = df[df['category'].notna()]
-            if not category_df.empty:
-                category_counts = category_df['category'].value_counts().head(10)
-                fig_category = px.bar(
-                    x=category_counts.values,
-                    y=category_counts.index,
-                    orientation='h',
-                    title="Top Business Categories",
-                    color=category_counts.values,
-                    color_continuous_scale='Viridis'
-                )
-                fig_category.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white'),
-                    yaxis={'categoryorder': 'total ascending'}
-                )
-                charts['category'] = fig_category
+        top_categories = profile['categories']['top']
+        if top_categories:
+            fig_category = px.bar(
+                x=[count for _, count in top_categories],
+                y=[category for category, _ in top_categories],
+                orientation='h',
+                title="Top Business Categories",
+                color=[count for _, count in top_categories],
+                color_continuous_scale='Viridis'
+            )
+            fig_category.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='white'),
+                yaxis={'categoryorder': 'total ascending'}
+            )
+            charts['category'] = fig_category
         
         # Contact information completeness
         contact_data = {
-            'Phone': df['phone'].notna().sum(),
-            'Email': df['email'].notna().sum(), 
-            'Website': df['website'].notna().sum(),
-            'Address': df['address'].notna().sum()
+            'Phone': profile['filled']['phone'],
+            'Email': profile['filled']['email'],
+            'Website': profile['filled']['website'],
+            'Address': profile['filled']['address']
         }
         
         fig_contact = px.pie(
@@ -753,46 +285,51 @@ def create_header():
     </div>
     """, unsafe_allow_html=True)
 
-def create_stats_dashboard(df):
+def create_stats_dashboard(summary):
     """Create a beautiful stats dashboard"""
-    if not df.empty:
+    if summary['total']:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             st.markdown(f"""
             <div class="stat-card">
-                <div class="stat-number">{len(df)}</div>
+                <div class="stat-number">{summary['total']}</div>
                 <div class="stat-label">Total Businesses</div>
             </div>
             """, unsafe_allow_html=True)
         
         with col2:
-            phone_count = df['phone'].notna().sum()
             st.markdown(f"""
             <div class="stat-card">
-                <div class="stat-number">{phone_count}</div>
+                <div class="stat-number">{summary['filled']['phone']}</div>
                 <div class="stat-label">With Phone</div>
             </div>
             """, unsafe_allow_html=True)
         
         with col3:
-            email_count = df['email'].notna().sum()
             st.markdown(f"""
             <div class="stat-card">
-                <div class="stat-number">{email_count}</div>
+                <div class="stat-number">{summary['filled']['email']}</div>
                 <div class="stat-label">With Email</div>
             </div>
             """, unsafe_allow_html=True)
         
         with col4:
-            website_count = df['website'].notna().sum()
             st.markdown(f"""
             <div class="stat-card">
-                <div class="stat-number">{website_count}</div>
+                <div class="stat-number">{summary['filled']['website']}</div>
                 <div class="stat-label">With Website</div>
             </div>
             """, unsafe_allow_html=True)
 
+def discard_exports(*keys):
+    """Forget prepared downloads, deleting their temp files, once the stored results change"""
+    for key in keys or ('csv_export', 'json_export', 'excel_export'):
+        export = st.session_state.get(key)
+        if isinstance(export, tuple) and os.path.exists(export[0]):
+            os.remove(export[0])
+        st.session_state[key] = None
+
 def create_extraction_progress_ui():
     """Create a beautiful progress tracking interface"""
     st.markdown("""
@@ -836,11 +373,29 @@ def main():
     max_results = st.sidebar.number_input(
         "📊 Maximum Results",
         min_value=1,
-        max_value=200,
+        max_value=5000,
         value=20,
-        help="Maximum number of results to extract per batch"
+        help="Maximum number of results to extract per batch (above ~120 requires Grid Search)"
     )
     
+    # Extraction backend setting
+    extraction_backend = st.sidebar.selectbox(
+        "🧩 Extraction Backend",
+        options=list(EXTRACTION_BACKENDS.keys()),
+        help="Network mode reads place data from intercepted Maps responses instead of clicking each listing; "
+             "fast list mode reads the feed cards and only opens listings with missing fields"
+    )
+    
+    # Fast list mode only opens a detail panel when the card lacks one of these fields
+    backend_options = {}
+    if issubclass(EXTRACTION_BACKENDS[extraction_backend], GoogleMapsFastListExtractor):
+        backend_options['fill_fields'] = st.sidebar.multiselect(
+            "🧾 Open Panels For Missing",
+            options=['phone', 'website', 'address', 'category', 'rating', 'reviews_count'],
+            default=['phone'],
+            help="Listings whose feed card lacks any of these fields get their detail panel opened"
+        )
+    
     # Headless mode setting
     headless_mode = st.sidebar.checkbox(
         "🤖 Headless Mode",
@@ -856,24 +411,102 @@ def main():
             max_value=3.0,
             value=0.5,
             step=0.1,
-            help="Delay between each business extraction"
+            help="Starting delay between listing opens; adapts automatically if Google starts throttling"
+        )
+        
+        browser_tabs = st.number_input(
+            "Browser Tabs",
+            min_value=1,
+            max_value=8,
+            value=1,
+            help="Tabs opened in one browser to load several listings at once"
         )
         
         retry_attempts = st.number_input(
             "Retry Attempts",
-            min_value=1,
+            min_value=0,
             max_value=5,
             value=3,
-            help="Number of retry attempts for failed extractions"
+            help="Extra attempts at a listing after its first one fails; 0 disables retrying"
+        )
+        
+        worker_processes = st.number_input(
+            "Worker Processes",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            help="Run several browsers in separate processes to use every CPU core"
+        )
+        
+        keep_spare_driver = st.checkbox(
+            "⚡ Keep Pre-warmed Browser",
+            value=False,
+            help="Start a spare browser in the background so the next extraction begins immediately (not used with profile reuse)"
+        )
+        
+        reuse_profiles = st.checkbox(
+            "💾 Reuse Browser Profiles",
+            value=True,
+            help="Keep cookies and cache in a persistent profile per browser to skip consent pages"
+        )
+        
+        enrich_websites = st.checkbox(
+            "📧 Enrich from Websites",
+            value=False,
+            help="Visit each business website and its contact page to find emails and social links"
+        )
+        
+        incremental_refresh = st.checkbox(
+            "🔄 Incremental Refresh",
+            value=False,
+            help="Only open listings that are new or whose rating or review count changed since the current results"
+        )
+    
+    # Grid search splits an area into tiles to get past the per-search result cap
+    with st.sidebar.expander("🗺️ Grid Search", expanded=False):
+        grid_enabled = st.checkbox(
+            "Enable Grid Search",
+            value=False,
+            help="Search an area tile by tile and merge the results"
+        )
+        
+        grid_area = st.text_input(
+            "Area",
+            placeholder="City name or south,west,north,east",
+            help="A city to look up on Google Maps, or an explicit bounding box"
+        )
+        
+        col_grid1, col_grid2 = st.columns(2)
+        with col_grid1:
+            grid_rows = st.number_input("Rows", min_value=1, max_value=20, value=3)
+        with col_grid2:
+            grid_cols = st.number_input("Columns", min_value=1, max_value=20, value=3)
+        
+        grid_workers = st.number_input(
+            "Parallel Browsers",
+            min_value=1,
+            max_value=8,
+            value=2,
+            help="Tiles searched at the same time, each in its own browser"
         )
     
     # Initialize session state
-    if 'results' not in st.session_state:
-        st.session_state.results = []
+    if 'startup_seconds' not in st.session_state:
+        # Later reruns reuse cached modules, so keep the first measurement
+        st.session_state.startup_seconds = IMPORT_SECONDS
     if 'extraction_running' not in st.session_state:
         st.session_state.extraction_running = False
-    if 'extraction_history' not in st.session_state:
-        st.session_state.extraction_history = []
+    
+    # Results and history live in SQLite, so they survive refreshes and restarts
+    store = get_store()
+    summary = store.summary()
+    
+    # Warm a browser for the first job too, not only after one has run
+    # (profiled browsers lock their user-data-dir, so they cannot have a spare)
+    if keep_spare_driver and not reuse_profiles and not st.session_state.extraction_running:
+        extractor_class = EXTRACTION_BACKENDS[extraction_backend]
+        if issubclass(extractor_class, GoogleMapsExtractorStreamlit):
+            spare_drivers.prewarm(extractor_class(headless=headless_mode).options)
     
     # Main content area with tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "🔍 Extraction", "📈 Analytics", "📋 History"])
@@ -887,13 +520,12 @@ def main():
         """, unsafe_allow_html=True)
         
         # Stats dashboard
-        if st.session_state.results:
-            df = pd.DataFrame(st.session_state.results)
-            create_stats_dashboard(df)
+        if summary['total']:
+            create_stats_dashboard(summary)
             
             # Recent extractions preview
             st.subheader("🏢 Recent Extractions")
-            recent_df = df.tail(10)
+            recent_df = pd.DataFrame(store.recent(10))
             st.dataframe(
                 recent_df[['name', 'phone', 'email', 'rating', 'category']].fillna('N/A'),
                 use_container_width=True
@@ -917,14 +549,51 @@ def main():
             """, unsafe_allow_html=True)
             
             # Results display
-            if st.session_state.results:
-                df = pd.DataFrame(st.session_state.results)
+            if summary['total']:
+                # Filtering, sorting and paging run in SQL; only the visible page reaches the browser
+                search_text = st.text_input("🔎 Search name or category", key='results_search')
+                
+                col_f1, col_f2, col_f3 = st.columns(3)
+                with col_f1:
+                    query_filter = st.selectbox("Query", ['All'] + store.distinct('query'))
+                with col_f2:
+                    category_filter = st.selectbox("Category", ['All'] + store.distinct('category'))
+                with col_f3:
+                    min_rating = st.slider("Minimum Rating", 0.0, 5.0, 0.0, 0.5)
+                
+                col_s1, col_s2, col_s3 = st.columns(3)
+                with col_s1:
+                    sort_by = st.selectbox("Sort By", list(SORTABLE), index=list(SORTABLE).index('fetched_at'))
+                with col_s2:
+                    descending = st.checkbox("Descending", value=True)
+                with col_s3:
+                    page_size = st.selectbox("Rows Per Page", [25, 50, 100, 250], index=1)
+                
+                filters = {
+                    'search': search_text.strip() or None,
+                    'query': None if query_filter == 'All' else query_filter,
+                    'category': None if category_filter == 'All' else category_filter,
+                    'min_rating': min_rating or None,
+                }
+                matching = store.count(**filters)
+                page_count = max(1, -(-matching // page_size))
+                page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1)
                 
-                # Enhanced results table
-                st.dataframe(
-                    df.style.highlight_max(axis=0, subset=['rating']),
-                    use_container_width=True,
-                    height=400
+                records, matching = store.page(page_number, page_size, sort_by, descending, **filters)
+                if records:
+                    df = pd.DataFrame(records)
+                    df['fetched_at'] = pd.to_datetime(df['fetched_at'], unit='s')
+                    
+                    # Enhanced results table
+                    st.dataframe(
+                        df.style.highlight_max(axis=0, subset=['rating']),
+                        use_container_width=True,
+                        height=400
+                    )
+                first_row = (page_number - 1) * page_size
+                st.caption(
+                    f"Showing {min(first_row + 1, matching)}–{min(first_row + page_size, matching)} "
+                    f"of {matching} matching results ({summary['total']} stored)"
                 )
                 
                 # Download section with multiple formats
@@ -934,35 +603,59 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
                 
+                compress_exports = st.checkbox("🗜️ Compress exports (gzip)", value=False)
                 col_dl1, col_dl2, col_dl3 = st.columns(3)
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 
+                def prepare_export(state_key, fmt, label, stem):
+                    """Stream the current filter's rows into a temp file and offer it for download
+
+                    The button only appears in the run that built the file: download_button
+                    reads its data on every run it is rendered in, so the export is read once
+                    rather than again on each rerun. The path is kept so the file can be deleted.
+                    """
+                    discard_exports(state_key)
+                    path, mime = st.session_state[state_key] = export_store(store, fmt, compress_exports, **filters)
+                    with open(path, 'rb') as export_file:
+                        st.download_button(
+                            label=label,
+                            data=export_file,
+                            file_name=f"{stem}.{os.path.basename(path).split('.', 1)[1]}",
+                            mime=mime,
+                            use_container_width=True
+                        )
+                
                 with col_dl1:
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="📊 Download CSV",
-                        data=csv,
-                        file_name=f"gnp_scraper_results_{timestamp}.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
+                    # Exports cover every row matching the filters, so they are only built on request
+                    if st.button("📊 Prepare CSV", use_container_width=True):
+                        prepare_export('csv_export', 'csv', "📊 Download CSV", f"gnp_scraper_results_{timestamp}")
                 
                 with col_dl2:
-                    excel_buffer = pd.ExcelWriter(f'gnp_scraper_results_{timestamp}.xlsx', engine='xlsxwriter')
-                    df.to_excel(excel_buffer, sheet_name='Results', index=False)
-                    excel_buffer.close()
+                    # Building the workbook loads xlsxwriter, so only do it on request
+                    if st.button("📗 Prepare Excel", use_container_width=True):
+                        excel_buffer = io.BytesIO()
+                        with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
+                            # Workbooks are built in memory and capped at 1,048,576 rows by the format
+                            pd.DataFrame(store.iter_records(**filters)).to_excel(
+                                writer, sheet_name='Results', index=False)
+                        st.session_state.excel_export = excel_buffer.getvalue()
+                    
+                    if st.session_state.get('excel_export'):
+                        st.download_button(
+                            label="📗 Download Excel",
+                            data=st.session_state.excel_export,
+                            file_name=f"gnp_scraper_results_{timestamp}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            use_container_width=True
+                        )
                     
                 with col_dl3:
-                    json_data = df.to_json(orient='records', indent=2)
-                    st.download_button(
-                        label="📄 Download JSON",
-                        data=json_data,
-                        file_name=f"gnp_scraper_results_{timestamp}.json",
-                        mime="application/json",
-                        use_container_width=True
-                    )
+                    # One JSON object per line, so it can be written and read a row at a time
+                    if st.button("📄 Prepare NDJSON", use_container_width=True):
+                        prepare_export('json_export', 'ndjson', "📄 Download NDJSON",
+                                       f"gnp_scraper_results_{timestamp}")
             
-            elif not st.session_state.results and not st.session_state.extraction_running:
+            elif not summary['total'] and not st.session_state.extraction_running:
                 st.markdown("""
                 <div class="metric-card">
                     <h3>🎯 Get Started</h3>
@@ -986,6 +679,7 @@ def main():
             ):
                 if search_query:
                     st.session_state.extraction_running = True
+                    run_started = time.time()
                     
                     # Create beautiful progress interface
                     progress_container = st.container()
@@ -1035,6 +729,7 @@ def main():
                                     'failed': '⚠️',
                                     'error': '❌',
                                     'scrolling': '📜',
+                                    'retrying': '🔁',
                                     'completed': '🎉'
                                 }
                                 
@@ -1091,7 +786,25 @@ def main():
                         try:
                             # Initialize extraction
                             st.session_state.temp_results = []
-                            extractor = GoogleMapsExtractorStreamlit(headless=headless_mode)
+                            # One adaptive budget shared by every browser in this run and later ones
+                            rate_limiter = get_shared_limiter(1.0 / delay_between_extractions)
+                            extractor_options = {
+                                'headless': headless_mode,
+                                'tabs': browser_tabs,
+                                'profile_root': PROFILE_ROOT if reuse_profiles else None,
+                                'retry_attempts': retry_attempts,
+                            }
+                            extractor = EXTRACTION_BACKENDS[extraction_backend](
+                                keep_spare_driver=keep_spare_driver,
+                                rate_limiter=rate_limiter,
+                                **extractor_options,
+                                **backend_options
+                            )
+                            run_stats = None
+                            refresh_stats = None
+                            # Work done outside the extractor, added to its stage times and cache hits
+                            stage_seconds = {}
+                            cache_hits = {}
                             
                             def progress_with_results(progress_info):
                                 update_progress(progress_info)
@@ -1103,27 +816,105 @@ def main():
                                             st.session_state.temp_results.append(latest_result)
                             
                             # Start extraction
-                            results, message = run_extraction_batch(
-                                extractor, 
-                                search_query, 
-                                max_results, 
-                                progress_with_results
-                            )
+                            if grid_enabled and grid_area:
+                                # Tiles and pool processes start their own browsers
+                                extractor.close()
+                                results, message, run_stats = run_grid_extraction_batch(
+                                    EXTRACTION_BACKENDS[extraction_backend],
+                                    search_query,
+                                    grid_area,
+                                    grid_rows,
+                                    grid_cols,
+                                    grid_workers,
+                                    max_results,
+                                    progress_callback=update_progress,
+                                    rate_limiter=rate_limiter,
+                                    **extractor_options,
+                                    **backend_options
+                                )
+                            elif incremental_refresh and summary['total']:
+                                # Feed cards are compared with their stored records; only changes are opened
+                                results, message, refresh_stats = run_incremental_batch(
+                                    extractor,
+                                    search_query,
+                                    store.records_by_place_id,
+                                    max_results,
+                                    progress_with_results
+                                )
+                            elif worker_processes > 1:
+                                # Each process owns a browser and a slice of the place URLs
+                                extractor.close()
+                                results, message, run_stats = run_process_pool_extraction(
+                                    search_query,
+                                    max_results,
+                                    processes=worker_processes,
+                                    extractor_options={**extractor_options, **backend_options},
+                                    rate=1.0 / delay_between_extractions,
+                                    progress_callback=update_progress,
+                                    extractor_class=EXTRACTION_BACKENDS[extraction_backend]
+                                )
+                            else:
+                                results, message = run_extraction_batch(
+                                    extractor, 
+                                    search_query, 
+                                    max_results, 
+                                    progress_with_results
+                                )
+                            
+                            # Optional website crawl for emails and social links
+                            if results and enrich_websites:
+                                enrich_started = time.perf_counter()
+                                try:
+                                    enricher = WebsiteEnricher()
+                                    enricher.enrich(results, update_progress)
+                                    cache_hits['enrichment_pages'] = enricher.cache.hits
+                                except ImportError:
+                                    st.warning("⚠️ Website enrichment needs aiohttp: pip install aiohttp")
+                                stage_seconds['enrich'] = time.perf_counter() - enrich_started
                             
                             # Final results
+                            extractor_stats = run_stats or getattr(extractor, 'stats', {})
+                            if refresh_stats:
+                                cache_hits['unchanged_listings'] = refresh_stats['unchanged']
+                                st.info(
+                                    f"🔄 {refresh_stats['new']} new, {refresh_stats['changed']} changed, "
+                                    f"{refresh_stats['unchanged']} unchanged of {refresh_stats['cards']} listings"
+                                )
+                            
                             if results:
-                                st.session_state.results.extend(results)
+                                # Upserted by place, so refreshed places replace their old rows
+                                store.upsert_many(results, search_query)
+                                discard_exports()
                                 
                                 # Add to history
-                                st.session_state.extraction_history.append({
-                                    'timestamp': datetime.now(),
-                                    'query': search_query,
-                                    'results_count': len(results),
-                                    'status': 'Success'
-                                })
+                                store.add_run(search_query, len(results), 'Success', run_started, run_metrics(
+                                    run_started, len(results), extractor_stats, stage_seconds, cache_hits))
                                 
                                 main_progress.progress(1.0)
                                 
+                                # Browser memory over the run, sampled by the extractor
+                                if extractor_stats.get('rss_samples'):
+                                    st.caption(
+                                        f"🧠 Peak browser memory: {extractor_stats['peak_rss_mb']:.0f} MB | "
+                                        f"Browser recycles: {extractor_stats['driver_recycles']}"
+                                    )
+                                    st.line_chart(
+                                        pd.DataFrame(extractor_stats['rss_samples']).set_index('listings')['rss_mb']
+                                    )
+                                
+                                # Per-process breakdown for process-pool runs
+                                if extractor_stats.get('workers'):
+                                    st.caption(
+                                        f"⚙️ {len(extractor_stats['workers'])} worker processes | "
+                                        f"Retries: {extractor_stats['retries']} | "
+                                        f"Peak browser memory: {extractor_stats['peak_rss_mb']:.0f} MB"
+                                    )
+                                    st.dataframe(
+                                        pd.DataFrame(extractor_stats['workers']).drop(
+                                            columns=['rss_samples', 'failures'], errors='ignore'),
+                                        use_container_width=True
+                                    )
+                                
                                 # Success celebration
                                 st.balloons()
                                 st.markdown(f"""
@@ -1133,14 +924,13 @@ def main():
                                 </div>
                                 """, unsafe_allow_html=True)
                                 
+                            elif refresh_stats and not refresh_stats['new'] and not refresh_stats['changed']:
+                                st.success("✅ Results are up to date, no listings needed reopening")
+                            
                             else:
                                 st.error(f"❌ Extraction failed: {message}")
-                                st.session_state.extraction_history.append({
-                                    'timestamp': datetime.now(),
-                                    'query': search_query,
-                                    'results_count': 0,
-                                    'status': f'Failed: {message}'
-                                })
+                                store.add_run(search_query, 0, f'Failed: {message}', run_started, run_metrics(
+                                    run_started, 0, extractor_stats, stage_seconds, cache_hits))
                         
                         except Exception as e:
                             st.error(f"❌ Extraction failed: {str(e)}")
@@ -1161,12 +951,13 @@ def main():
                     disabled=st.session_state.extraction_running,
                     use_container_width=True
                 ):
-                    st.session_state.results = []
+                    store.clear()
+                    discard_exports()
                     st.success("🧹 Results cleared!")
                     st.rerun()
             
             with col_btn2:
-                if st.session_state.results and not st.session_state.extraction_running:
+                if summary['total'] and not st.session_state.extraction_running:
                     if st.button(
                         "➕ Extract More",
                         disabled=not search_query,
@@ -1175,6 +966,17 @@ def main():
                         # Add more results logic here
                         pass
             
+            # Same business found under slightly different names by other queries or tiles
+            if summary['total'] and not st.session_state.extraction_running:
+                if st.button("🧬 Merge Duplicates", use_container_width=True):
+                    with st.spinner("Looking for duplicate businesses..."):
+                        dedup_stats = dedupe_store(store)
+                    discard_exports()
+                    st.success(
+                        f"🧬 Merged {dedup_stats['merged']} duplicates in {dedup_stats['groups']} groups "
+                        f"({dedup_stats['input']} → {dedup_stats['output']} businesses)"
+                    )
+            
             # System status
             st.markdown("""
             <div class="feature-card">
@@ -1182,6 +984,13 @@ def main():
             </div>
             """, unsafe_allow_html=True)
             
+            st.caption(f"⏱️ App import time: {st.session_state.startup_seconds * 1000:.0f} ms")
+            limiter = get_shared_limiter(1.0 / delay_between_extractions)
+            st.caption(
+                f"🚦 Pace: {limiter.rate:.2f} listings/s | "
+                f"Blocks seen: {limiter.stats['blocks']} | Empty panels: {limiter.stats['empty_panels']}"
+            )
+            
             if st.button("🧪 Test ChromeDriver", use_container_width=True):
                 with st.spinner("Testing browser connection..."):
                     try:
@@ -1190,6 +999,15 @@ def main():
                         
                         if success:
                             st.success("✅ ChromeDriver is working correctly!")
+                            resolution = test_extractor.driver_resolution or load_resolution()
+                            if resolution:
+                                st.caption(
+                                    f"Strategy: {resolution['strategy']} | "
+                                    f"Chrome {resolution.get('browser_version')} | "
+                                    f"ChromeDriver {resolution.get('driver_version')}"
+                                )
+                                if not resolution.get('compatible', True):
+                                    st.warning("⚠️ Chrome and ChromeDriver major versions differ")
                             test_extractor.close()
                         else:
                             st.error(f"❌ ChromeDriver test failed: {message}")
@@ -1205,9 +1023,10 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.session_state.results:
-            df = pd.DataFrame(st.session_state.results)
-            charts = create_analytics_charts(df)
+        if summary['total']:
+            # One vectorized pass over the store, recomputed only when the data changed
+            profile = profile_store(store)
+            charts = create_analytics_charts(profile)
             
             # Display charts
             if charts:
@@ -1228,13 +1047,7 @@ def main():
             
             col_qual1, col_qual2, col_qual3, col_qual4 = st.columns(4)
             
-            total_records = len(df)
-            completeness_scores = {}
-            
-            for col in ['phone', 'email', 'website', 'address']:
-                if col in df.columns:
-                    completeness = (df[col].notna().sum() / total_records) * 100
-                    completeness_scores[col] = completeness
+            completeness_scores = profile['completeness']
             
             with col_qual1:
                 phone_score = completeness_scores.get('phone', 0)
@@ -1251,6 +1064,18 @@ def main():
             with col_qual4:
                 address_score = completeness_scores.get('address', 0)
                 st.metric("📍 Address Completeness", f"{address_score:.1f}%")
+            
+            # Share of filled values that are well-formed
+            col_valid1, col_valid2, col_valid3 = st.columns(3)
+            
+            with col_valid1:
+                st.metric("📞 Valid Phones", f"{profile['validity']['phone']:.1f}%")
+            
+            with col_valid2:
+                st.metric("📧 Valid Emails", f"{profile['validity']['email']:.1f}%")
+            
+            with col_valid3:
+                st.metric("🌐 Valid Websites", f"{profile['validity']['website']:.1f}%")
         
         else:
             st.info("📊 No data available for analysis. Start an extraction to see analytics.")
@@ -1263,29 +1088,80 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.session_state.extraction_history:
-            history_df = pd.DataFrame(st.session_state.extraction_history)
+        run_summary = store.run_summary()
+        if run_summary['runs']:
+            history_df = pd.DataFrame(store.runs(limit=500))
+            history_df['timestamp'] = pd.to_datetime(history_df.pop('started_at'), unit='s')
             
-            # Display history table
+            # Display history table (newest first, straight from the index)
             st.dataframe(
-                history_df.sort_values('timestamp', ascending=False),
+                history_df.reindex(columns=[
+                    'timestamp', 'query', 'results_count', 'status', 'duration', 'listings_per_sec',
+                    'retries', 'stale_retries', 'driver_recycles', 'failed', 'peak_rss_mb'
+                ]),
                 use_container_width=True
             )
             
             # History statistics
-            col_hist1, col_hist2, col_hist3 = st.columns(3)
+            col_hist1, col_hist2, col_hist3, col_hist4 = st.columns(4)
             
             with col_hist1:
-                total_extractions = len(history_df)
-                st.metric("Total Extractions", total_extractions)
+                st.metric("Total Extractions", run_summary['runs'])
             
             with col_hist2:
-                successful_extractions = len(history_df[history_df['status'] == 'Success'])
-                st.metric("Successful Extractions", successful_extractions)
+                st.metric("Successful Extractions", run_summary['successful'])
             
             with col_hist3:
-                total_records = history_df['results_count'].sum()
-                st.metric("Total Records Extracted", total_records)
+                st.metric("Total Records Extracted", run_summary['records'])
+            
+            # Runs from before metrics were recorded have no throughput
+            timed = history_df[history_df['status'].eq('Success') & history_df['listings_per_sec'].notna()]
+            timed = timed.iloc[::-1].set_index('timestamp')
+            
+            def expand(column):
+                """One column per key of a column of dicts, such as stage_seconds"""
+                values = timed[column] if column in timed else [None] * len(timed)
+                return pd.DataFrame([value if isinstance(value, dict) else {} for value in values],
+                                    index=timed.index)
+            
+            with col_hist4:
+                if len(timed):
+                    # The latest run against the median of the ones before it flags regressions
+                    baseline = timed['listings_per_sec'].iloc[:-1].tail(20).median()
+                    latest = timed['listings_per_sec'].iloc[-1]
+                    st.metric(
+                        "Latest Listings/sec", f"{latest:.2f}",
+                        delta=f"{latest - baseline:+.2f} vs median" if pd.notna(baseline) else None
+                    )
+            
+            if len(timed) > 1:
+                st.subheader("⚡ Throughput Trend")
+                trend = timed[['listings_per_sec']].copy()
+                trend['median of last 5 runs'] = trend['listings_per_sec'].rolling(5, min_periods=1).median()
+                st.line_chart(trend)
+                
+                st.subheader("⏱️ Time per Stage")
+                stages = expand('stage_seconds')
+                if not stages.empty:
+                    st.bar_chart(stages.fillna(0))
+                
+                col_perf1, col_perf2 = st.columns(2)
+                with col_perf1:
+                    st.caption("Retries and failed listings per run")
+                    st.line_chart(timed.reindex(columns=['retries', 'stale_retries', 'failed']).fillna(0))
+                with col_perf2:
+                    st.caption("Peak browser memory (MB)")
+                    st.line_chart(timed['peak_rss_mb'].dropna())
+                
+                failures = expand('failures')
+                if not failures.empty:
+                    st.caption("Failures by type, all timed runs")
+                    st.bar_chart(failures.sum().rename('failures'))
+                
+                hits = expand('cache_hits').sum()
+                if hits.any():
+                    st.caption("♻️ Cache hits, all timed runs: " + " | ".join(
+                        f"{name.replace('_', ' ')}: {int(count)}" for name, count in hits.items()))
         
         else:
             st.info("📝 No extraction history available yet.")
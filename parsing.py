@@ -0,0 +1,520 @@
+import json
+import re
+
+# Google Maps prefixes its XHR JSON with this guard to block JSON hijacking
+XSSI_PREFIX = ")]}'"
+
+# URL fragments of the XHR calls that carry place data
+SEARCH_PAYLOAD_MARKERS = ('/search?tbm=map', '/maps/preview/place', '/maps/rpc/')
+
+# A place's feature ID, the key shared by feed-card URLs, panel URLs and payloads
+FEATURE_ID_PATTERN = re.compile(r'0x[0-9a-f]+:0x[0-9a-f]+')
+
+
+# Fields read from the place panel alongside the contact details, with their types
+EXTENDED_FIELDS = {
+    'hours': str,
+    'plus_code': str,
+    'latitude': float,
+    'longitude': float,
+    'price_level': int,
+    'price_range': str,
+    'photos_count': int,
+    'attributes': str,
+}
+
+# A price shown as repeated currency symbols ("$$") is a level; anything else is a range
+PRICE_LEVEL_PATTERN = re.compile(r'([$€£¥₹₩])\1{0,3}')
+
+
+def empty_details():
+    """Return a details dict with every field unset"""
+    details = {
+        'name': None,
+        'phone': None,
+        'email': None,
+        'website': None,
+        'address': None,
+        'rating': None,
+        'reviews_count': None,
+        'category': None,
+        'place_id': None
+    }
+    details.update(dict.fromkeys(EXTENDED_FIELDS))
+    return details
+
+
+def typed_value(field, value):
+    """Coerce an extended field to its schema type, or None when it doesn't parse"""
+    kind = EXTENDED_FIELDS[field]
+    if value is None:
+        return None
+    if kind is str:
+        value = str(value).strip()
+        return value or None
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    try:
+        return kind(float(value)) if kind is int else kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def coordinates_from_url(url):
+    """Latitude and longitude of the place itself from the !3d...!4d... URL segment
+
+    The @lat,lng part of a Maps URL is the viewport centre, not the place, so it is not used.
+    """
+    match = re.search(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)', url or '')
+    if not match:
+        return None, None
+    return float(match.group(1)), float(match.group(2))
+
+
+def phone_from_text(text):
+    """The phone number in a panel line, without the icon glyphs and labels around it"""
+    if not text:
+        return None
+    phone_patterns = [
+        r'[\+]?[(]?[0-9]{1,3}[)]?[-\s\.]?[(]?[0-9]{1,4}[)]?[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,9}',
+        r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+        r'\b\d{10}\b'
+    ]
+    for pattern in phone_patterns:
+        phones = re.findall(pattern, text.strip())
+        if phones:
+            phone = phones[0].strip()
+            if len(phone) >= 10:
+                return phone
+    return None
+
+
+def price_fields(price):
+    """Split a displayed price into a 1-4 level ("$$") or a range ("$10–20")"""
+    price = (price or '').strip()
+    if not price:
+        return None, None
+    if PRICE_LEVEL_PATTERN.fullmatch(price):
+        return len(price), None
+    return None, price
+
+
+def place_id_from_url(url):
+    """Pull the place's key out of a place URL: its 0x...:0x... feature ID
+
+    Feed-card and panel URLs both carry the feature ID, while only feed cards add the
+    ChIJ place ID, so the feature ID is what every extraction path keys places by.
+    The ChIJ ID is only used for URLs without one.
+    """
+    if not url:
+        return None
+    match = re.search(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)', url) or re.search(r'!19s(ChIJ[\w-]+)', url)
+    return match.group(1) if match else None
+
+
+def is_place_payload_url(url):
+    """Check whether a network response URL carries place data"""
+    return bool(url) and any(marker in url for marker in SEARCH_PAYLOAD_MARKERS)
+
+
+def decode_payload(body):
+    """Decode a raw Maps XHR body into JSON, stripping the XSSI guard"""
+    if not body:
+        return None
+
+    text = body.strip()
+    if text.endswith('/*""*/'):
+        text = text[:-len('/*""*/')]
+
+    try:
+        # Search responses are sometimes wrapped as {"c":0,"d":")]}'\n[...]"}
+        if text.startswith('{'):
+            wrapper = json.loads(text)
+            text = (wrapper.get('d') or '').strip()
+        if text.startswith(XSSI_PREFIX):
+            text = text[len(XSSI_PREFIX):]
+        return json.loads(text)
+    except (ValueError, AttributeError):
+        return None
+
+
+def dig(node, *path):
+    """Safely walk nested lists by index, returning None on any miss"""
+    for index in path:
+        if not isinstance(node, list) or index >= len(node):
+            return None
+        node = node[index]
+    return node
+
+
+def looks_like_place(node):
+    """Heuristic check for the place record array inside a Maps payload"""
+    return (
+        isinstance(node, list)
+        and len(node) > 78
+        and isinstance(node[11], str)
+        and bool(node[11].strip())
+    )
+
+
+def iter_place_arrays(node, depth=0):
+    """Yield every place record array nested anywhere inside a payload"""
+    if depth > 12 or not isinstance(node, list):
+        return
+    if looks_like_place(node):
+        yield node
+        return
+    for child in node:
+        if isinstance(child, list):
+            yield from iter_place_arrays(child, depth + 1)
+
+
+def place_array_to_details(place):
+    """Convert a Maps place record array into the extractor's details dict"""
+    details = empty_details()
+    details['name'] = place[11].strip()
+
+    address = dig(place, 39)
+    if not isinstance(address, str):
+        parts = dig(place, 2)
+        if isinstance(parts, list):
+            address = ', '.join(p for p in parts if isinstance(p, str))
+    if address:
+        details['address'] = address.strip()
+
+    phone = dig(place, 178, 0, 0)
+    if isinstance(phone, str) and phone.strip():
+        details['phone'] = phone.strip()
+
+    website = dig(place, 7, 0)
+    if isinstance(website, str) and website.strip():
+        details['website'] = website.strip()
+
+    # Match the DOM extractor, which returns rating/reviews as display strings
+    rating = dig(place, 4, 7)
+    if isinstance(rating, (int, float)):
+        details['rating'] = str(rating)
+
+    reviews = dig(place, 4, 8)
+    if isinstance(reviews, int):
+        details['reviews_count'] = f"{reviews:,}"
+
+    categories = dig(place, 13)
+    if isinstance(categories, list) and categories and isinstance(categories[0], str):
+        details['category'] = categories[0]
+
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b'
+    for text in (dig(place, 32, 1, 1), dig(place, 154, 0, 0)):
+        if isinstance(text, str):
+            emails = re.findall(email_pattern, text)
+            if emails:
+                details['email'] = emails[0]
+                break
+
+    details['place_id'] = place_key(place)
+
+    latitude, longitude = dig(place, 9, 2), dig(place, 9, 3)
+    if isinstance(latitude, (int, float)) and isinstance(longitude, (int, float)):
+        details['latitude'], details['longitude'] = float(latitude), float(longitude)
+
+    price = dig(place, 4, 2)
+    if isinstance(price, str):
+        details['price_level'], details['price_range'] = price_fields(price)
+
+    return details
+
+
+def place_key(place):
+    """Return a stable identifier for a place record array, the feature ID where it has one"""
+    feature_id = dig(place, 10)
+    if isinstance(feature_id, str) and FEATURE_ID_PATTERN.fullmatch(feature_id):
+        return feature_id
+    return dig(place, 78) or place[11]
+
+
+def parse_places_from_payload(body):
+    """Parse every place in a raw XHR body into (key, details) pairs"""
+    data = decode_payload(body)
+    if data is None:
+        return []
+    return [(place_key(place), place_array_to_details(place)) for place in iter_place_arrays(data)]
+
+
+# Reads the open place panel in one round trip; panel_to_details types the result
+PANEL_EXTRACT_JS = r"""
+() => {
+    const details = {name: null, phone: null, email: null, website: null,
+                     address: null, rating: null, reviews_count: null, category: null,
+                     place_id: null, hours: null, plus_code: null, price: null,
+                     photos_count: null, attributes: null, url: location.href};
+    const text = el => (el && el.textContent ? el.textContent.trim() : '');
+
+    for (const selector of ['h1.DUwDvf.fontHeadlineLarge', 'h1[class*="fontHeadlineLarge"]',
+                            'h1.DUwDvf', '[role="main"] h1']) {
+        const name = text(document.querySelector(selector));
+        if (name) { details.name = name; break; }
+    }
+
+    const category = text(document.querySelector('button[jsaction*="category"] .DkEaL'));
+    if (category) details.category = category;
+
+    for (const el of document.querySelectorAll('button[data-item-id], button[data-tooltip], a[data-item-id]')) {
+        const itemId = (el.getAttribute('data-item-id') || '').toLowerCase();
+        const aria = el.getAttribute('aria-label') || '';
+        const label = aria.toLowerCase();
+        const value = aria.includes(':') ? aria.split(':').slice(1).join(':').trim() : text(el);
+        if (itemId.includes('phone') || label.includes('phone')) {
+            if (value) details.phone = value;
+        } else if (itemId === 'oloc' || label.startsWith('plus code')) {
+            if (value) details.plus_code = value;
+        } else if (itemId.includes('website') || label.includes('website')) {
+            const site = text(el);
+            if (site && (site.includes('.') || site.toLowerCase().includes('http'))) details.website = site;
+        } else if (itemId.includes('address') || label.includes('address')) {
+            if (value) details.address = value;
+        }
+    }
+
+    if (!details.phone) {
+        const tel = document.querySelector('a[href^="tel:"]');
+        if (tel) details.phone = tel.getAttribute('href').replace('tel:', '').trim();
+    }
+
+    const rating = document.querySelector('span[role="img"][aria-label*="stars"], span.MW4etd');
+    if (rating) {
+        const match = (rating.getAttribute('aria-label') || text(rating)).match(/([\d.]+)/);
+        if (match) details.rating = match[1];
+    }
+
+    const reviews = document.querySelector('span.UY7F9 button span[aria-label*="reviews"]');
+    if (reviews) {
+        const match = (reviews.getAttribute('aria-label') || '').match(/([\d,]+)/);
+        if (match) details.reviews_count = match[1];
+    }
+
+    const main = document.querySelector('div[role="main"]');
+    if (main) {
+        const match = main.innerText.match(/\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b/);
+        if (match) details.email = match[0];
+    }
+
+    // Weekly hours from the expanded table, else from the summary's aria-label
+    const hours = [];
+    for (const row of document.querySelectorAll('table.eK4R0e tr, div.t39EBf table tr')) {
+        const cells = row.querySelectorAll('td');
+        if (cells.length < 2 || !text(cells[0])) continue;
+        const times = cells[1].getAttribute('aria-label') || text(cells[1]);
+        hours.push(`${text(cells[0])}: ${times.replace(/\s+/g, ' ').trim()}`);
+    }
+    const week = document.querySelector('div.t39EBf[aria-label], div[jsaction*="openhours"][aria-label]');
+    if (hours.length) {
+        details.hours = hours.join('; ');
+    } else if (week) {
+        details.hours = week.getAttribute('aria-label').replace(/\.?\s*(hide|show) open hours.*$/i, '').trim() || null;
+    }
+
+    const price = document.querySelector('span[aria-label^="Price" i], span.mgr77e span[aria-label]');
+    if (price) details.price = text(price) || null;
+
+    for (const el of document.querySelectorAll('button[aria-label*="photo" i], div[aria-label*="photo" i]')) {
+        const match = ((el.getAttribute('aria-label') || '') + ' ' + text(el)).match(/([\d,]+)\s+photos?/i);
+        if (match) { details.photos_count = match[1]; break; }
+    }
+
+    // Service options and amenities ("Serves dine-in", "Wheelchair accessible entrance")
+    const attributes = new Set();
+    for (const el of document.querySelectorAll('div.LTs0Rc[aria-label], div.E0DTEd [aria-label]')) {
+        const label = el.getAttribute('aria-label').trim();
+        if (label) attributes.add(label);
+    }
+    if (attributes.size) details.attributes = Array.from(attributes).join('; ');
+
+    return details;
+}
+"""
+
+# Returns every place URL currently loaded in the results feed
+FEED_LINKS_JS = r"""
+() => Array.from(document.querySelectorAll('div[role="feed"] a[href*="/maps/place/"]'))
+           .map(a => a.href)
+"""
+
+# Reports whether a tab navigated with window.location has a readable place panel:
+# 'full' once contact buttons rendered, 'partial' with only the title, false otherwise
+TAB_READY_JS = r"""
+if (window.__gnpPending || document.readyState === 'loading') return false;
+const title = document.querySelector('h1.DUwDvf, [role="main"] h1');
+if (!title || !title.textContent.trim()) return false;
+return document.querySelector('button[data-item-id], a[data-item-id]') ? 'full' : 'partial';
+"""
+
+# Finds a feed entry by its place URL and clicks it within a single script call
+CLICK_LISTING_JS = r"""
+const feed = document.querySelector('div[role="feed"]');
+if (!feed) return false;
+const link = Array.from(feed.querySelectorAll('a[href*="/maps/place/"]')).find(a => a.href === arguments[0]);
+if (!link) return false;
+link.scrollIntoView({block: 'center'});
+link.click();
+return true;
+"""
+
+# Reads every loaded feed card in one call: its place URL plus the fields the card
+# shows (name, rating/review snippet, category, address, phone, website), enough to
+# tell whether a place changed and often enough to skip its detail panel entirely
+FEED_CARDS_JS = r"""
+() => Array.from(document.querySelectorAll('div[role="feed"] a[href*="/maps/place/"]')).map(a => {
+    const card = a.closest('div.Nv2PK') || a.parentElement;
+    const text = el => (el && el.textContent ? el.textContent.trim() : '');
+    const stars = card.querySelector('span[role="img"][aria-label]');
+    const starsLabel = stars ? stars.getAttribute('aria-label') : '';
+    const rating = text(card.querySelector('span.MW4etd'))
+        || (starsLabel.match(/([\d.]+)\s*star/i) || [])[1] || null;
+    const reviews = text(card.querySelector('span.UY7F9')).replace(/[()]/g, '')
+        || (starsLabel.match(/([\d,]+)\s*review/i) || [])[1] || null;
+
+    // Info lines read "Category · Address" and "Open · Closes 6 PM · Phone"
+    const phonePattern = /^\+?[\d\s().-]{7,}$/;
+    const hoursPattern = /^(open|closed|closes|opens|temporarily)/i;
+    let category = null, address = null, phone = null;
+    const lines = Array.from(card.querySelectorAll('.W4Efsd'))
+        .filter(el => !el.querySelector('.W4Efsd') && !el.querySelector('span[role="img"]'))
+        .map(el => el.textContent.split('·').map(part => part.trim()).filter(Boolean));
+    for (const parts of lines) {
+        for (const part of parts) {
+            if (!phone && phonePattern.test(part)) phone = part;
+        }
+        const info = parts.filter(part => !phonePattern.test(part) && !hoursPattern.test(part));
+        if (!category && info.length) {
+            category = info[0];
+            address = info[1] || null;
+        }
+    }
+
+    const site = card.querySelector('a[data-value="Website"], a[aria-label*="website" i]');
+    return {
+        url: a.href,
+        name: a.getAttribute('aria-label') || text(card.querySelector('.fontHeadlineSmall')) || null,
+        rating: rating,
+        reviews_count: reviews,
+        category: category,
+        address: address,
+        phone: phone,
+        website: site ? site.href : null
+    };
+})
+"""
+
+
+def card_to_details(card):
+    """Turn a feed card read by FEED_CARDS_JS into a details dict"""
+    details = empty_details()
+    for field in ('name', 'phone', 'website', 'address', 'rating', 'reviews_count', 'category'):
+        if card.get(field):
+            details[field] = card[field]
+    details['place_id'] = place_id_from_url(card.get('url'))
+    details['latitude'], details['longitude'] = coordinates_from_url(card.get('url'))
+    return details
+
+
+def panel_to_details(panel, *urls):
+    """Turn what PANEL_EXTRACT_JS read into a typed details dict
+
+    The place ID and coordinates come from the panel's own URL, falling back to
+    any URLs passed in (such as the one that was requested).
+    """
+    details = empty_details()
+    if not panel:
+        return details
+    panel = dict(panel)
+    urls = (panel.pop('url', None),) + urls
+    details['price_level'], details['price_range'] = price_fields(panel.pop('price', None))
+    for field, value in panel.items():
+        if field in EXTENDED_FIELDS:
+            details[field] = typed_value(field, value)
+        elif field in details:
+            details[field] = value
+    # The phone row's textContent carries the icon glyph along with the number
+    details['phone'] = phone_from_text(details['phone'])
+
+    for url in urls:
+        details['place_id'] = details['place_id'] or place_id_from_url(url)
+        if details['latitude'] is None:
+            details['latitude'], details['longitude'] = coordinates_from_url(url)
+    return details
+
+
+def place_url(place_id):
+    """A URL that opens a place from its stored place ID"""
+    if not place_id:
+        return None
+    if place_id.startswith('ChIJ'):
+        return f"https://www.google.com/maps/place/?q=place_id:{place_id}"
+    # Feature IDs end in the place's CID, which Maps resolves directly
+    match = re.fullmatch(r'0x[0-9a-f]+:(0x[0-9a-f]+)', place_id)
+    return f"https://www.google.com/maps?cid={int(match.group(1), 16)}" if match else None
+
+
+# Opens the reviews pane of the open place from its tab or its "More reviews" button
+OPEN_REVIEWS_JS = r"""
+const tab = Array.from(document.querySelectorAll('button[role="tab"]'))
+    .find(el => /review/i.test(el.getAttribute('aria-label') || el.textContent));
+const target = tab || document.querySelector('button[jsaction*="moreReviews"], button[aria-label*="more reviews" i]');
+if (!target) return false;
+target.click();
+return true;
+"""
+
+# Reads up to arguments[0] unread reviews, empties their nodes and scrolls the pane
+# for more, reporting whether unread reviews remain and whether more are loading
+REVIEW_BATCH_JS = r"""
+const limit = arguments[0];
+const text = el => (el && el.textContent ? el.textContent.trim() : '');
+const unread = Array.from(document.querySelectorAll('div.jftiEf[data-review-id]:not([data-gnp-read])'));
+const reviews = [];
+for (const node of unread.slice(0, limit)) {
+    // Long reviews are truncated behind a "More" button that expands them in place
+    const more = node.querySelector('button.w8nwRe');
+    if (more) more.click();
+    const stars = node.querySelector('span.kvMYJc[aria-label], span[role="img"][aria-label*="star" i]');
+    reviews.push({
+        review_id: node.getAttribute('data-review-id'),
+        author: text(node.querySelector('.d4r55')) || node.getAttribute('aria-label') || null,
+        // Hotels and some other layouts show "4/5" instead of a star image
+        rating: (stars && stars.getAttribute('aria-label')) || text(node.querySelector('span.fzvQIb')) || null,
+        date: text(node.querySelector('span.rsqaWe, span.xRkPPb')) || null,
+        text: text(node.querySelector('span.wiI7pd')) || null
+    });
+    // Emptied rather than removed, since the pane's loader tracks its children; an empty
+    // shell costs almost nothing next to the avatars, photos and text it held
+    node.replaceChildren();
+    node.setAttribute('data-gnp-read', '1');
+}
+
+let pane = window.__gnpReviewPane;
+if (!pane || !pane.isConnected) {
+    pane = document.querySelector('div.jftiEf[data-review-id]');
+    while (pane && !/(auto|scroll)/.test(getComputedStyle(pane).overflowY)) pane = pane.parentElement;
+    window.__gnpReviewPane = pane;
+}
+if (pane) pane.scrollTop = pane.scrollHeight;
+
+return {
+    reviews: reviews,
+    pending: unread.length - reviews.length,
+    loading: !!(pane && pane.querySelector('div.lXJj5c, [role="progressbar"]'))
+};
+"""
+
+
+def review_to_record(place_id, review):
+    """Type a review read by REVIEW_BATCH_JS and tag it with its place"""
+    match = re.search(r'\d+(?:[.,]\d+)?', review.get('rating') or '')
+    return {
+        'place_id': place_id,
+        'review_id': review.get('review_id'),
+        'author': review.get('author'),
+        'rating': float(match.group(0).replace(',', '.')) if match else None,
+        'date': review.get('date'),
+        'text': review.get('text'),
+    }
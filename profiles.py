@@ -0,0 +1,87 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+PROFILE_ROOT = os.path.join(os.path.expanduser('~'), '.cache', 'gnp_scraper', 'profiles')
+
+CONSENT_MARKER = '.consent_handled'
+
+# Slots held by this process; file locks alone do not stop two threads picking one slot on Windows
+_held_slots = set()
+_held_lock = threading.Lock()
+
+
+def _try_lock(handle):
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(handle):
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+class ProfileSlot:
+    """An exclusively locked Chrome user-data-dir reused across runs"""
+
+    def __init__(self, root, index, lock_handle):
+        self.root = root
+        self.index = index
+        self.path = os.path.join(root, f"slot-{index}")
+        self.lock_handle = lock_handle
+        os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def consent_handled(self):
+        """Whether this profile already holds Google's consent cookies"""
+        return os.path.exists(os.path.join(self.path, CONSENT_MARKER))
+
+    def mark_consent_handled(self):
+        try:
+            with open(os.path.join(self.path, CONSENT_MARKER), 'w'):
+                pass
+        except OSError:
+            pass
+
+    def release(self):
+        """Unlock the slot so another worker can use the profile"""
+        if self.lock_handle is None:
+            return
+        _unlock(self.lock_handle)
+        self.lock_handle.close()
+        self.lock_handle = None
+        with _held_lock:
+            _held_slots.discard((self.root, self.index))
+
+
+def acquire_profile_slot(root=PROFILE_ROOT, max_slots=16):
+    """Lock the first free profile slot, or return None if all are in use"""
+    os.makedirs(root, exist_ok=True)
+    for index in range(max_slots):
+        with _held_lock:
+            if (root, index) in _held_slots:
+                continue
+            # Lock files live beside the profile; the OS drops the lock if the process dies
+            handle = open(os.path.join(root, f"slot-{index}.lock"), 'a+')
+            if not _try_lock(handle):
+                handle.close()
+                continue
+            _held_slots.add((root, index))
+        return ProfileSlot(root, index, handle)
+    return None
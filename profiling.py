@@ -0,0 +1,195 @@
+import argparse
+import json
+import threading
+
+import pandas as pd
+
+# Fields whose completeness is reported; validity is checked for the contact fields
+PROFILE_FIELDS = ('name', 'phone', 'email', 'website', 'address', 'rating', 'reviews_count', 'category')
+
+PHONE_PATTERN = r'\+?[\d\s().\-/]+'
+EMAIL_PATTERN = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}'
+WEBSITE_PATTERN = r'(?:https?://)?(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}(?:[:/?#].*)?'
+
+RATING_STEP = 0.5
+
+
+def _filled(column):
+    """Non-empty mask; blank strings count as missing"""
+    if column.dtype == object:
+        return column.notna() & (column.astype(str).str.strip() != '')
+    return column.notna()
+
+
+def _valid_phones(column):
+    text = column.astype(str).str.strip()
+    digits = text.str.count(r'\d')
+    return text.str.fullmatch(PHONE_PATTERN) & digits.between(7, 15)
+
+
+def _partial_profile(df):
+    """Counts for one chunk of rows; partials from several chunks are summed by _combine"""
+    partial = {'rows': len(df), 'filled': {}, 'valid': {}}
+    empty = pd.Series([], dtype=float)
+    for field in PROFILE_FIELDS:
+        partial['filled'][field] = int(_filled(df[field]).sum()) if field in df.columns else 0
+
+    checks = {
+        'phone': _valid_phones,
+        'email': lambda column: column.astype(str).str.strip().str.fullmatch(EMAIL_PATTERN),
+        'website': lambda column: column.astype(str).str.strip().str.fullmatch(WEBSITE_PATTERN),
+    }
+    for field, check in checks.items():
+        if field in df.columns:
+            values = df[field][_filled(df[field])]
+            partial['valid'][field] = int(check(values).sum()) if len(values) else 0
+        else:
+            partial['valid'][field] = 0
+
+    ratings = pd.to_numeric(df['rating'], errors='coerce').dropna() if 'rating' in df.columns else empty
+    buckets = (ratings // RATING_STEP * RATING_STEP).value_counts()
+    partial['rating'] = {
+        'sum': float(ratings.sum()), 'count': len(ratings),
+        'min': float(ratings.min()) if len(ratings) else None,
+        'max': float(ratings.max()) if len(ratings) else None,
+        'histogram': {float(bucket): int(count) for bucket, count in buckets.items()},
+    }
+
+    if 'reviews_count' in df.columns:
+        reviews = pd.to_numeric(
+            df['reviews_count'].astype(str).str.replace(r'\D', '', regex=True), errors='coerce').dropna()
+    else:
+        reviews = empty
+    partial['reviews'] = {'sum': float(reviews.sum()), 'count': len(reviews),
+                          'max': float(reviews.max()) if len(reviews) else None}
+
+    categories = df['category'].dropna().value_counts() if 'category' in df.columns else empty
+    partial['categories'] = {str(category): int(count) for category, count in categories.items()}
+    return partial
+
+
+def _combine(partials):
+    rows = sum(partial['rows'] for partial in partials)
+    filled = {field: sum(partial['filled'][field] for partial in partials) for field in PROFILE_FIELDS}
+    valid = {field: sum(partial['valid'][field] for partial in partials) for field in ('phone', 'email', 'website')}
+
+    histogram = {}
+    categories = {}
+    for partial in partials:
+        for bucket, count in partial['rating']['histogram'].items():
+            histogram[bucket] = histogram.get(bucket, 0) + count
+        for category, count in partial['categories'].items():
+            categories[category] = categories.get(category, 0) + count
+
+    rated = sum(partial['rating']['count'] for partial in partials)
+    reviewed = sum(partial['reviews']['count'] for partial in partials)
+    mins = [partial['rating']['min'] for partial in partials if partial['rating']['min'] is not None]
+    maxes = [partial['rating']['max'] for partial in partials if partial['rating']['max'] is not None]
+    review_maxes = [partial['reviews']['max'] for partial in partials if partial['reviews']['max'] is not None]
+
+    return {
+        'rows': rows,
+        'filled': filled,
+        'completeness': {field: (count / rows * 100 if rows else 0.0) for field, count in filled.items()},
+        'valid': valid,
+        # Share of the filled values that are well-formed
+        'validity': {field: (count / filled[field] * 100 if filled[field] else 0.0) for field, count in valid.items()},
+        'rating': {
+            'mean': sum(partial['rating']['sum'] for partial in partials) / rated if rated else None,
+            'min': min(mins) if mins else None,
+            'max': max(maxes) if maxes else None,
+            'histogram': sorted(histogram.items()),
+        },
+        'reviews': {
+            'mean': sum(partial['reviews']['sum'] for partial in partials) / reviewed if reviewed else None,
+            'max': max(review_maxes) if review_maxes else None,
+            'total': sum(partial['reviews']['sum'] for partial in partials),
+        },
+        'categories': {
+            'distinct': len(categories),
+            'top': sorted(categories.items(), key=lambda item: item[1], reverse=True)[:10],
+        },
+    }
+
+
+def profile_frame(df):
+    """Completeness, validity and distribution stats for a DataFrame in one vectorized pass"""
+    return _combine([_partial_profile(df)])
+
+
+_profile_cache = {}
+_cache_lock = threading.Lock()
+
+
+def profile_store(store, query=None, chunksize=100000):
+    """Profile the result store, streaming it in chunks and caching by store version"""
+    key = (store.path, query, store.version)
+    with _cache_lock:
+        if key in _profile_cache:
+            return _profile_cache[key]
+
+    sql = f"SELECT {', '.join(PROFILE_FIELDS)} FROM places"
+    params = ()
+    if query:
+        sql += " WHERE query = ?"
+        params = (query,)
+    partials = [_partial_profile(chunk)
+                for chunk in pd.read_sql_query(sql, store.connection(), params=params, chunksize=chunksize)]
+    profile = _combine(partials) if partials else _combine([_partial_profile(pd.DataFrame(columns=PROFILE_FIELDS))])
+
+    with _cache_lock:
+        # Only the latest version of each store/query is worth keeping
+        for stale in [cached for cached in _profile_cache if cached[:2] == key[:2]]:
+            del _profile_cache[stale]
+        _profile_cache[key] = profile
+    return profile
+
+
+def format_profile(profile):
+    lines = [f"Rows: {profile['rows']}", "", "Field           filled  complete  valid"]
+    for field in PROFILE_FIELDS:
+        validity = profile['validity'].get(field)
+        lines.append(f"{field:<15} {profile['filled'][field]:>6}  {profile['completeness'][field]:>7.1f}%"
+                     + (f"  {validity:>5.1f}%" if validity is not None else ""))
+    rating = profile['rating']
+    if rating['mean'] is not None:
+        lines += ["", f"Rating: mean {rating['mean']:.2f}, min {rating['min']}, max {rating['max']}"]
+        lines += [f"  {bucket:.1f}+  {count}" for bucket, count in rating['histogram']]
+    if profile['categories']['top']:
+        lines += ["", f"Categories: {profile['categories']['distinct']} distinct"]
+        lines += [f"  {category}: {count}" for category, count in profile['categories']['top']]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile extracted results for completeness and validity")
+    parser.add_argument('source', nargs='?',
+                        help="CSV, JSON or NDJSON export to profile, optionally gzipped (default: the result store)")
+    parser.add_argument('--db', help="result store path")
+    parser.add_argument('--query', help="only profile results of this query")
+    parser.add_argument('--json', action='store_true', help="print the profile as JSON")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        # pandas infers gzip from the extension, so only the format needs picking
+        kind = args.source.lower().removesuffix('.gz')
+        if kind.endswith(('.ndjson', '.jsonl')):
+            df = pd.read_json(args.source, lines=True)
+        elif kind.endswith('.json'):
+            df = pd.read_json(args.source)
+        elif kind.endswith('.csv'):
+            df = pd.read_csv(args.source)
+        else:
+            parser.error(f"cannot tell the format of {args.source}; expected .csv, .json, .ndjson or .jsonl")
+        if args.query and 'query' in df.columns:
+            df = df[df['query'] == args.query]
+        profile = profile_frame(df)
+    else:
+        from results_store import STORE_PATH, ResultStore
+        profile = profile_store(ResultStore(args.db or STORE_PATH), args.query)
+
+    print(json.dumps(profile, indent=2) if args.json else format_profile(profile))
+
+
+if __name__ == '__main__':
+    main()
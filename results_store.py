@@ -0,0 +1,425 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from incremental import normalize_count, normalize_rating
+from parsing import EXTENDED_FIELDS, typed_value
+
+STORE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'gnp_scraper', 'results.db')
+
+# Fields stored in their own columns; anything else a record carries goes into `extra` as JSON
+FIELDS = ('place_id', 'name', 'phone', 'email', 'website', 'address', 'rating', 'reviews_count',
+          'category') + tuple(EXTENDED_FIELDS)
+
+SQL_TYPES = {str: 'TEXT', int: 'INTEGER', float: 'REAL'}
+
+# Columns the store maintains itself, never copied into `extra`
+BOOKKEEPING = ('id', 'query', 'fetched_at')
+
+# Columns added after a table was first created are migrated in by ensure_columns
+PLACE_COLUMNS = {
+    'place_key': 'TEXT NOT NULL UNIQUE',
+    'place_id': 'TEXT',
+    'query': 'TEXT',
+    'name': 'TEXT',
+    'phone': 'TEXT',
+    'email': 'TEXT',
+    'website': 'TEXT',
+    'address': 'TEXT',
+    'rating': 'REAL',
+    'reviews_count': 'INTEGER',
+    'category': 'TEXT',
+    **{field: SQL_TYPES[kind] for field, kind in EXTENDED_FIELDS.items()},
+    'extra': 'TEXT',
+    'fetched_at': 'REAL NOT NULL',
+}
+
+# Columns the results table can be sorted by
+SORTABLE = ('name', 'rating', 'reviews_count', 'category', 'query', 'fetched_at')
+
+RUN_COLUMNS = {
+    'query': 'TEXT',
+    'started_at': 'REAL NOT NULL',
+    'results_count': 'INTEGER NOT NULL DEFAULT 0',
+    'status': 'TEXT',
+    'duration': 'REAL',
+    'listings_per_sec': 'REAL',
+    'retries': 'INTEGER',
+    'stale_retries': 'INTEGER',
+    'driver_recycles': 'INTEGER',
+    'failed': 'INTEGER',
+    'peak_rss_mb': 'REAL',
+    # Stage times, cache hits and failures by type, as JSON
+    'extra': 'TEXT',
+}
+
+# Reviews are keyed by place and Google's review ID, so re-scraping a place refreshes them
+REVIEW_COLUMNS = {
+    'review_key': 'TEXT NOT NULL UNIQUE',
+    'place_id': 'TEXT',
+    'review_id': 'TEXT',
+    'author': 'TEXT',
+    'rating': 'REAL',
+    'date': 'TEXT',
+    'text': 'TEXT',
+    'fetched_at': 'REAL NOT NULL',
+}
+
+REVIEW_FIELDS = ('place_id', 'review_id', 'author', 'rating', 'date', 'text')
+
+# Per-run figures with their own columns; add_run keeps the rest of a metrics dict in `extra`
+RUN_METRICS = ('duration', 'listings_per_sec', 'retries', 'stale_retries', 'driver_recycles', 'failed',
+               'peak_rss_mb')
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS places_place_id ON places (place_id)",
+    "CREATE INDEX IF NOT EXISTS places_query ON places (query)",
+    "CREATE INDEX IF NOT EXISTS places_category ON places (category)",
+    "CREATE INDEX IF NOT EXISTS places_fetched_at ON places (fetched_at)",
+    "CREATE INDEX IF NOT EXISTS places_name ON places (name)",
+    "CREATE INDEX IF NOT EXISTS places_rating ON places (rating)",
+    "CREATE INDEX IF NOT EXISTS places_reviews_count ON places (reviews_count)",
+    "CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at)",
+    "CREATE INDEX IF NOT EXISTS reviews_place_id ON reviews (place_id)",
+)
+
+
+def result_key(record):
+    """Key results by place ID so replayed or overlapping runs overwrite instead of duplicating"""
+    return record.get('place_id') or f"{record.get('name') or ''}|{record.get('address') or ''}"
+
+
+def clean_value(value):
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value in ('', 'N/A') else value
+
+
+def ensure_columns(conn, table, columns):
+    """Create a table, or add whichever of its columns an older database lacks"""
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        + ', '.join(f"{name} {kind}" for name, kind in columns.items()) + ")"
+    )
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, kind in columns.items():
+        if name not in existing:
+            # SQLite cannot add UNIQUE or NOT NULL-without-default columns to a populated table
+            kind = kind.replace(' UNIQUE', '').replace(' NOT NULL', '')
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+
+class ResultStore:
+    """Places and run history in SQLite, upserted by place and queried with aggregates"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.transaction() as conn:
+            ensure_columns(conn, 'places', PLACE_COLUMNS)
+            ensure_columns(conn, 'runs', RUN_COLUMNS)
+            ensure_columns(conn, 'reviews', REVIEW_COLUMNS)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            for statement in INDEXES:
+                conn.execute(statement)
+
+    def connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _bump_version(self, conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    @property
+    def version(self):
+        """Increases on every write, so derived views can be cached against it"""
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def _row(self, record, query, fetched_at):
+        values = {field: clean_value(record.get(field)) for field in FIELDS}
+        values['rating'] = normalize_rating(values['rating']) if values['rating'] is not None else None
+        values['reviews_count'] = normalize_count(values['reviews_count'])
+        for field in EXTENDED_FIELDS:
+            values[field] = typed_value(field, values[field])
+        extra = {key: value for key, value in record.items() if key not in FIELDS and key not in BOOKKEEPING}
+        return (result_key(record), query or record.get('query')) + tuple(values[field] for field in FIELDS) + (
+            json.dumps(extra, default=str) if extra else None, fetched_at)
+
+    def upsert_many(self, records, query=None):
+        """Insert or update records by place, keeping stored values the new record lacks"""
+        now = time.time()
+        rows = [self._row(record, query, now) for record in records]
+        if not rows:
+            return 0
+        columns = ('place_key', 'query') + FIELDS + ('extra', 'fetched_at')
+        updates = ', '.join(f"{column} = COALESCE(excluded.{column}, places.{column})"
+                            for column in columns[1:-1])
+        with self.transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO places ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(place_key) DO UPDATE SET {updates}, fetched_at = excluded.fetched_at",
+                rows
+            )
+            self._bump_version(conn)
+        return len(rows)
+
+    def upsert(self, record, query=None):
+        return self.upsert_many([record], query)
+
+    def _records(self, sql, params=()):
+        cursor = self.connection().execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        records = []
+        for row in cursor:
+            record = dict(zip(columns, row))
+            extra = record.pop('extra', None)
+            if extra:
+                record.update(json.loads(extra))
+            records.append(record)
+        return records
+
+    def records(self, query=None):
+        columns = ', '.join(FIELDS + ('query', 'extra', 'fetched_at'))
+        if query:
+            return self._records(f"SELECT {columns} FROM places WHERE query = ? ORDER BY id", (query,))
+        return self._records(f"SELECT {columns} FROM places ORDER BY id")
+
+    def iter_records(self, batch_size=5000, **filters):
+        """Yield filtered records in id order, one batch at a time
+
+        Batches continue from the last id seen rather than using OFFSET, so each one
+        is an index seek and memory stays bounded by the batch size.
+        """
+        where, params = self._filters(**filters)
+        where = where.replace(' WHERE ', ' AND ', 1) if where else ''
+        columns = ', '.join(('id',) + FIELDS + ('query', 'extra', 'fetched_at'))
+        last_id = 0
+        while True:
+            batch = self._records(
+                f"SELECT {columns} FROM places WHERE id > ?{where} ORDER BY id LIMIT ?",
+                [last_id] + params + [batch_size]
+            )
+            if not batch:
+                return
+            last_id = batch[-1]['id']
+            for record in batch:
+                del record['id']
+                yield record
+
+    def extra_keys(self, **filters):
+        """Every extra field name used by the filtered records, read without loading them"""
+        where, params = self._filters(**filters)
+        rows = self.connection().execute(
+            f"SELECT DISTINCT json_each.key FROM (SELECT extra FROM places{where}) AS p, json_each(p.extra) "
+            "ORDER BY json_each.key", params)
+        return [key for key, in rows]
+
+    def key_rows(self):
+        """The columns deduplication needs for every place, without the JSON extras"""
+        return self._records("SELECT id, place_id, name, phone, website, address FROM places ORDER BY id")
+
+    def records_by_id(self, ids):
+        columns = ', '.join(('id',) + FIELDS + ('query', 'extra', 'fetched_at'))
+        records = self._records(
+            f"SELECT {columns} FROM places WHERE id IN ({', '.join('?' * len(ids))})", list(ids))
+        return {record.pop('id'): record for record in records}
+
+    def records_by_place_id(self, place_ids):
+        """Stored records for the given place IDs, read through the place_id index"""
+        columns = ', '.join(FIELDS + ('query', 'extra', 'fetched_at'))
+        place_ids = list(dict.fromkeys(place_ids))
+        records = []
+        # Chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(place_ids), 500):
+            chunk = place_ids[start:start + 500]
+            records += self._records(
+                f"SELECT {columns} FROM places WHERE place_id IN ({', '.join('?' * len(chunk))})", chunk)
+        return records
+
+    def collapse(self, collapses):
+        """Replace each group of duplicate rows by one merged row: (keep_id, drop_ids, merged)"""
+        columns = ('place_key', 'query') + FIELDS + ('extra', 'fetched_at')
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        with self.transaction() as conn:
+            for keep_id, drop_ids, merged in collapses:
+                # Dropped rows go first, the survivor may take over one of their keys
+                conn.executemany("DELETE FROM places WHERE id = ?", [(row_id,) for row_id in drop_ids])
+                row = self._row(merged, merged.get('query'), merged.get('fetched_at') or time.time())
+                conn.execute(f"UPDATE places SET {assignments} WHERE id = ?", row + (keep_id,))
+            self._bump_version(conn)
+
+    def recent(self, limit=10):
+        columns = ', '.join(FIELDS + ('query', 'extra', 'fetched_at'))
+        return self._records(f"SELECT {columns} FROM places ORDER BY fetched_at DESC LIMIT ?", (limit,))
+
+    def _filters(self, search=None, query=None, category=None, min_rating=None):
+        clauses, params = [], []
+        if search:
+            clauses.append("(name LIKE ? ESCAPE '\\' OR category LIKE ? ESCAPE '\\')")
+            pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params += [pattern, pattern]
+        if query:
+            clauses.append("query = ?")
+            params.append(query)
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if min_rating:
+            clauses.append("rating >= ?")
+            params.append(min_rating)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def page(self, page=1, page_size=50, sort_by='fetched_at', descending=True, **filters):
+        """One page of filtered, sorted records plus the number of records matching the filters"""
+        if sort_by not in SORTABLE:
+            raise ValueError(f"Cannot sort by {sort_by}")
+        where, params = self._filters(**filters)
+        total = self.count(**filters)
+        # id breaks ties so pages never overlap when many rows share a sort value
+        direction = 'DESC' if descending else 'ASC'
+        columns = ', '.join(FIELDS + ('query', 'extra', 'fetched_at'))
+        records = self._records(
+            f"SELECT {columns} FROM places{where} ORDER BY {sort_by} {direction}, id {direction} LIMIT ? OFFSET ?",
+            params + [page_size, max(0, page - 1) * page_size]
+        )
+        return records, total
+
+    def distinct(self, column, limit=500):
+        """Distinct non-empty values of an indexed column, for filter choices"""
+        if column not in ('query', 'category'):
+            raise ValueError(f"No index on {column}")
+        rows = self.connection().execute(
+            f"SELECT DISTINCT {column} FROM places WHERE {column} IS NOT NULL ORDER BY {column} LIMIT ?", (limit,))
+        return [row[0] for row in rows]
+
+    def count(self, **filters):
+        """Number of records matching the filters accepted by page()"""
+        where, params = self._filters(**filters)
+        return self.connection().execute(f"SELECT COUNT(*) FROM places{where}", params).fetchone()[0]
+
+    def summary(self):
+        """Row count, non-empty count per contact field and the average rating"""
+        row = self.connection().execute(
+            "SELECT COUNT(*), COUNT(phone), COUNT(email), COUNT(website), COUNT(address), "
+            "COUNT(rating), AVG(rating) FROM places"
+        ).fetchone()
+        return {
+            'total': row[0],
+            'filled': {'phone': row[1], 'email': row[2], 'website': row[3], 'address': row[4], 'rating': row[5]},
+            'average_rating': row[6],
+        }
+
+    def clear(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM places")
+            conn.execute("DELETE FROM reviews")
+            self._bump_version(conn)
+
+    def upsert_reviews(self, reviews):
+        """Insert or refresh a batch of reviews, each carrying its place_id"""
+        now = time.time()
+        rows = [(f"{review['place_id']}|{review['review_id']}",)
+                + tuple(clean_value(review.get(field)) for field in REVIEW_FIELDS) + (now,)
+                for review in reviews]
+        if not rows:
+            return 0
+        columns = ('review_key',) + REVIEW_FIELDS + ('fetched_at',)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns[1:])
+        with self.transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO reviews ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(review_key) DO UPDATE SET {updates}",
+                rows
+            )
+        return len(rows)
+
+    def iter_reviews(self, place_id=None, batch_size=5000):
+        """Yield reviews in insertion order, a keyset-paginated batch at a time"""
+        columns = ', '.join(('id',) + REVIEW_FIELDS + ('fetched_at',))
+        where, params = (" AND place_id = ?", [place_id]) if place_id else ('', [])
+        last_id = 0
+        while True:
+            batch = self._records(
+                f"SELECT {columns} FROM reviews WHERE id > ?{where} ORDER BY id LIMIT ?",
+                [last_id] + params + [batch_size]
+            )
+            if not batch:
+                return
+            last_id = batch[-1]['id']
+            for review in batch:
+                del review['id']
+                yield review
+
+    def review_counts(self):
+        """Stored reviews per place"""
+        return dict(self.connection().execute("SELECT place_id, COUNT(*) FROM reviews GROUP BY place_id"))
+
+    def add_run(self, query, results_count, status, started_at=None, metrics=None):
+        """Record a run, with the performance figures from run_metrics.run_metrics if given"""
+        metrics = dict(metrics or {})
+        values = [metrics.pop(name, None) for name in RUN_METRICS]
+        with self.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO runs (query, started_at, results_count, status, {', '.join(RUN_METRICS)}, extra) "
+                f"VALUES ({', '.join('?' * (5 + len(RUN_METRICS)))})",
+                (query, started_at or time.time(), results_count, status, *values,
+                 json.dumps(metrics) if metrics else None)
+            )
+
+    def runs(self, limit=None):
+        sql = (f"SELECT query, started_at, results_count, status, {', '.join(RUN_METRICS)}, extra "
+               "FROM runs ORDER BY started_at DESC")
+        if limit:
+            return self._records(sql + " LIMIT ?", (limit,))
+        return self._records(sql)
+
+    def run_summary(self):
+        row = self.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'Success'), 0), COALESCE(SUM(results_count), 0), "
+            "AVG(CASE WHEN status = 'Success' THEN listings_per_sec END) FROM runs"
+        ).fetchone()
+        return {'runs': row[0], 'successful': row[1], 'records': row[2], 'listings_per_sec': row[3]}
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_store(path=STORE_PATH):
+    """Process-wide store, kept across Streamlit reruns"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None or _shared_store.path != path:
+            _shared_store = ResultStore(path)
+        return _shared_store
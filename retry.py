@@ -0,0 +1,61 @@
+import random
+
+# Failure classes recorded per listing attempt
+CLICK_FAILED = 'click_failed'
+PANEL_EMPTY = 'panel_empty'
+STALE_ELEMENT = 'stale_element'
+SESSION_LOST = 'session_lost'
+UNKNOWN_ERROR = 'error'
+
+FAILURE_TYPES = (CLICK_FAILED, PANEL_EMPTY, STALE_ELEMENT, SESSION_LOST, UNKNOWN_ERROR)
+
+# Fragments of WebDriver error messages that mean the browser session is gone
+SESSION_LOST_MARKERS = (
+    'invalid session id',
+    'session deleted',
+    'no such window',
+    'chrome not reachable',
+    'disconnected',
+    'connection refused',
+    'connection aborted',
+    'max retries exceeded',
+)
+
+
+def classify_failure(error):
+    """Map an exception raised while handling a listing to a failure class"""
+    name = type(error).__name__
+    message = str(error).lower()
+    if name == 'StaleElementReferenceException':
+        return STALE_ELEMENT
+    if name in ('InvalidSessionIdException', 'NoSuchWindowException', 'ConnectionError',
+                'ConnectionRefusedError', 'ProtocolError', 'MaxRetryError'):
+        return SESSION_LOST
+    if any(marker in message for marker in SESSION_LOST_MARKERS):
+        return SESSION_LOST
+    return UNKNOWN_ERROR
+
+
+class RetryPolicy:
+    """How many times a listing is attempted and how long to back off between tries"""
+
+    def __init__(self, attempts=3, base_delay=0.5, max_delay=8.0, jitter=0.25):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def should_retry(self, failure, attempt):
+        """Whether another attempt follows the given (1-based) failed attempt"""
+        return attempt < self.attempts
+
+    def backoff(self, attempt, failure=None):
+        """Exponential backoff with jitter; stale elements retry almost immediately"""
+        if failure == STALE_ELEMENT:
+            return 0.1
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+def new_failure_stats():
+    return {failure: 0 for failure in FAILURE_TYPES}
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import time
+
+from parsing import OPEN_REVIEWS_JS, REVIEW_BATCH_JS, place_id_from_url, place_url, review_to_record
+from retry import SESSION_LOST, classify_failure, new_failure_stats
+from run_metrics import add_counts
+from workers import pool_size, run_worker_pool
+
+# Reviews read per script call; also how many are held in memory before reaching the sink
+BATCH_SIZE = 50
+
+
+def open_reviews(extractor, url, timeout=10):
+    """Open a place and its reviews pane, returning False if it has no reviews to show"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    if not extractor.open_listing_url(url):
+        return False
+    if not extractor.driver.execute_script(OPEN_REVIEWS_JS):
+        return False
+    try:
+        WebDriverWait(extractor.driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'div.jftiEf[data-review-id]')))
+    except TimeoutException:
+        return False
+    return True
+
+
+def stream_reviews(driver, place_id, sink, max_reviews=200, pause=1.0, stall_rounds=4, should_stop=None):
+    """Scroll an open reviews pane, passing each batch of reviews to sink as it is read
+
+    Reading stops at max_reviews (None for all of them) or once several scrolls in a
+    row load nothing new. Read nodes are emptied in the page, so neither the browser
+    nor this process holds more than a batch of review text at a time.
+    """
+    read = 0
+    stalled = 0
+    while max_reviews is None or read < max_reviews:
+        if should_stop and should_stop():
+            break
+        limit = BATCH_SIZE if max_reviews is None else min(BATCH_SIZE, max_reviews - read)
+        batch = driver.execute_script(REVIEW_BATCH_JS, limit)
+        reviews = [review_to_record(place_id, review) for review in batch['reviews'] if review.get('review_id')]
+        if reviews:
+            sink(reviews)
+            read += len(reviews)
+            stalled = 0
+            if batch['pending']:
+                continue
+        else:
+            stalled += 1
+            # A visible spinner means Maps is still fetching, so it gets longer before giving up
+            if stalled >= (stall_rounds * 3 if batch['loading'] else stall_rounds):
+                break
+        time.sleep(pause)
+    return read
+
+
+def scrape_place_reviews(extractor, place, sink, max_reviews=200, should_stop=None):
+    """Stream one place's reviews to sink, returning how many were read"""
+    url = place['url']
+    if not open_reviews(extractor, url):
+        return 0
+    # Reviews are filed under the same place ID the results store uses
+    place_id = place.get('place_id') or place_id_from_url(extractor.driver.current_url) or url
+    return stream_reviews(extractor.driver, place_id, sink, max_reviews, should_stop=should_stop)
+
+
+def _review_worker_main(worker_id, places, extractor_options, rate, max_reviews, store_path,
+                        result_queue, stop_event):
+    """Process entry point: own one driver and stream a slice of places' reviews into the store"""
+    from extractor import GoogleMapsExtractorStreamlit
+    from results_store import ResultStore
+    from throttle import AdaptiveRateLimiter
+
+    started = time.time()
+    store = ResultStore(store_path)
+    extractor = GoogleMapsExtractorStreamlit(rate_limiter=AdaptiveRateLimiter(rate=rate), **extractor_options)
+    summary = {'worker': worker_id, 'pid': os.getpid(), 'places': 0, 'reviews': 0, 'failed': 0,
+               'failures': new_failure_stats()}
+
+    try:
+        success, message = extractor.initialize_driver()
+        if not success:
+            result_queue.put(('error', worker_id, message))
+            return
+
+        for place in places:
+            if stop_event.is_set():
+                break
+            extractor.rate_limiter.acquire()
+            try:
+                count = scrape_place_reviews(extractor, place, store.upsert_reviews, max_reviews,
+                                             should_stop=stop_event.is_set)
+                summary['places'] += 1
+                summary['reviews'] += count
+                result_queue.put(('place', worker_id, {'url': place['url'], 'reviews': count}))
+            except Exception as e:
+                failure = classify_failure(e)
+                summary['failed'] += 1
+                summary['failures'][failure] += 1
+                result_queue.put(('failed', worker_id, {'url': place['url'], 'failure': failure}))
+                if failure == SESSION_LOST and not extractor.recover_session():
+                    break
+            if not extractor.maybe_recycle_driver():
+                break
+
+    except Exception as e:
+        result_queue.put(('error', worker_id, str(e)))
+    finally:
+        extractor.close()
+        store.close()
+        summary['duration'] = round(time.time() - started, 2)
+        summary['peak_rss_mb'] = round(extractor.stats['peak_rss_mb'], 1)
+        result_queue.put(('done', worker_id, summary))
+
+
+def run_review_pool(places, processes=None, extractor_options=None, rate=1.0, max_reviews=200,
+                    store_path=None, progress_callback=None, should_stop=None):
+    """Scrape reviews for places across worker processes that each own a browser
+
+    places are dicts with a url and optionally the place_id to file reviews under.
+    Workers write reviews to the store themselves; only counts come back here.
+    """
+    from results_store import STORE_PATH
+
+    places = list(places)
+    processes = pool_size(processes, places)
+    handled = 0
+    reviews = 0
+
+    def on_message(kind, worker_id, payload):
+        nonlocal handled, reviews
+        handled += 1
+        reviews += payload.get('reviews', 0)
+        if progress_callback:
+            progress_callback({
+                'stage': 'success' if kind == 'place' else 'failed',
+                'current': handled,
+                'total': len(places),
+                'extracted': reviews,
+                'status': f"💬 {payload['reviews']} reviews from {payload['url']}" if kind == 'place'
+                          else f"⚠️ Worker {worker_id} could not read reviews ({payload['failure']})",
+            })
+
+    summaries, errors = run_worker_pool(
+        _review_worker_main, [places[worker_id::processes] for worker_id in range(processes)],
+        (dict(extractor_options or {}), rate / processes, max_reviews, store_path or STORE_PATH),
+        on_message, should_stop)
+
+    failures = new_failure_stats()
+    for summary in summaries:
+        add_counts(failures, summary['failures'])
+    return {
+        'places': sum(summary['places'] for summary in summaries),
+        'reviews': sum(summary['reviews'] for summary in summaries),
+        'failed': sum(summary['failed'] for summary in summaries),
+        'failures': failures,
+        'peak_rss_mb': max((summary['peak_rss_mb'] for summary in summaries), default=0),
+        'workers': summaries,
+        'errors': errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Google Maps reviews into the result store")
+    parser.add_argument('urls', nargs='*', help="place URLs (default: every place in the store)")
+    parser.add_argument('--db', help="result store path")
+    parser.add_argument('--query', help="only places stored for this query")
+    parser.add_argument('--max-reviews', type=int, default=200, help="cap per place; 0 reads them all")
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=0.5, help="places opened per second across processes")
+    parser.add_argument('--show-browser', action='store_true')
+    args = parser.parse_args(argv)
+
+    from results_store import STORE_PATH, ResultStore
+    store_path = args.db or STORE_PATH
+    if args.urls:
+        places = [{'url': url, 'place_id': place_id_from_url(url)} for url in args.urls]
+    else:
+        store = ResultStore(store_path)
+        places = [{'url': place_url(record['place_id']), 'place_id': record['place_id']}
+                  for record in store.iter_records(query=args.query) if place_url(record['place_id'])]
+        store.close()
+
+    stats = run_review_pool(places, args.processes, {'headless': not args.show_browser}, args.rate,
+                            args.max_reviews or None, store_path)
+    print(json.dumps({key: value for key, value in stats.items() if key != 'workers'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Wall time per stage of a run; a nested stage pauses the one it interrupts
+
+    Stages are exclusive, so a browser restart inside the extraction stage is
+    charged to browser startup only and the stage times add up to the run.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.stack = []
+        self.mark = None
+
+    def _charge(self, now):
+        stage = self.stack[-1]
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + now - self.mark
+        self.mark = now
+
+    @contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self.stack:
+            self._charge(now)
+        self.stack.append(name)
+        self.mark = now
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self.stack.pop()
+
+
+def add_counts(target, counts):
+    """Sum a dict of counts or seconds into target"""
+    for key, value in (counts or {}).items():
+        target[key] = target.get(key, 0) + value
+    return target
+
+
+def run_metrics(started_at, results_count, extractor_stats=None, stage_seconds=None, cache_hits=None):
+    """Performance figures of one run, in the shape ResultStore.add_run persists"""
+    stats = extractor_stats or {}
+    duration = time.time() - started_at
+    failures = {failure: count for failure, count in stats.get('failures', {}).items() if count}
+    stages = add_counts(dict(stats.get('stage_seconds', {})), stage_seconds)
+    return {
+        'duration': round(duration, 2),
+        'listings_per_sec': round(results_count / duration, 3) if duration > 0 else None,
+        'retries': stats.get('retries', 0),
+        'stale_retries': stats.get('stale_retries', 0),
+        'driver_recycles': stats.get('driver_recycles', 0),
+        # Listings that ended up without a record; failures counts every failed attempt
+        'failed': stats.get('failed', 0),
+        'peak_rss_mb': round(stats['peak_rss_mb'], 1) if stats.get('peak_rss_mb') else None,
+        'stage_seconds': {stage: round(seconds, 2) for stage, seconds in stages.items()},
+        'cache_hits': add_counts(dict(stats.get('cache_hits', {})), cache_hits),
+        'failures': failures,
+    }
@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from distributed import DONE, FAILED, LEASED, PENDING, PLACE_JOB, SEARCH_JOB, RedisQueue, SQLiteQueue
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def make_queue(request, tmp_path, monkeypatch):
+    """Build queues on SQLite, or on an in-process Redis stand-in when fakeredis is installed"""
+    queues = []
+
+    def make(**options):
+        if request.param == 'sqlite':
+            job_queue = SQLiteQueue(str(tmp_path / f"queue-{len(queues)}.db"), **options)
+        else:
+            fakeredis = pytest.importorskip('fakeredis')
+            pytest.importorskip('lupa')
+            import redis
+            server = fakeredis.FakeServer()
+            monkeypatch.setattr(redis.Redis, 'from_url',
+                                lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+            job_queue = RedisQueue('redis://localhost', namespace=f"test{len(queues)}", **options)
+        queues.append(job_queue)
+        return job_queue
+
+    yield make
+    for job_queue in queues:
+        job_queue.close()
+
+
+def test_push_ignores_duplicate_keys(make_queue):
+    job_queue = make_queue()
+    assert job_queue.push(PLACE_JOB, {'url': 'a'}, 'place:a')
+    assert not job_queue.push(PLACE_JOB, {'url': 'a again'}, 'place:a')
+    assert job_queue.counts()[PLACE_JOB][PENDING] == 1
+
+
+def test_claim_leases_jobs_in_order(make_queue):
+    job_queue = make_queue()
+    job_queue.push(SEARCH_JOB, {'query': 'first'}, 'search:first')
+    job_queue.push(PLACE_JOB, {'url': 'second'}, 'place:second')
+
+    first = job_queue.claim('worker-1')
+    second = job_queue.claim('worker-2')
+
+    assert (first['kind'], first['payload'], first['attempts']) == (SEARCH_JOB, {'query': 'first'}, 1)
+    assert second['payload'] == {'url': 'second'}
+    assert job_queue.claim('worker-3') is None
+    assert job_queue.counts()[PLACE_JOB][LEASED] == 1
+
+
+def test_expired_lease_is_handed_out_again(make_queue):
+    job_queue = make_queue(lease_seconds=0.05)
+    job_queue.push(PLACE_JOB, {'url': 'a'}, 'place:a')
+
+    job_queue.claim('dead-worker')
+    assert job_queue.claim('worker-2') is None
+    time.sleep(0.1)
+
+    job = job_queue.claim('worker-2')
+    assert job['payload'] == {'url': 'a'}
+    assert job['attempts'] == 2
+    job_queue.complete(job)
+    assert job_queue.counts()[PLACE_JOB][DONE] == 1
+
+
+def test_job_that_keeps_expiring_is_failed(make_queue):
+    job_queue = make_queue(lease_seconds=0.05, max_attempts=2)
+    job_queue.push(PLACE_JOB, {'url': 'crashes chrome'}, 'place:crash')
+
+    for _ in range(2):
+        assert job_queue.claim('worker') is not None
+        time.sleep(0.1)
+
+    assert job_queue.claim('worker') is None
+    counts = job_queue.counts()[PLACE_JOB]
+    assert (counts[FAILED], counts[PENDING], counts[LEASED]) == (1, 0, 0)
+
+
+def test_worker_that_lost_its_lease_cannot_finish_the_job(make_queue):
+    job_queue = make_queue(lease_seconds=0.05)
+    job_queue.push(PLACE_JOB, {'url': 'a'}, 'place:a')
+
+    stale = job_queue.claim('slow-worker')
+    time.sleep(0.1)
+    current = job_queue.claim('worker-2')
+
+    assert not job_queue.complete(stale)
+    assert not job_queue.fail(stale, 'timed out')
+    assert job_queue.complete(current)
+    assert not job_queue.complete(current)
+
+    counts = job_queue.counts()[PLACE_JOB]
+    assert (counts[DONE], counts[PENDING], counts[LEASED]) == (1, 0, 0)
+    assert job_queue.claim('worker-3') is None
+
+
+def test_fail_requeues_until_attempts_run_out(make_queue):
+    job_queue = make_queue(max_attempts=2)
+    job_queue.push(PLACE_JOB, {'url': 'a'}, 'place:a')
+
+    job_queue.fail(job_queue.claim('worker'), 'panel empty')
+    assert job_queue.counts()[PLACE_JOB][PENDING] == 1
+
+    job_queue.fail(job_queue.claim('worker'), 'panel empty')
+    assert job_queue.claim('worker') is None
+    assert job_queue.counts()[PLACE_JOB][FAILED] == 1
+
+
+def test_upsert_result_is_idempotent_by_place(make_queue):
+    job_queue = make_queue()
+    job_queue.upsert_result({'place_id': 'ChIJ1', 'name': 'Cafe', 'phone': '555 0100'}, 'cafes')
+    # A replayed job that failed to read the phone must not blank it
+    job_queue.upsert_result({'place_id': 'ChIJ1', 'name': 'Cafe', 'phone': None, 'website': 'cafe.test'}, 'cafes')
+
+    results = list(job_queue.results())
+    assert len(results) == 1
+    assert (results[0]['phone'], results[0]['website']) == ('555 0100', 'cafe.test')
+    assert job_queue.counts()['results'] == 1
+    assert list(job_queue.results('other query')) == []
@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+
+from enrichment import WebsiteEnricher
+
+HOME = """
+<html><body>
+  <a href="/contact-us">Contact</a>
+  <a href="https://www.facebook.com/sharer/sharer.php?u=x">Share</a>
+  <a href="https://instagram.com/bakery">Instagram</a>
+</body></html>
+"""
+
+CONTACT = """
+<html><body>
+  Write to <a href="mailto:hello@bakery.test">hello@bakery.test</a>
+  <a href="https://www.facebook.com/bakery">Facebook</a>
+</body></html>
+"""
+
+
+class Site:
+    """Local stand-in for business websites, recording how it was called"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    async def page(self, request):
+        self.requests.append(request.path)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if request.path.startswith('/slow'):
+                await asyncio.sleep(5)
+            body = CONTACT if request.path == '/contact-us' else HOME
+            return web.Response(text=body, content_type='text/html')
+        finally:
+            self.active -= 1
+
+
+def serve(site, scenario):
+    """Run scenario(base_url) against site served on a free local port"""
+    async def main():
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', site.page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        server = web.TCPSite(runner, '127.0.0.1', 0)
+        await server.start()
+        try:
+            return await scenario(f"http://127.0.0.1:{runner.addresses[0][1]}")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def enrich(site, records, **options):
+    """Enrich records whose websites are paths on site, returning the enricher and elapsed time"""
+    async def scenario(base_url):
+        for record in records:
+            record['website'] = base_url + record['website']
+        enricher = WebsiteEnricher(**options)
+        started = time.perf_counter()
+        await enricher.enrich_all(records)
+        return enricher, time.perf_counter() - started
+
+    return serve(site, scenario)
+
+
+def test_finds_email_and_social_links_on_contact_pages(tmp_path):
+    site = Site()
+    records = [{'name': 'Bakery', 'website': '/'}]
+    enricher, _ = enrich(site, records, cache_dir=str(tmp_path))
+
+    assert records[0]['email'] == 'hello@bakery.test'
+    # The share widget is skipped in favour of the profile link on the contact page
+    assert records[0]['social_links'] == 'https://instagram.com/bakery; https://www.facebook.com/bakery'
+    assert site.requests == ['/', '/contact-us']
+    assert enricher.stats['emails_found'] == 1
+
+
+def test_keeps_an_existing_email(tmp_path):
+    records = [{'name': 'Bakery', 'website': '/', 'email': 'owner@bakery.test'}]
+    enrich(Site(), records, cache_dir=str(tmp_path))
+    assert records[0]['email'] == 'owner@bakery.test'
+
+
+def test_per_host_limit_bounds_concurrent_requests(tmp_path):
+    site = Site(delay=0.2)
+    records = [{'name': f"Shop {i}", 'website': f"/shop-{i}"} for i in range(10)]
+    _, elapsed = enrich(site, records, cache_dir=str(tmp_path), per_host_limit=2)
+
+    assert site.peak == 2
+    # Ten 0.2 s home pages alone, two at a time
+    assert elapsed >= 1.0
+
+
+def test_pooled_requests_overlap(tmp_path):
+    """Benchmark: ten 0.2 s sites over five connections finish well under the sequential time"""
+    site = Site(delay=0.2)
+    records = [{'name': f"Shop {i}", 'website': f"/shop-{i}"} for i in range(10)]
+    _, elapsed = enrich(site, records, cache_dir=str(tmp_path), per_host_limit=5)
+
+    assert site.peak == 5
+    # Sequential fetching would take at least 10 x 0.2 s for the home pages alone
+    assert elapsed < 2.0
+
+
+def test_timeouts_are_counted_and_not_cached(tmp_path):
+    site = Site()
+    records = [{'name': 'Slow', 'website': '/slow'}]
+    enricher, elapsed = enrich(site, records, cache_dir=str(tmp_path), timeout=0.5)
+
+    assert elapsed < 3
+    assert enricher.stats['fetch_errors'] == 1
+    assert records[0].get('email') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_second_run_is_served_from_cache(tmp_path):
+    site = Site()
+
+    async def scenario(base_url):
+        first = WebsiteEnricher(cache_dir=str(tmp_path))
+        await first.enrich_all([{'name': 'Bakery', 'website': base_url + '/'}])
+        second = WebsiteEnricher(cache_dir=str(tmp_path))
+        records = [{'name': 'Bakery', 'website': base_url + '/'}]
+        await second.enrich_all(records)
+        return second, records
+
+    enricher, records = serve(site, scenario)
+
+    assert site.requests == ['/', '/contact-us']
+    assert enricher.cache.hits == 2
+    assert enricher.stats['pages_fetched'] == 0
+    assert records[0]['email'] == 'hello@bakery.test'
@@ -0,0 +1,30 @@
+from incremental import card_place_id, diff_cards
+from parsing import panel_to_details
+from results_store import ResultStore
+
+# The same place as a feed-card href (feature ID plus ChIJ ID) and as the open panel's URL
+FEED_URL = ('https://www.google.com/maps/place/Joe%27s+Pizza/data=!4m7!3m6'
+            '!1s0x89c259a9b3117469:0x3c9d2c8f6b2a0e1!8m2!3d40.73!4d-73.99!16s%2Fg%2F1tdv3k2x!19sChIJAAAA')
+PANEL_URL = ('https://www.google.com/maps/place/Joe%27s+Pizza/@40.73,-73.99,17z/data=!4m6!3m5'
+             '!1s0x89c259a9b3117469:0x3c9d2c8f6b2a0e1!8m2!3d40.73!4d-73.99')
+
+
+def diff_against_store(store, cards):
+    """Diff cards the way run_incremental_batch does, reading only their stored places"""
+    place_ids = [card_place_id(card) for card in cards]
+    return diff_cards(cards, store.records_by_place_id([place_id for place_id in place_ids if place_id]))
+
+
+def test_feed_card_matches_a_panel_extracted_row(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    panel = {'name': "Joe's Pizza", 'rating': '4.5', 'reviews_count': '1,203', 'url': PANEL_URL}
+    store.upsert(panel_to_details(panel), 'pizza')
+
+    card = {'url': FEED_URL, 'name': "Joe's Pizza", 'rating': '4.5', 'reviews_count': '1,203'}
+    new, changed, unchanged = diff_against_store(store, [card])
+    assert (len(new), len(changed), len(unchanged)) == (0, 0, 1)
+
+    card['reviews_count'] = '1,210'
+    new, changed, unchanged = diff_against_store(store, [card])
+    assert (len(new), len(changed), len(unchanged)) == (0, 1, 0)
+    store.close()
@@ -0,0 +1,134 @@
+import threading
+import time
+
+# Text Google shows instead of results when it suspects automated traffic
+BLOCK_MARKERS = ('unusual traffic', 'not a robot', 'recaptcha', 'captcha')
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1.0):
+        """Take tokens, sleeping outside the lock until enough have accrued"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts AIMD-style to signs of throttling"""
+
+    def __init__(self, rate=2.0, min_rate=0.1, max_rate=None, increase=0.1, decrease=0.5,
+                 empty_decrease=0.85, healthy_streak=10, block_cooldown=30.0, burst=1.0):
+        self.base_rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate) if max_rate else self.base_rate * 2
+        self.increase = increase
+        self.decrease = decrease
+        self.empty_decrease = empty_decrease
+        self.healthy_streak = healthy_streak
+        self.block_cooldown = block_cooldown
+
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.lock = threading.Lock()
+        self.successes_in_row = 0
+        self.paused_until = 0.0
+        self.stats = {'acquired': 0, 'waited_seconds': 0.0, 'blocks': 0, 'empty_panels': 0,
+                      'rate_increases': 0, 'rate_decreases': 0}
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def configure(self, rate):
+        """Reset the target rate, e.g. after the delay setting changed"""
+        with self.lock:
+            self.base_rate = float(rate)
+            self.max_rate = self.base_rate * 2
+            self.successes_in_row = 0
+            self.bucket.set_rate(rate)
+
+    def acquire(self):
+        """Block until the next request is allowed"""
+        started = time.monotonic()
+        pause = self.paused_until - started
+        if pause > 0:
+            time.sleep(pause)
+        self.bucket.acquire()
+        with self.lock:
+            self.stats['acquired'] += 1
+            self.stats['waited_seconds'] += time.monotonic() - started
+
+    def _set_rate(self, rate, counter):
+        rate = max(self.min_rate, min(self.max_rate, rate))
+        if rate != self.bucket.rate:
+            self.stats[counter] += 1
+            self.bucket.set_rate(rate)
+
+    def report_success(self):
+        """Additive increase after a run of healthy responses"""
+        with self.lock:
+            self.successes_in_row += 1
+            if self.successes_in_row >= self.healthy_streak:
+                self.successes_in_row = 0
+                self._set_rate(self.bucket.rate + self.increase, 'rate_increases')
+
+    def report_empty(self):
+        """Gentle decrease when a panel comes back without data"""
+        with self.lock:
+            self.successes_in_row = 0
+            self.stats['empty_panels'] += 1
+            self._set_rate(self.bucket.rate * self.empty_decrease, 'rate_decreases')
+
+    def report_block(self):
+        """Multiplicative decrease plus a pause for every worker after a block page"""
+        with self.lock:
+            self.successes_in_row = 0
+            self.stats['blocks'] += 1
+            self._set_rate(self.bucket.rate * self.decrease, 'rate_decreases')
+            self.paused_until = max(self.paused_until, time.monotonic() + self.block_cooldown)
+
+
+def is_block_page(url, page_text):
+    """Check whether the browser is looking at a captcha or 'unusual traffic' page"""
+    if url and ('/sorry/' in url or 'google.com/sorry' in url):
+        return True
+    text = (page_text or '').lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter(rate=2.0):
+    """Process-wide limiter shared by every extractor, worker and query"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter(rate=rate)
+        elif abs(_shared_limiter.base_rate - rate) > 1e-9:
+            _shared_limiter.configure(rate)
+        return _shared_limiter
@@ -0,0 +1,237 @@
+import multiprocessing
+import os
+import queue
+import time
+
+from retry import new_failure_stats
+from run_metrics import add_counts
+
+# Stats summed across worker processes; everything else is reported per worker
+SUMMED_STATS = ('retries', 'stale_retries', 'driver_restarts', 'driver_recycles', 'records', 'failed')
+
+
+def _worker_main(worker_id, urls, backend, extractor_options, rate, result_queue, stop_event):
+    """Process entry point: own one extractor of the named backend and extract a slice of place URLs"""
+    # Imported in the child so the parent's Streamlit state never crosses the process boundary
+    import extractor as backends
+    from throttle import AdaptiveRateLimiter
+
+    started = time.time()
+    extractor = getattr(backends, backend)(rate_limiter=AdaptiveRateLimiter(rate=rate), **extractor_options)
+    summary = {'worker': worker_id, 'pid': os.getpid(), 'urls': len(urls), 'records': 0, 'failed': 0}
+    sent = set()
+
+    def on_progress(progress):
+        # The backend checks stop_extraction between listings
+        if stop_event.is_set():
+            extractor.stop_extraction = True
+        # Records stream back as the backend reports them, whether it uses tabs or not
+        if progress['stage'] == 'success' and 'company_name' in progress:
+            details = extractor.results[-1]
+            sent.add(id(details))
+            result_queue.put(('record', worker_id, details))
+        elif progress['stage'] in ('failed', 'error'):
+            result_queue.put(('failed', worker_id, progress['status']))
+
+    try:
+        success, message = extractor.initialize_driver()
+        if not success:
+            result_queue.put(('error', worker_id, message))
+            return
+
+        # Work straight from the URL slice; there is no feed in this browser
+        extractor.direct_navigation = True
+
+        with extractor.timer.stage('extract'):
+            batch, message = extractor.extract_single_batch(len(urls), on_progress, urls=list(urls))
+        for details in batch:
+            if id(details) not in sent:
+                result_queue.put(('record', worker_id, details))
+        summary['records'] = len(batch)
+        if message != "Success":
+            result_queue.put(('error', worker_id, message))
+
+    except Exception as e:
+        result_queue.put(('error', worker_id, str(e)))
+    finally:
+        extractor.close()
+        stats = extractor.stats
+        # Backends without a browser process to sample, like the async one, lack some counters
+        summary.update({
+            'duration': round(time.time() - started, 2),
+            'failed': stats.get('failed', 0),
+            'retries': stats.get('retries', 0),
+            'stale_retries': stats.get('stale_retries', 0),
+            'driver_restarts': stats.get('driver_restarts', 0),
+            'driver_recycles': stats.get('driver_recycles', 0),
+            'failures': stats.get('failures', {}),
+            'peak_rss_mb': round(stats.get('peak_rss_mb', 0), 1),
+            'rss_samples': stats.get('rss_samples', []),
+            'stage_seconds': stats.get('stage_seconds', {}),
+            'cache_hits': stats.get('cache_hits', {}),
+        })
+        result_queue.put(('done', worker_id, summary))
+
+
+def aggregate_worker_stats(summaries):
+    """Combine per-process summaries into totals while keeping the per-worker breakdown"""
+    totals = {key: sum(summary.get(key, 0) for summary in summaries) for key in SUMMED_STATS}
+    totals['failures'] = new_failure_stats()
+    for summary in summaries:
+        for failure, count in summary.get('failures', {}).items():
+            totals['failures'][failure] = totals['failures'].get(failure, 0) + count
+    # Stage times are summed over processes, i.e. browser-seconds rather than wall time
+    totals['stage_seconds'] = {}
+    totals['cache_hits'] = {}
+    for summary in summaries:
+        add_counts(totals['stage_seconds'], summary.get('stage_seconds'))
+        add_counts(totals['cache_hits'], summary.get('cache_hits'))
+    totals['peak_rss_mb'] = max((summary.get('peak_rss_mb', 0) for summary in summaries), default=0)
+    totals['workers'] = summaries
+    return totals
+
+
+def pool_size(processes, items):
+    """Processes to start for items: the requested number, at most one per item"""
+    return max(1, min(processes or os.cpu_count() or 1, len(items) or 1))
+
+
+def run_worker_pool(target, slices, args=(), on_message=None, should_stop=None):
+    """Run target in one spawned process per slice and relay what the workers report
+
+    Each process runs target(worker_id, slice, *args, result_queue, stop_event) and puts
+    (kind, worker_id, payload) messages on the queue, ending with a 'done' summary.
+    Every message other than 'error' and 'done' goes to on_message in this thread.
+    Returns the workers' summaries and error messages.
+    """
+    # spawn keeps children free of the parent's threads, drivers and Streamlit runtime
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    stop_event = context.Event()
+
+    workers = [
+        context.Process(target=target, args=(worker_id, work, *args, result_queue, stop_event), daemon=True)
+        for worker_id, work in enumerate(slices)
+    ]
+    for worker in workers:
+        worker.start()
+
+    summaries = []
+    errors = []
+
+    try:
+        while len(summaries) < len(workers):
+            if should_stop and should_stop():
+                stop_event.set()
+            try:
+                kind, worker_id, payload = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+
+            if kind == 'error':
+                errors.append(f"Worker {worker_id}: {payload}")
+            elif kind == 'done':
+                summaries.append(payload)
+            elif on_message:
+                on_message(kind, worker_id, payload)
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=30)
+            if worker.is_alive():
+                worker.terminate()
+
+    return summaries, errors
+
+
+def run_process_pool(urls, processes=None, extractor_options=None, rate=2.0, progress_callback=None,
+                     should_stop=None, extractor_class=None):
+    """Extract place URLs across worker processes that each own a browser
+
+    Workers build extractor_class (the DOM backend by default) with extractor_options,
+    so the chosen backend and its tab count apply inside every process.
+    """
+    processes = pool_size(processes, urls)
+    # Classes are sent by name; each worker imports the backends itself
+    backend = extractor_class.__name__ if extractor_class else 'GoogleMapsExtractorStreamlit'
+    results = []
+    handled = 0
+
+    def on_message(kind, worker_id, payload):
+        # Records stream back as they are extracted; progress is reported from this thread
+        nonlocal handled
+        handled += 1
+        if kind == 'record':
+            results.append(payload)
+        if progress_callback:
+            progress = {
+                'stage': 'success' if kind == 'record' else 'failed',
+                'current': handled,
+                'total': len(urls),
+                'extracted': len(results),
+                'status': f"✅ Extracted: {payload['name']}" if kind == 'record'
+                          else f"⚠️ Worker {worker_id} could not extract a listing",
+            }
+            # The UI shows a company line whenever the key is present
+            if kind == 'record':
+                progress['company_name'] = payload['name']
+            progress_callback(progress)
+
+    # The global rate budget is split evenly between processes
+    summaries, errors = run_worker_pool(
+        _worker_main, [urls[worker_id::processes] for worker_id in range(processes)],
+        (backend, dict(extractor_options or {}), rate / processes), on_message, should_stop)
+
+    stats = aggregate_worker_stats(summaries)
+    stats['errors'] = errors
+    return results, stats
+
+
+def run_process_pool_extraction(query, max_results, processes=None, extractor_options=None, rate=2.0,
+                                progress_callback=None, should_stop=None, extractor_class=None):
+    """Harvest place URLs for a query, then extract them with a process pool"""
+    from extractor import GoogleMapsExtractorStreamlit
+
+    # The async backend cannot collect plain URLs, so the DOM backend harvests for it
+    harvester_class = GoogleMapsExtractorStreamlit
+    if hasattr(extractor_class, 'collect_place_urls'):
+        harvester_class = extractor_class
+
+    if progress_callback:
+        progress_callback({
+            'stage': 'searching',
+            'current': 0,
+            'total': max_results,
+            'extracted': 0,
+            'status': "🔍 Searching Google Maps..."
+        })
+
+    harvester = harvester_class(**(extractor_options or {}))
+    try:
+        success, message = harvester.search_google_maps(query)
+        if not success:
+            return [], f"Search failed: {message}", {}
+        urls = harvester.collect_place_urls(max_results)
+    finally:
+        harvester.close()
+
+    if not urls:
+        return [], "No listings found", {}
+
+    results, stats = run_process_pool(urls, processes, extractor_options, rate, progress_callback, should_stop,
+                                      extractor_class)
+    add_counts(stats['stage_seconds'], harvester.stats['stage_seconds'])
+
+    if progress_callback:
+        progress_callback({
+            'stage': 'completed',
+            'current': len(results),
+            'total': len(results),
+            'extracted': len(results),
+            'status': f"🎉 Extraction completed! Found {len(results)} results across {len(stats['workers'])} processes"
+        })
+
+    message = "Success" if results or not stats['errors'] else "; ".join(stats['errors'])
+    return results, message, stats